@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Ottieni il percorso assoluto della directory contenente lo script principale
 A_ScriptDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # salgo di un livello rispetto alla cartella dove è contenuto il file constant.py
@@ -26,11 +27,28 @@ Check_tecnologia = True
 # Verifica maschera specifica per tecnologia
 Check_mask = True
 # Verifico parent
-Check_parent = False
+Check_parent = True
+# Elenco di tutti gli antenati mancanti (non solo i parent diretti) da aggiungere alla lista delle FL
+Check_parent_antenati = True
 # Verifico linee guida
 Check_lineeGuida = True
 # Validazione con maschera generica
 Check_TabGlobaliSAP = True
+
+# ----------------------------------------------------
+# Maschera generica delle FL (usata prima di aver rilevato la tecnologia)
+# ----------------------------------------------------
+mask_FL_generica = r'^(?:([A-Z0-9]{3})(?:-([A-Z0-9]{4})(?:-([A-Z0-9]{2})(?:-([A-Z0-9]{2,3})(?:-([A-Z0-9]{2,3})(?:-([A-Z0-9]{2}))?)?)?)?)?)?$'
+
+# ----------------------------------------------------
+# Verifica parallela delle FL con le linee guida
+# ----------------------------------------------------
+# Numero di processi usati per la verifica (1 = verifica sequenziale)
+Parallel_workers = max(1, (os.cpu_count() or 1) - 1)
+# Numero massimo di FL per blocco inviato a un processo; sotto questa soglia la verifica resta sequenziale
+Parallel_chunk_size = 20000
+# Numero di FL lette ed elaborate per blocco nella verifica di file in streaming
+Stream_chunk_size = 50000
 # ----------------------------------------------------
 # Intestazioni per i file di upload
 # ----------------------------------------------------
@@ -77,8 +95,45 @@ file_ZPMR_TECH_OBJ_UpLoad = os.path.join(A_ScriptDir, "FileUpLoad", "ZPMR_TECH_O
 # Definizione del file per il controllo delle Technical Object di tutte le FL
 file_Check_TECH_OBJ = os.path.join(A_ScriptDir, "FileUpLoad", "FL_Check_TECH_OBJ.csv")
 
+# ----------------------------------------------------
+# Cartella della cache delle tabelle costruite dai file di configurazione
+# ----------------------------------------------------
+path_cache = os.path.join(A_ScriptDir, "Cache")
+# Cartella degli snapshot locali delle tabelle globali SAP
+path_snapshot_SAP = os.path.join(path_cache, "SAP")
+# Validità in minuti degli snapshot delle tabelle SAP: oltre questo tempo la tabella viene estratta di nuovo (0 = sempre)
+Snapshot_SAP_TTL_minuti = 240
+
 # timeout operazioni in SAP
 timeoutSeconds = 30
+# Minuti di inattività dopo i quali la connessione SAP condivisa viene rilasciata (0 = mai)
+SAP_connessione_inattiva_minuti = 30
+# Numero massimo di sessioni SAP GUI usate per estrarre le tabelle in parallelo (SAP ne consente al massimo 6 per connessione)
+SAP_sessioni_estrazione = 4
+# Esportazione delle tabelle SE16 su file locale invece che nella clipboard [True/False]
+SAP_export_su_file = True
+# Cartella dei file temporanei esportati da SE16 (eliminati dopo la lettura)
+path_export_SAP = os.path.join(tempfile.gettempdir(), "FL_Checker_SE16")
+# Estrazione dalle tabelle SE16 dei soli valori presenti nelle FL da verificare [True/False]
+SAP_estrazione_selettiva = True
+# Numero massimo di voci (valori singoli + intervalli) della selezione multipla; oltre si estrae la tabella completa
+SAP_selezione_max_valori = 500
+# Campo di selezione SE16 di VALUE delle tabelle estratte con selezione sui valori (VALUE è il primo campo, I1).
+# L'estrazione selettiva riguarda solo queste tabelle: ZPMR_CONTROL_FL1 e ZPMR_CONTROL_FL2 vengono sempre
+# estratte per intero, filtrate solo per struttura e tecnologia
+SAP_campi_valore = {
+    "ZPMR_CTRL_ASS": "I1",
+    "ZPM4R_GL_T_FL": "I1"
+}
+# Messaggi della barra di stato di SE16 quando la selezione non trova righe (la lista non viene mostrata)
+SAP_messaggi_nessuna_voce = ("No table entries found", "Nessuna voce")
+# Colonne della lista SE16 delle tabelle estratte con selezione, usate per il risultato vuoto di una selezione
+SAP_colonne_lista = {
+    "ZPMR_CTRL_ASS": ["Mdt", "Valore Livello", "Valore Liv. Superiore", "Valore Liv. Superiore_1", "Str.", "C",
+                      "Liv.Sede", "Sezione", "Tipologia", "Componente", "Tipo Elemento"],
+    "ZPM4R_GL_T_FL": ["Mdt", "Valore Livello", "Valore Liv. Superiore", "Valore Liv. Superiore_1", "Str.", "C",
+                      "Liv.Sede", "Tipo ogg.", "Prof.cat.", "Codice attività Addizionale", "Documento PM"]
+}
 # Nomi colonne tabella CTRL_ASS - Control Asset
 CTRL_ASS_Valore_Livello = "Valore Livello"
 CTRL_ASS_Valore_Liv_Superiore_1 = "Valore Liv. Superiore"
@@ -1,13 +1,26 @@
 import pandas as pd
+import numpy as np
+import csv
+import io
+import mmap
+import re
 from collections import Counter
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional, Tuple
 import os
 import logging
 from utils.decorators import error_logger
+from Tree_tools import FLTree
 
 # Logger specifico per questo modulo
 logger = logging.getLogger("DataFrameTools")
 
+# Righe composte solo da trattini e spazi (separatori della stampa SE16)
+_RIGA_SEPARATORE = re.compile(r'-[- ]*')
+# Tabella dei caratteri considerati spazi da str.strip(): sono tutti inferiori a U+3001,
+# i codici maggiori vengono ricondotti all'ultima posizione (non spazio)
+_TABELLA_SPAZI = np.array([chr(c).isspace() for c in range(0x3002)], dtype=bool)
+_TABELLA_SPAZI[-1] = False
+
 class DataFrameTools:
     """
     Classe di utility per la manipolazione dei DataFrame pandas
@@ -257,42 +270,27 @@ class DataFrameTools:
                 raise ValueError("technology deve essere una stringa valida")
             
             try:
-                # Inizializzo una lista per raccogliere i DataFrame processati
-                processed_dfs = []
+                # Valori fissi delle righe
+                tplkz = "Z-RLS" if technology == "H" else "Z-R" + technology + "S"
+                fltyp = technology.strip()
+                
+                # Raccolgo le righe in un'unica lista e creo il DataFrame una sola volta
+                righe = []
                 
                 # Processo ogni lista di elementi con il relativo indice (livello)
                 for index, elements_list in enumerate(lists_of_elements, start=3):
-                    # Salto le liste None
-                    if elements_list is None:
-                        continue                    
-                    # Verifico se la lista non è vuota
-                    if len(elements_list) > 0:
-                        # Creo un DataFrame vuoto con le colonne dell'intestazione
-                        df = pd.DataFrame(columns=column_names)
-                        
-                        # Aggiungo gli elementi come righe
-                        for element in elements_list:
-                            # Creo una nuova riga con valori None
-                            new_row = {col: None for col in df.columns}
-
-                            # Imposto i valori nei campi specifici
-                            if len(df.columns) == 6:
-                                new_row[df.columns[0]] = "Z-RLS" if technology == "H" else "Z-R" + technology + "S"
-                                new_row[df.columns[1]] = technology.strip()
-                                new_row[df.columns[2]] = str(index).strip()  # Livello come stringa
-                                new_row[df.columns[3]] = element.strip() if isinstance(element, str) else str(element)
-                            
-                            # Aggiungo la riga al DataFrame
-                            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                        
-                        # Aggiungo il DataFrame creato alla lista dei DataFrame processati
-                        processed_dfs.append(df)
+                    # Salto le liste None o vuote
+                    if elements_list is None or len(elements_list) == 0:
+                        continue
+                    
+                    livello = str(index).strip()  # Livello come stringa
+                    for element in elements_list:
+                        value = element.strip() if isinstance(element, str) else str(element)
+                        # VALUETX e REFLEVEL restano vuoti
+                        righe.append((tplkz, fltyp, livello, value, None, None))
                 
-                # Combina tutti i DataFrame in uno solo
-                if processed_dfs:
-                    return pd.concat(processed_dfs, ignore_index=True)
-                else:
-                    return pd.DataFrame(columns=column_names)  # Restituisco un DataFrame vuoto con le colonne corrette
+                # Se non ci sono righe restituisco un DataFrame vuoto con le colonne corrette
+                return pd.DataFrame(righe, columns=column_names)
                     
             except Exception as e:
                 # Rilanciamo l'eccezione con contesto aggiuntivo
@@ -429,44 +427,27 @@ class DataFrameTools:
                 raise ValueError("country_code deve essere una stringa valida")
             
             try:
-                # Inizializzo una lista per raccogliere i DataFrame processati
-                processed_dfs = []
+                # Valori fissi delle righe
+                tplkz = "Z-R" + technology + "M"
+                fltyp = technology.strip()
+                land1 = country_code.strip()
+                
+                # Raccolgo le righe in un'unica lista e creo il DataFrame una sola volta
+                righe = []
                 
                 # Processo ogni lista di elementi con il relativo indice (livello)
                 for index, elements_list in enumerate(lists_of_elements, start=1):
-                    # Salto le liste None
-                    if elements_list is None:
+                    # Salto le liste None o vuote
+                    if elements_list is None or len(elements_list) == 0:
                         continue
-
-                    # Verifico se la lista non è vuota
-                    if len(elements_list) > 0:
-                        # Creo un DataFrame vuoto con le colonne dell'intestazione
-                        df = pd.DataFrame(columns=column_names)
-                        
-                        # Aggiungo gli elementi come righe
-                        for element in elements_list:
-                            # Creo una nuova riga con valori None
-                            new_row = {col: None for col in df.columns}
-                            
-                            # Imposto i valori nei campi specifici
-                            if len(df.columns) == 5:
-                                new_row[df.columns[0]] = "Z-R" + technology + "M"
-                                new_row[df.columns[1]] = technology.strip()
-                                new_row[df.columns[2]] = str(index).strip()  # Livello come stringa
-                                new_row[df.columns[3]] = country_code.strip()
-                                new_row[df.columns[4]] = element.strip() if isinstance(element, str) else str(element)
-                            
-                            # Aggiungo la riga al DataFrame
-                            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                        
-                        # Aggiungo il DataFrame creato alla lista dei DataFrame processati
-                        processed_dfs.append(df)
+                    
+                    livello = str(index).strip()  # Livello come stringa
+                    for element in elements_list:
+                        value = element.strip() if isinstance(element, str) else str(element)
+                        righe.append((tplkz, fltyp, livello, land1, value))
                 
-                # Combina tutti i DataFrame in uno solo
-                if processed_dfs:
-                    return pd.concat(processed_dfs, ignore_index=True)
-                else:
-                    return pd.DataFrame(columns=column_names)  # Restituisco un DataFrame vuoto con le colonne corrette
+                # Se non ci sono righe restituisco un DataFrame vuoto con le colonne corrette
+                return pd.DataFrame(righe, columns=column_names)
                     
             except Exception as e:
                 # Rilanciamo l'eccezione con contesto aggiuntivo
@@ -577,6 +558,82 @@ class DataFrameTools:
             # Cattura errori non previsti
             raise Exception(f"Errore durante il confronto delle colonne: {str(e)}")
 
+    @staticmethod
+    def _insieme_valori(valori: Iterable) -> set:
+        """
+        Restituisce l'insieme dei valori unici escludendo stringhe vuote e valori null,
+        con lo stesso criterio di trova_differenze
+        """
+        if not isinstance(valori, (set, frozenset)):
+            valori = pd.unique(pd.Series(valori, dtype=object))
+        return {x for x in valori if pd.notna(x) and (not isinstance(x, str) or x.strip() != '')}
+
+    @staticmethod
+    @error_logger(logger=logger)
+    def trova_differenze_gerarchia(df_fl: pd.DataFrame,
+                                   livelli_sap: Dict[int, Iterable],
+                                   check_sap: Dict[str, Iterable]) -> Dict[str, Optional[List]]:
+        """
+        Confronta in un'unica chiamata le FL con le tabelle globali SAP: per ogni livello trova gli
+        elementi di df_fl['Livello_n'] assenti tra i valori SAP del livello n, e per ogni tabella
+        trova le chiavi di df_fl['Check'] assenti tra le chiavi SAP. Gli insiemi di riferimento
+        vengono costruiti una sola volta e il confronto è una differenza tra insiemi.
+        
+        Args:
+            df_fl: DataFrame delle FL con le colonne 'Livello_1'..'Livello_6' e 'Check'
+            livelli_sap: Dizionario livello -> valori SAP del livello (es. colonna del pivot o frozenset)
+            check_sap: Dizionario nome risultato -> chiavi Check della tabella SAP
+        
+        Returns:
+            dict: 'Livello_n' per ogni livello di livelli_sap e i nomi di check_sap, ciascuno associato
+                  alla lista ordinata degli elementi mancanti o a None se sono tutti presenti
+        
+        Raises:
+            TypeError: Se df_fl non è un DataFrame
+            ValueError: Se df_fl è vuoto o mancano le colonne da confrontare
+        """
+        if not isinstance(df_fl, pd.DataFrame):
+            raise TypeError("Gli input devono essere pandas DataFrame")
+        if df_fl.empty:
+            raise ValueError("Il primo dataframe è vuoto")
+        
+        confronti = {f'Livello_{livello}': (f'Livello_{livello}', valori) for livello, valori in livelli_sap.items()}
+        confronti.update({nome: ('Check', valori) for nome, valori in check_sap.items()})
+        
+        colonne_mancanti = {colonna for colonna, _ in confronti.values()} - set(df_fl.columns)
+        if colonne_mancanti:
+            raise ValueError(f"Le colonne {', '.join(sorted(colonne_mancanti))} non esistono nel primo dataframe")
+        
+        # Valori unici delle FL per ogni colonna, calcolati una sola volta
+        valori_fl = {colonna: DataFrameTools._insieme_valori(df_fl[colonna]) for colonna, _ in confronti.values()}
+        
+        risultati = {}
+        for nome, (colonna, valori) in confronti.items():
+            differenze = valori_fl[colonna] - DataFrameTools._insieme_valori(valori)
+            risultati[nome] = sorted(differenze) if differenze else None
+        return risultati
+
+    @staticmethod
+    def valori_tabelle_SAP(df_fl: pd.DataFrame) -> Dict[str, set]:
+        """
+        Restituisce, per ogni tabella globale SAP estratta con selezione sui valori (ZPMR_CTRL_ASS e
+        ZPM4R_GL_T_FL), i valori di 'Valore Livello' necessari per verificare le FL con
+        trova_differenze_gerarchia: il primo elemento delle chiavi Check (valore del livello più profondo).
+        Gli altri valori della tabella non cambiano il risultato del confronto e possono non essere estratti.
+        ZPMR_CONTROL_FL1 e ZPMR_CONTROL_FL2 vengono sempre estratte per intero.
+        
+        Args:
+            df_fl: DataFrame delle FL con la colonna 'Check'
+        """
+        check = set()
+        if 'Check' in df_fl.columns:
+            check = {str(chiave).split('_', 1)[0] for chiave in DataFrameTools._insieme_valori(df_fl['Check'])}
+        
+        return {
+            "ZPMR_CTRL_ASS": check,
+            "ZPM4R_GL_T_FL": set(check)
+        }
+
     @staticmethod
     def pivot_hierarchy(df, values_col, level_col):
         """
@@ -646,8 +703,125 @@ class DataFrameTools:
         except Exception as e:
             # Cattura eventuali altri errori non previsti
             raise Exception(f"Errore durante l'elaborazione del dataframe: {str(e)}")
+
+    @staticmethod
+    def indice_livelli(df: pd.DataFrame, values_col: str, level_col: str) -> Dict[int, frozenset]:
+        """
+        Costruisce l'indice dei valori di una tabella gerarchica SAP per livello, con un solo groupby.
+        Sostituisce pivot_hierarchy quando serve solo verificare la presenza dei valori.
+        
+        Args:
+            df: DataFrame di input (es. ZPMR_CONTROL_FL1 / ZPMR_CONTROL_FL2)
+            values_col: Nome della colonna contenente i valori (es. 'Valore Livello')
+            level_col: Nome della colonna contenente i livelli (es. 'Liv.Sede')
+        
+        Returns:
+            dict: Livello -> insieme dei valori del livello (ripuliti dagli spazi, senza valori vuoti)
+        
+        Raises:
+            TypeError: Se df non è un DataFrame
+            ValueError: Se il dataframe è vuoto, se le colonne non esistono o se un livello non è numerico
+        """
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("L'input 'df' deve essere un pandas DataFrame")
+        if df.empty:
+            raise ValueError("Il dataframe è vuoto")
+        for colonna in (values_col, level_col):
+            if colonna not in df.columns:
+                raise ValueError(f"La colonna '{colonna}' non esiste nel dataframe")
+        
+        valori = df[values_col].astype(str).str.strip()
+        livelli = df[level_col].astype(str).str.strip()
+        validi = df[values_col].notna() & df[level_col].notna() & (valori != '') & (livelli != '')
+        if not validi.any():
+            raise ValueError("Le colonne contengono solo valori nulli")
+        
+        try:
+            livelli = livelli[validi].astype(int)
+        except ValueError as e:
+            raise ValueError(f"La colonna '{level_col}' contiene livelli non numerici: {str(e)}")
+        
+        return {int(livello): frozenset(gruppo) for livello, gruppo in valori[validi].groupby(livelli)}
+
+    @staticmethod
+    def salva_indice_livelli(indice: Dict[int, frozenset], file_path: str, separator: str = ";"):
+        """
+        Salva l'indice dei livelli in un file CSV in formato lungo (una riga per valore).
+        
+        Args:
+            indice: Indice prodotto da indice_livelli
+            file_path: Percorso completo del file CSV
+            separator: Separatore da utilizzare nel file CSV (default: ";")
+        
+        Returns:
+            tuple: (risultato, errore) restituiti da save_dataframe_to_csv
+        """
+        righe = [(livello, valore) for livello in sorted(indice) for valore in sorted(indice[livello])]
+        df = pd.DataFrame(righe, columns=['Liv.Sede', 'Valore Livello'])
+        return DataFrameTools.save_dataframe_to_csv(df, file_path, separator=separator)
+
+    @staticmethod
+    @error_logger(logger=logger)
+    def carica_indice_livelli(file_path: str, separator: str = ";", encoding: str = "utf-8") -> Dict[int, frozenset]:
+        """
+        Carica l'indice dei livelli da un file CSV. Oltre al formato lungo scritto da salva_indice_livelli
+        accetta i file pivot (colonne Livello_n) salvati in precedenza.
+        
+        Args:
+            file_path: Percorso del file CSV
+            separator: Separatore del file CSV (default: ";")
+            encoding: Encoding del file (default: "utf-8")
+        
+        Returns:
+            dict: Livello -> insieme dei valori del livello
+        
+        Raises:
+            FileNotFoundError: Se il file non esiste
+            ValueError: Se il file non contiene un indice dei livelli
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"I seguenti file non esistono: {os.path.basename(file_path)}")
+        
+        # Leggo tutto come stringa: valori come '01' non devono diventare numeri
+        df = pd.read_csv(file_path, sep=separator, encoding=encoding, dtype=str, keep_default_na=False)
+        if 'Liv.Sede' in df.columns and 'Valore Livello' in df.columns:
+            return DataFrameTools.indice_livelli(df, 'Valore Livello', 'Liv.Sede')
+        
+        colonne_livello = [colonna for colonna in df.columns if colonna.startswith('Livello_')]
+        if not colonne_livello:
+            raise ValueError(f"Il file {file_path} non contiene un indice dei livelli")
+        
+        indice = {}
+        for colonna in colonne_livello:
+            valori = df[colonna].str.strip()
+            indice[int(colonna[len('Livello_'):])] = frozenset(valori[valori != ''])
+        return indice
     
 
+    @staticmethod
+    def trova_parent_mancanti(df: pd.DataFrame, tutti_gli_antenati: bool = False) -> List[str]:
+        """
+        Verifica che ogni FL di livello n (2-6) abbia il proprio genitore tra le FL di livello n-1,
+        usando la gerarchia FLTree costruita dalla colonna 'FL' del DataFrame.
+        
+        Args:
+            df: DataFrame con la colonna 'FL'
+            tutti_gli_antenati: Se True restituisce anche gli antenati mancanti dei genitori mancanti,
+                                ordinati per livello, pronti per essere aggiunti alla lista delle FL
+        
+        Returns:
+            list: Genitori mancanti senza duplicati, nell'ordine in cui vengono rilevati
+                  (livello crescente e ordine delle righe)
+        
+        Raises:
+            ValueError: Se il DataFrame non contiene la colonna 'FL'
+        """
+        if 'FL' not in df.columns:
+            raise ValueError("Il DataFrame deve contenere la colonna 'FL'")
+        
+        albero = FLTree.from_fl(df['FL'])
+        return albero.antenati_mancanti() if tutti_gli_antenati else albero.parent_mancanti()
+
     @staticmethod
     def get_last_char(df, colonna):
         """
@@ -697,13 +871,15 @@ class DataFrameTools:
             return None
         
     @staticmethod
-    def check_dataframe(df, name="DataFrame"):
+    def check_dataframe(df, name="DataFrame", ammetti_vuoto=False):
         """
         Esegue un controllo completo su un DataFrame
         
         Args:
             df: DataFrame da verificare
             name: Nome del DataFrame per i messaggi di errore
+            ammetti_vuoto: Se True un DataFrame senza righe ma con colonne è valido
+                           (ad esempio una selezione SAP che non ha trovato righe)
             
         Returns:
             bool: True se il DataFrame è valido
@@ -719,6 +895,9 @@ class DataFrameTools:
                 print(f"{name} non è un DataFrame valido")
                 return False
                 
+            if ammetti_vuoto and df.shape[0] == 0 and df.shape[1] > 0:
+                return True
+
             # Verifica se è vuoto
             if df.empty:
                 print(f"{name} è vuoto")
@@ -735,11 +914,106 @@ class DataFrameTools:
             print(f"Errore durante la verifica di {name}: {str(e)}")
             return False
 
+    @staticmethod
+    def _colonne_larghezza_fissa(righe: List[str]) -> Optional[List[tuple]]:
+        """
+        Divide le righe di una stampa SE16 a larghezza fissa in colonne lavorando per offset:
+        il testo viene convertito in una matrice di codici carattere (una riga per riga di testo)
+        e ogni colonna viene ripulita dagli spazi in modo vettoriale.
+        
+        Args:
+            righe: Righe della stampa (intestazione inclusa), già private degli spazi esterni
+        
+        Returns:
+            Lista di tuple (valori della colonna intestazione inclusa, colonna a larghezza zero)
+            oppure None se le righe non hanno la stessa lunghezza e i separatori '|' nelle stesse posizioni
+        """
+        lunghezza = len(righe[0])
+        if lunghezza == 0 or any(len(riga) != lunghezza for riga in righe):
+            return None
+        
+        # Matrice dei codici carattere: UTF-32 mantiene un elemento per carattere
+        caratteri = np.frombuffer(''.join(righe).encode('utf-32-le'), dtype=np.uint32).reshape(len(righe), lunghezza)
+        return DataFrameTools._colonne_matrice(caratteri)
+
+    @staticmethod
+    def _colonne_matrice(caratteri: np.ndarray) -> Optional[List[tuple]]:
+        """
+        Divide in colonne una matrice di codici carattere (uint8 o uint32, una riga per riga della
+        stampa SE16, tutte della stessa lunghezza) usando le posizioni dei separatori '|'.
+        
+        Returns:
+            Lista di tuple come _colonne_larghezza_fissa oppure None se i separatori non sono
+            nelle stesse posizioni in tutte le righe
+        """
+        n_righe, lunghezza = caratteri.shape
+        separatori = caratteri == ord('|')
+        if not (separatori == separatori[0]).all():
+            return None
+        
+        posizioni = np.flatnonzero(separatori[0])
+        inizi = np.concatenate(([0], posizioni + 1))
+        fini = np.concatenate((posizioni, [lunghezza]))
+        
+        colonne = []
+        for inizio, fine in zip(inizi, fini):
+            larghezza = fine - inizio
+            if larghezza == 0:
+                colonne.append(([''] * n_righe, True))
+                continue
+            
+            blocco = caratteri[:, inizio:fine]
+            # I codici uint8 sono sempre indici validi della tabella degli spazi
+            codici = blocco if blocco.dtype == np.uint8 else np.minimum(blocco, len(_TABELLA_SPAZI) - 1)
+            pieni = ~_TABELLA_SPAZI[codici]
+            # Primo e ultimo carattere non spazio di ogni valore
+            primo = pieni.argmax(axis=1)
+            ultimo = larghezza - 1 - pieni[:, ::-1].argmax(axis=1)
+            lunghezze = np.where(pieni.any(axis=1), ultimo - primo + 1, 0)
+            
+            # Allineo i valori a sinistra (solo se qualche valore ha spazi iniziali) e azzero i caratteri
+            # oltre la fine: la vista 'U' di numpy scarta i NUL finali, restituendo le stringhe ripulite
+            offset = np.arange(larghezza)
+            if primo.any():
+                allineati = np.take_along_axis(blocco, np.minimum(primo[:, None] + offset, larghezza - 1), axis=1)
+            else:
+                allineati = blocco.copy()
+            allineati[offset >= lunghezze[:, None]] = 0
+            valori = np.ascontiguousarray(allineati, dtype=np.uint32).view(f'<U{larghezza}').ravel().tolist()
+            # Senza righe di dati la colonna è comunque priva di valori
+            colonne.append((valori, n_righe == 1))
+        
+        return colonne
+
+    @staticmethod
+    def _colonne_separatore(righe: List[str]) -> List[tuple]:
+        """
+        Divide le righe sul carattere '|' con il parser C di pandas (righe non a larghezza fissa)
+        e ripulisce gli spazi una sola volta per colonna.
+        
+        Returns:
+            Lista di tuple (valori della colonna intestazione inclusa, colonna senza valori)
+        """
+        # Tutti i valori restano stringhe (codici come '01' non devono diventare numeri)
+        # e le virgolette non vengono interpretate
+        df = pd.read_csv(io.StringIO('\n'.join(righe)), sep='|', header=None, dtype=str, engine='c',
+                         keep_default_na=False, quoting=csv.QUOTE_NONE)
+        
+        colonne = []
+        for i in range(df.shape[1]):
+            valori = df.iloc[:, i].tolist()
+            # La colonna viene scartata se i valori dei dati sono tutti mancanti o tutti vuoti
+            vuota = (all(not isinstance(valore, str) for valore in valori[1:])
+                     or all(valore == '' for valore in valori[1:]))
+            colonne.append(([valore.strip() if isinstance(valore, str) else valore for valore in valori], vuota))
+        return colonne
+
     @staticmethod
     def clean_data(data: pd.DataFrame) -> pd.DataFrame:
         """
         Legge i dati dalla clipboard, rimuove le righe di separazione e le colonne vuote,
-        e gestisce le intestazioni duplicate.
+        e gestisce le intestazioni duplicate. I valori vengono restituiti come stringhe
+        già ripulite dagli spazi di riempimento della stampa SE16.
         
         Returns:
             DataFrame Pandas pulito o None in caso di errore
@@ -749,55 +1023,151 @@ class DataFrameTools:
                 print("Nessun dato trovato nella clipboard")
                 return None
 
-            # Divide in righe
-            lines = data.strip().split('\n')
-            
-            # Filtra le righe, escludendo quelle che contengono solo trattini
-            clean_lines = []
-            for line in lines:
-                # Rimuove spazi bianchi iniziali e finali
-                line = line.strip()
-                # Verifica se la riga è composta solo da trattini
-                if line and not all(c == '-' for c in line.replace(' ', '')):
-                    clean_lines.append(line)
+            # Rimuove gli spazi iniziali e finali di ogni riga, le righe vuote e quelle composte
+            # solo da trattini (separatori della stampa SE16)
+            righe = [riga for riga in (line.strip() for line in data.strip().split('\n'))
+                     if riga and not _RIGA_SEPARATORE.fullmatch(riga)]
 
-            if not clean_lines:
+            if not righe:
                 print("Nessuna riga valida trovata dopo la pulizia")
                 return None
 
-            # Dividi le righe in colonne usando il tab come separatore
-            data_rows = [line.split('|') for line in clean_lines]
-            
-            # Prendi la prima riga come header
-            original_headers = [header.strip() for header in data_rows[0]]
-            
-            # Gestisci gli header duplicati
-            unique_headers = DataFrameTools.handle_duplicate_headers(original_headers)
-            
-            # Se sono stati trovati duplicati, stampalo
-            duplicates = [header for header, count in Counter(original_headers).items() if count > 1]
-            if duplicates:
-                print("\nTrovate colonne con nomi duplicati:")
-                for dup in duplicates:
-                    print(f"- '{dup}' (rinominate con postfissi numerici)")
+            # Divide le colonne per offset se la stampa è a larghezza fissa, altrimenti sul separatore
+            colonne = DataFrameTools._colonne_larghezza_fissa(righe)
+            if colonne is None:
+                colonne = DataFrameTools._colonne_separatore(righe)
 
-            # Crea il DataFrame con i nuovi header
-            df = pd.DataFrame(data_rows[1:], columns=unique_headers)
+            return DataFrameTools._dataframe_colonne(colonne, len(righe) - 1)
 
-            # Rimuove le colonne completamente vuote
-            df = df.dropna(axis=1, how='all')
-            
-            # Rimuove le colonne dove tutti i valori sono stringhe vuote
-            df = df.loc[:, ~(df == '').all()]
+        except Exception as e:
+            print(f"Errore durante la pulizia dei dati: {str(e)}")
+            return None
+
+    @staticmethod
+    def _dataframe_colonne(colonne: List[tuple], n_righe: int) -> pd.DataFrame:
+        """
+        Crea il DataFrame dalle colonne della stampa SE16: la prima riga è l'intestazione,
+        le intestazioni duplicate ricevono un postfisso numerico e le colonne senza valori vengono scartate
+        
+        Args:
+            colonne: Lista di tuple (valori della colonna intestazione inclusa, colonna senza valori)
+            n_righe: Numero di righe di dati
+        """
+        # Prendi la prima riga come header
+        original_headers = [valori[0] if isinstance(valori[0], str) else '' for valori, _ in colonne]
+        
+        # Gestisci gli header duplicati
+        unique_headers = DataFrameTools.handle_duplicate_headers(original_headers)
+        
+        # Se sono stati trovati duplicati, stampalo
+        duplicates = [header for header, count in Counter(original_headers).items() if count > 1]
+        if duplicates:
+            print("\nTrovate colonne con nomi duplicati:")
+            for dup in duplicates:
+                print(f"- '{dup}' (rinominate con postfissi numerici)")
+
+        # Crea il DataFrame escludendo le colonne senza valori (es. quelle prima del primo '|'
+        # e dopo l'ultimo '|' di ogni riga)
+        mantenute = [i for i, (_, vuota) in enumerate(colonne) if not vuota]
+        df = pd.DataFrame({i: colonne[i][0][1:] for i in mantenute}, index=pd.RangeIndex(n_righe),
+                          columns=mantenute)
+        df.columns = [unique_headers[i] for i in mantenute]
+        return df
+
+    @staticmethod
+    def clean_data_file(file_path: str) -> pd.DataFrame:
+        """
+        Legge una lista SE16 salvata su file locale (formato "non convertito", con separatori '|')
+        e restituisce lo stesso DataFrame di clean_data sul testo del file.
+        
+        Il file viene mappato in memoria: se contiene solo caratteri ASCII, righe e colonne vengono
+        individuate direttamente sui byte (senza creare una stringa per riga); altrimenti il testo
+        viene decodificato (UTF-8 o, in alternativa, cp1252) e passato a clean_data.
+        
+        Args:
+            file_path: Percorso del file esportato da SAP
             
-            # Reset dell'indice
-            df = df.reset_index(drop=True)
-         
-            return df
+        Returns:
+            DataFrame Pandas pulito o None in caso di errore
+        """
+        try:
+            if os.path.getsize(file_path) == 0:
+                print(f"Nessun dato trovato nel file {file_path}")
+                return None
+
+            with open(file_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return DataFrameTools._clean_data_mappato(mm)
+            finally:
+                try:
+                    mm.close()
+                except BufferError:
+                    # Dopo un'eccezione il traceback può ancora riferire viste sulla mappa:
+                    # verrà chiusa dalla garbage collection
+                    pass
 
         except Exception as e:
-            print(f"Errore durante la pulizia dei dati: {str(e)}")
+            print(f"Errore durante la lettura del file {file_path}: {str(e)}")
             return None
+
+    @staticmethod
+    def _clean_data_mappato(mm: mmap.mmap) -> pd.DataFrame:
+        """
+        Pulisce il contenuto di un file mappato in memoria (vedi clean_data_file)
+        """
+        byte = np.frombuffer(mm, dtype=np.uint8)
+        # Salto l'eventuale BOM UTF-8
+        if byte[:3].tobytes() == b'\xef\xbb\xbf':
+            byte = byte[3:]
+
+        if byte.size and byte.max() >= 0x80:
+            testo = byte.tobytes()
+            try:
+                testo = testo.decode('utf-8')
+            except UnicodeDecodeError:
+                testo = testo.decode('cp1252')
+            return DataFrameTools.clean_data(testo)
+
+        return DataFrameTools._clean_data_ascii(byte)
+
+    @staticmethod
+    def _clean_data_ascii(byte: np.ndarray) -> pd.DataFrame:
+        """
+        Versione di clean_data che lavora su un array di byte ASCII (es. file mappato in memoria)
+        """
+        # Inizio e fine di ogni riga, senza gli spazi iniziali e finali (stessi caratteri di str.strip)
+        fine_righe = np.flatnonzero(byte == ord('\n'))
+        inizi = np.concatenate(([0], fine_righe + 1))
+        fini = np.concatenate((fine_righe, [byte.size]))
+        pieni = np.flatnonzero(~_TABELLA_SPAZI[byte])
+        primo = np.searchsorted(pieni, inizi)
+        ultimo = np.searchsorted(pieni, fini) - 1
+        non_vuote = (primo < pieni.size) & (primo <= ultimo)
+        inizi = pieni[primo[non_vuote]]
+        fini = pieni[ultimo[non_vuote]] + 1
+
+        # Scarto le righe composte solo da trattini e spazi (separatori della stampa SE16)
+        altri_caratteri = np.concatenate(([0], np.cumsum((byte != ord('-')) & (byte != ord(' ')))))
+        separatori = (byte[inizi] == ord('-')) & (altri_caratteri[fini] == altri_caratteri[inizi])
+        inizi = inizi[~separatori]
+        fini = fini[~separatori]
+
+        if inizi.size == 0:
+            print("Nessuna riga valida trovata dopo la pulizia")
+            return None
+
+        lunghezze = fini - inizi
+        colonne = None
+        if (lunghezze == lunghezze[0]).all():
+            # Stampa a larghezza fissa: matrice dei caratteri presa direttamente dai byte
+            caratteri = byte[inizi[:, None] + np.arange(lunghezze[0])]
+            colonne = DataFrameTools._colonne_matrice(caratteri)
+        if colonne is None:
+            righe = [byte[inizio:fine].tobytes().decode('ascii') for inizio, fine in zip(inizi, fini)]
+            colonne = DataFrameTools._colonne_separatore(righe)
+
+        return DataFrameTools._dataframe_colonne(colonne, inizi.size - 1)
     
     @staticmethod        
     def handle_duplicate_headers(headers: List[str]) -> List[str]:
@@ -872,30 +1242,59 @@ class DataFrameTools:
             # Converti i valori non-stringa in stringhe
             result_df[col1] = result_df[col1].astype(str)
         
-        # Funzione per splittare e padare a 6 elementi
-        def split_and_pad(x):
-            try:
-                parts = x.split('-')
-                # Converte ogni elemento in stringa e rimuove spazi
-                parts = [str(part).strip() for part in parts]
-                # Estende la lista a 6 elementi aggiungendo stringhe vuote
-                parts.extend([''] * (6 - len(parts)))
-                return pd.Series(parts[:6])
-            except Exception as e:
-                # Gestione di qualsiasi errore nello splitting
-                raise ValueError(f"Errore nello splitting del valore '{x}': {str(e)}")
-        
         try:
-            # Crea le colonne numerate da 1 a 6
-            result_df[['Livello_1', 'Livello_2', 'Livello_3', 'Livello_4', 'Livello_5', 'Livello_6']] = result_df[col1].apply(split_and_pad)
+            # Split vettoriale: al massimo 6 separatori, così i segmenti oltre il sesto finiscono
+            # in una colonna aggiuntiva che viene scartata
+            livelli = result_df[col1].str.split('-', n=6, expand=True, regex=False)
+            # Estende a 6 colonne con stringhe vuote e rimuove gli spazi da ogni elemento
+            livelli = livelli.reindex(columns=range(6)).fillna('')
+            for i in range(6):
+                result_df[f'Livello_{i + 1}'] = livelli[i].str.strip()
             # Aggiunge la colonna FL_Lunghezza con il numero di elementi dopo lo split
-            result_df['FL_Lunghezza'] = result_df['FL'].apply(lambda x: len(x.split('-')))
+            result_df['FL_Lunghezza'] = result_df['FL'].str.count('-') + 1
 
         except Exception as e:
             raise ValueError(f"Errore nella creazione delle colonne di livello: {str(e)}")
         
         return result_df
 
+    @staticmethod
+    def build_check_key(df: pd.DataFrame,
+                        rami: List[tuple],
+                        separator: str = '_',
+                        colonna_obbligatoria: Optional[str] = None) -> pd.Series:
+        """
+        Costruisce la chiave Check in modo vettoriale, condiviso tra il lato FL e il lato SAP.
+        Ogni colonna viene convertita in stringa e ripulita una sola volta; per ogni riga viene usato
+        il primo ramo la cui colonna di condizione non è vuota.
+        
+        Args:
+            df: DataFrame di input
+            rami: Lista di tuple (colonna condizione, colonne da concatenare) valutate in ordine
+            separator: Carattere/i da usare come separatore
+            colonna_obbligatoria: Colonna che, se vuota, rende nulla la chiave indipendentemente dai rami
+        
+        Returns:
+            Series con le chiavi concatenate (None se nessun ramo è applicabile)
+        """
+        colonne = {colonna for condizione, parti in rami for colonna in (condizione, *parti)}
+        if colonna_obbligatoria is not None:
+            colonne.add(colonna_obbligatoria)
+        pulite = {colonna: df[colonna].astype(str).str.strip(' \t\n\r').to_numpy(dtype=object) for colonna in colonne}
+
+        condizioni = [pulite[condizione] != "" for condizione, _ in rami]
+        valori = []
+        for _, parti in rami:
+            chiave = pulite[parti[0]]
+            for colonna in parti[1:]:
+                chiave = chiave + separator + pulite[colonna]
+            valori.append(chiave)
+
+        chiavi = np.select(condizioni, valori, default=None) if len(df) else np.empty(0, dtype=object)
+        if colonna_obbligatoria is not None:
+            chiavi[pulite[colonna_obbligatoria] == ""] = None
+        return pd.Series(chiavi, index=df.index, dtype=object)
+
     @staticmethod
     @error_logger(logger=logger) 
     def add_concatenated_column_FL(df: pd.DataFrame, 
@@ -926,27 +1325,66 @@ class DataFrameTools:
         if not all(col in df.columns for col in required_cols):
             raise ValueError("Una o più colonne specificate non esistono nel DataFrame")
 
-        def create_concatenated_value(row):
-            # Verifica che col4 non sia nullo
-            if (str(row[col3]).strip(' \t\n\r') == ""):
-                return None
-            # add_concatenated_column(df, "Livello_6", "Livello_5", "Livello_4",  "Livello_3", "FL_Lunghezza")
-            #                               col1        col2         col3           col4        col5
-            if (row[col1].strip(' \t\n\r') != ""): # se è presente il 6 livello allora concateno 6-5-4-Lunghezza
-                result = f"{str(row[col1].strip(' \t\n\r'))}{separator}{str(row[col2].strip(' \t\n\r'))}{separator}{str(row[col3].strip(' \t\n\r'))}{separator}{str(str(row[col5]).strip(' \t\n\r'))}"
-                return result
-            elif (row[col2].strip(' \t\n\r') != ""): # se è presente il 5 livello allora concateno 5-4-3-Lunghezza
-                result = f"{str(row[col2].strip(' \t\n\r'))}{separator}{str(row[col3].strip(' \t\n\r'))}{separator}{str(str(row[col4]).strip(' \t\n\r'))}{separator}{str(str(row[col5]).strip(' \t\n\r'))}"
-                return result
-            elif (row[col3].strip(' \t\n\r') != ""):
-                result = f"{str(row[col3].strip(' \t\n\r'))}{separator}{str(str(row[col4]).strip(' \t\n\r'))}{separator}{str(str(row[col5]).strip(' \t\n\r'))}"
-                return result
-            else:
-                return None                 
-        
+        # add_concatenated_column(df, "Livello_6", "Livello_5", "Livello_4",  "Livello_3", "FL_Lunghezza")
+        #                               col1        col2         col3           col4        col5
+        rami = [
+            (col1, [col1, col2, col3, col5]),  # se è presente il 6 livello allora concateno 6-5-4-Lunghezza
+            (col2, [col2, col3, col4, col5]),  # se è presente il 5 livello allora concateno 5-4-3-Lunghezza
+            (col3, [col3, col4, col5]),
+        ]
+
         df_copy = df.copy()
-        df_copy[new_column_name] = df_copy.apply(create_concatenated_value, axis=1)
+        # Senza il 4 livello la chiave non viene creata
+        df_copy[new_column_name] = DataFrameTools.build_check_key(df_copy, rami, separator, colonna_obbligatoria=col3)
         return df_copy
+
+    @staticmethod
+    @error_logger(logger=logger)
+    def parse_fl_incrementale(fl_list: List[str],
+                              df_parse_precedente: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Crea il DataFrame delle FL con livelli, lunghezza e colonna Check, elaborando solo le FL
+        assenti dal parse precedente: le altre riutilizzano i valori già calcolati.
+        
+        Args:
+            fl_list: Lista delle FL, nell'ordine delle righe (può contenere duplicati)
+            df_parse_precedente: Parse della chiamata precedente, indicizzato per FL (None alla prima chiamata)
+        
+        Returns:
+            Tupla (DataFrame delle FL nell'ordine di fl_list, parse da conservare per la chiamata
+            successiva, limitato alle FL di fl_list)
+            
+        Raises:
+            ValueError: Se fl_list è vuota o l'elaborazione delle FL nuove non riesce
+        """
+        if len(fl_list) == 0:
+            raise ValueError("Nessuna FL da elaborare")
+
+        fl_nuove = pd.Index(fl_list).unique()
+        if df_parse_precedente is not None:
+            fl_nuove = fl_nuove.difference(df_parse_precedente.index)
+
+        if len(fl_nuove) == 0:
+            # Tutte le FL sono già state elaborate: riutilizzo il parse precedente
+            df_parse = df_parse_precedente
+        else:
+            # Aggiunge le colonne per i livelli e la lunghezza
+            df, error = DataFrameTools.add_level_lunghezza(pd.DataFrame(list(fl_nuove), columns=['FL']), 'FL')
+            if error is not None:
+                raise ValueError(f"Errore nella creazione delle colonne di livello: {error}")
+
+            # Aggiunge la colonna <Check> per la verifica della presenza delle singole FL nelle tabelle globali
+            df, error = DataFrameTools.add_concatenated_column_FL(df, "Livello_6", "Livello_5", "Livello_4", "Livello_3", "FL_Lunghezza")
+            if error is not None:
+                raise ValueError(f"Errore nella creazione della colonna Check: {error}")
+            print(f"Aggiunte colonne di livello e Check al DF delle FL ({len(df)} FL nuove o modificate)")
+
+            df_parse = df.set_index('FL')
+            if df_parse_precedente is not None:
+                df_parse = pd.concat([df_parse_precedente, df_parse])
+
+        # Ricompongo il DataFrame nell'ordine delle righe e conservo solo le FL presenti nella lista
+        return df_parse.loc[fl_list].reset_index(), df_parse[df_parse.index.isin(fl_list)]
     
     @staticmethod
     def add_concatenated_column_SAP(df: pd.DataFrame, 
@@ -976,21 +1414,14 @@ class DataFrameTools:
         if not all(col in df.columns for col in required_cols):
             raise ValueError("Una o più colonne specificate non esistono nel DataFrame")
 
-        def create_concatenated_value(row):
-            if (row[col3].strip(' \t\n\r') != ""):
-                result = f"{str(row[col1].strip(' \t\n\r'))}{separator}{str(row[col2].strip(' \t\n\r'))}{separator}{str(row[col3].strip(' \t\n\r'))}{separator}{str(str(row[col4]).strip(' \t\n\r'))}"
-                return result
-            elif (row[col2].strip(' \t\n\r') != ""):
-                result = f"{str(row[col1].strip(' \t\n\r'))}{separator}{str(row[col2].strip(' \t\n\r'))}{separator}{str(str(row[col4]).strip(' \t\n\r'))}"
-                return result
-            elif (row[col1].strip(' \t\n\r') != ""):
-                result = f"{str(row[col1].strip(' \t\n\r'))}{separator}{str(str(row[col4]).strip(' \t\n\r'))}"
-                return result
-            else:
-                return None    
-        
+        rami = [
+            (col3, [col1, col2, col3, col4]),
+            (col2, [col1, col2, col4]),
+            (col1, [col1, col4]),
+        ]
+
         df_copy = df.copy()
-        df_copy[new_column_name] = df_copy.apply(create_concatenated_value, axis=1)
+        df_copy[new_column_name] = DataFrameTools.build_check_key(df_copy, rami, separator)
         return df_copy    
     
     @staticmethod
@@ -1,5 +1,284 @@
+import os
+import json
+import pickle
+import threading
+import time
 import pandas as pd
 
+
+class ConfigRegistry:
+    """
+    Registro in memoria dei file di configurazione CSV (Country, Technology, Mask_FL, ...).
+
+    Ogni file viene letto una sola volta per processo e le colonne usate nelle ricerche vengono
+    indicizzate in dizionari valore -> posizioni delle righe, così che ogni ricerca costi O(1).
+    Il file viene riletto solo se la data di modifica cambia.
+    """
+
+    # percorso assoluto -> (mtime, DataFrame, {colonna: {valore: [posizioni]}})
+    _tabelle = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_tabella(cls, file_csv):
+        """
+        Restituisce il DataFrame del file di configurazione, rileggendolo solo se è stato modificato
+        
+        Parametri:
+        file_csv: file contenente i dati
+        """
+        percorso = os.path.abspath(file_csv)
+        mtime = os.stat(percorso).st_mtime_ns
+
+        with cls._lock:
+            voce = cls._tabelle.get(percorso)
+            if voce is None or voce[0] != mtime:
+                voce = (mtime, pd.read_csv(percorso, sep=';'), {})
+                cls._tabelle[percorso] = voce
+        return voce
+
+    @classmethod
+    def cerca(cls, file_csv, valore_da_cercare, colonna_da_cercare, colonna_da_restituire):
+        """
+        Cerca un valore in una colonna e restituisce il valore corrispondente in un'altra colonna
+
+        Parametri:
+        file_csv: file contenente i dati
+        valore_da_cercare: il valore da trovare
+        colonna_da_cercare: nome della colonna in cui cercare
+        colonna_da_restituire: nome della colonna da cui restituire il valore
+
+        Eccezioni:
+        OSError se il file non esiste, KeyError se una delle colonne non esiste
+        """
+        _, df, indici = cls.get_tabella(file_csv)
+
+        indice = indici.get(colonna_da_cercare)
+        if indice is None:
+            indice = {}
+            for posizione, valore in enumerate(df[colonna_da_cercare].tolist()):
+                # I valori mancanti (NaN) non corrispondono mai a nessuna ricerca
+                if pd.isna(valore):
+                    continue
+                indice.setdefault(valore, []).append(posizione)
+            indici[colonna_da_cercare] = indice
+
+        try:
+            posizioni = indice.get(valore_da_cercare)
+        except TypeError:
+            # Valore non utilizzabile come chiave (es. lista): nessuna corrispondenza
+            posizioni = None
+
+        if not posizioni:
+            return None  # Nessuna corrispondenza trovata
+        elif len(posizioni) > 1:
+            print("Attenzione: trovate multiple corrispondenze")
+
+        # Restituisce il valore della colonna richiesta
+        return df[colonna_da_restituire].iat[posizioni[0]]
+
+    @classmethod
+    def svuota(cls):
+        """Elimina tutte le tabelle caricate, che verranno rilette alla ricerca successiva"""
+        with cls._lock:
+            cls._tabelle.clear()
+
+
+class SAPSnapshotStore:
+    """
+    Archivio locale delle tabelle globali SAP (ZPMR_CONTROL_FL1, ZPMR_CONTROL_FL2, ZPMR_CTRL_ASS,
+    ZPM4R_GL_T_FL) già estratte e pulite, una per tabella e tecnologia.
+
+    Ogni snapshot è un file pickle nella cartella indicata che contiene il DataFrame, accompagnato
+    da un piccolo file JSON con i metadati (istante dell'estrazione e valori coperti): la validità
+    e la copertura di uno snapshot si controllano leggendo solo i metadati, senza caricare la tabella.
+    Uno snapshot più vecchio di ttl_minuti è considerato scaduto e la tabella deve essere estratta
+    di nuovo da SAP. Dopo un caricamento in SAP lo snapshot della tabella aggiornata va invalidato.
+
+    Uno snapshot può essere parziale (estrazione selettiva): in questo caso registra anche l'insieme
+    dei valori di 'Valore Livello' estratti ed è valido solo per le richieste che ne sono coperte.
+    """
+
+    VERSIONE = 2
+
+    def __init__(self, cartella, ttl_minuti):
+        """
+        Parametri:
+        cartella: cartella in cui vengono salvati gli snapshot
+        ttl_minuti: validità degli snapshot in minuti (0 = snapshot sempre scaduti)
+        """
+        self.cartella = cartella
+        self.ttl_secondi = ttl_minuti * 60
+
+    def _percorso(self, tabella, tecnologia):
+        return os.path.join(self.cartella, f"{tabella}_{tecnologia}.pkl")
+
+    def _percorso_metadati(self, tabella, tecnologia):
+        return os.path.join(self.cartella, f"{tabella}_{tecnologia}.json")
+
+    def _leggi_metadati(self, tabella, tecnologia):
+        """
+        Restituisce i metadati dello snapshot ('estratto' e 'valori', come frozenset o None)
+        o None se mancano o non sono leggibili
+        """
+        percorso = self._percorso_metadati(tabella, tecnologia)
+        if not os.path.exists(percorso):
+            return None
+        try:
+            with open(percorso, 'r', encoding='utf-8') as f:
+                metadati = json.load(f)
+            if metadati.get('versione') != self.VERSIONE:
+                return None
+            valori = metadati.get('valori')
+            metadati['valori'] = None if valori is None else frozenset(valori)
+            return metadati
+        except Exception as e:
+            print(f"Attenzione: impossibile leggere i metadati dello snapshot {percorso}: {str(e)}")
+            return None
+
+    def _leggi_dati(self, tabella, tecnologia, metadati):
+        """
+        Restituisce il DataFrame dello snapshot descritto dai metadati, o None se manca, non è leggibile
+        o non corrisponde ai metadati (scrittura interrotta)
+        """
+        percorso = self._percorso(tabella, tecnologia)
+        if not os.path.exists(percorso):
+            return None
+        try:
+            with open(percorso, 'rb') as f:
+                snapshot = pickle.load(f)
+            if snapshot.get('versione') != self.VERSIONE or snapshot.get('estratto') != metadati['estratto']:
+                return None
+            return snapshot['dati']
+        except Exception as e:
+            print(f"Attenzione: impossibile leggere lo snapshot {percorso}: {str(e)}")
+            return None
+
+    def eta(self, tabella, tecnologia):
+        """
+        Restituisce l'età dello snapshot in secondi, None se lo snapshot non esiste
+        """
+        metadati = self._leggi_metadati(tabella, tecnologia)
+        if metadati is None:
+            return None
+        return time.time() - metadati['estratto']
+
+    def _valido(self, tabella, tecnologia):
+        """Restituisce i metadati dello snapshot se esiste e non è scaduto, altrimenti None"""
+        metadati = self._leggi_metadati(tabella, tecnologia)
+        if metadati is None or time.time() - metadati['estratto'] >= self.ttl_secondi:
+            return None
+        return metadati
+
+    def carica(self, tabella, tecnologia, valori=None):
+        """
+        Restituisce il DataFrame dello snapshot se esiste, non è scaduto e copre la richiesta, altrimenti None
+
+        Parametri:
+        tabella: nome della tabella SAP
+        tecnologia: codice della tecnologia usato per l'estrazione
+        valori: valori di 'Valore Livello' richiesti (None = tabella completa)
+        """
+        metadati = self._valido(tabella, tecnologia)
+        if metadati is None:
+            return None
+        coperti = metadati['valori']
+        if coperti is not None and (valori is None or not set(valori) <= coperti):
+            return None
+        # Solo uno snapshot valido e che copre la richiesta viene caricato
+        return self._leggi_dati(tabella, tecnologia, metadati)
+
+    def valori_mancanti(self, tabella, tecnologia, valori):
+        """
+        Restituisce i valori richiesti non coperti dallo snapshot parziale valido della tabella
+        (tutti i valori se lo snapshot non esiste o è scaduto)
+        """
+        metadati = self._valido(tabella, tecnologia)
+        if metadati is None or metadati['valori'] is None:
+            return set(valori)
+        return set(valori) - metadati['valori']
+
+    def aggiorna(self, tabella, tecnologia, df, valori=None):
+        """
+        Registra il risultato di un'estrazione e restituisce i dati da usare per la verifica.
+
+        Con un'estrazione selettiva (valori indicati) le righe vengono unite a quelle dello snapshot
+        parziale ancora valido, mantenendo l'istante della prima estrazione; altrimenti lo snapshot
+        viene sostituito. Un errore di scrittura viene solo segnalato.
+
+        Parametri:
+        df: DataFrame estratto da SAP
+        valori: valori di 'Valore Livello' estratti (None = tabella completa)
+        """
+        estratto = None
+        if valori is not None:
+            valori = set(valori)
+            metadati = self._valido(tabella, tecnologia)
+            dati = None if metadati is None or metadati['valori'] is None else self._leggi_dati(tabella, tecnologia, metadati)
+            if dati is not None:
+                df = pd.concat([dati, df], ignore_index=True).drop_duplicates(ignore_index=True)
+                valori |= metadati['valori']
+                estratto = metadati['estratto']
+        try:
+            self.salva(tabella, tecnologia, df, valori, estratto)
+        except Exception as e:
+            print(f"Attenzione: impossibile salvare lo snapshot di {tabella}: {str(e)}")
+        return df
+
+    def salva(self, tabella, tecnologia, df, valori=None, estratto=None):
+        """
+        Salva il DataFrame estratto come snapshot della tabella per la tecnologia
+
+        Parametri:
+        valori: valori di 'Valore Livello' coperti dallo snapshot (None = tabella completa)
+        estratto: istante dell'estrazione (default: adesso)
+
+        Eccezioni:
+        OSError se il file non può essere scritto
+        """
+        os.makedirs(self.cartella, exist_ok=True)
+        metadati = {
+            'versione': self.VERSIONE,
+            'tabella': tabella,
+            'tecnologia': tecnologia,
+            'estratto': time.time() if estratto is None else estratto,
+            'valori': None if valori is None else sorted(valori)
+        }
+        snapshot = {
+            'versione': self.VERSIONE,
+            'estratto': metadati['estratto'],
+            'dati': df
+        }
+        # Scrivo su file temporanei e li rinomino per non lasciare snapshot incompleti: i dati prima
+        # dei metadati, così che i metadati non descrivano mai dati non ancora scritti
+        percorso = self._percorso(tabella, tecnologia)
+        file_temporaneo = percorso + '.tmp'
+        with open(file_temporaneo, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file_temporaneo, percorso)
+
+        percorso_metadati = self._percorso_metadati(tabella, tecnologia)
+        file_temporaneo = percorso_metadati + '.tmp'
+        with open(file_temporaneo, 'w', encoding='utf-8') as f:
+            json.dump(metadati, f, ensure_ascii=False)
+        os.replace(file_temporaneo, percorso_metadati)
+
+    def invalida(self, tabella, tecnologia=None):
+        """
+        Elimina lo snapshot della tabella per la tecnologia indicata o, se tecnologia è None,
+        per tutte le tecnologie
+        """
+        if not os.path.isdir(self.cartella):
+            return
+        for nome_file in os.listdir(self.cartella):
+            radice, estensione = os.path.splitext(nome_file)
+            if estensione not in ('.pkl', '.json'):
+                continue
+            nome, _, codice = radice.rpartition('_')
+            if nome == tabella and (tecnologia is None or codice == tecnologia):
+                os.remove(os.path.join(self.cartella, nome_file))
+
+
 class FileTools:
     """
     Classe di utility per la manipolazione dei file
@@ -20,26 +299,8 @@ class FileTools:
         colonna_da_restituire: nome della colonna da cui restituire il valore
         """
         try:
-
-            df = pd.read_csv(file_csv, sep=';')
-            """
-            # Pulisco i nomi delle colonne ed i valori da possibili spazi dovuti al caricamento del file
-            df.columns = df.columns.str.strip()
-            for col in df.columns:
-                print(f"'{col}'")  # Le virgolette ci faranno vedere gli spazi
-            df[colonna_da_cercare] = df[colonna_da_cercare].str.strip()
-            """
-
-            # Trova la riga che contiene il valore
-            riga = df[df[colonna_da_cercare] == valore_da_cercare]
-            
-            if len(riga) == 0:
-                return None  # Nessuna corrispondenza trovata
-            elif len(riga) > 1:
-                print("Attenzione: trovate multiple corrispondenze")
-                
-            # Restituisce il valore della colonna richiesta
-            return riga[colonna_da_restituire].iloc[0]
+            # Il registro legge il file una sola volta e lo rilegge solo se viene modificato
+            return ConfigRegistry.cerca(file_csv, valore_da_cercare, colonna_da_cercare, colonna_da_restituire)
             
         except Exception as e:
             print(f"Errore nella ricerca: {str(e)}")
@@ -1,15 +1,877 @@
 import pandas as pd
+import numpy as np
 import re
 import os
+import hashlib
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from DF_Tools import DataFrameTools
 import logging
 from utils.decorators import error_logger
-from typing import Dict, List, Union, Optional, Tuple
+from typing import Dict, FrozenSet, List, Union, Optional, Tuple
 
 # Logger specifico per questo modulo
 logger = logging.getLogger("RegularExpressionsTools")
 
+# Cache dei matcher compilati, indicizzata sull'insieme ordinato di coppie (lunghezza, pattern)
+_GUIDELINE_MATCHER_CACHE = {}
+
+# Versione del formato della cache su disco del DataFrame delle linee guida:
+# va incrementata ogni volta che cambia la logica di costruzione di Make_DF_RE_list
+_GUIDELINE_CACHE_VERSION = 1
+
+# Cache dei compilatori di regole, indicizzata sulle coppie (codice, espressione regolare) di Rules.csv
+_RULE_COMPILER_CACHE = {}
+
+
+def _valori_chiave(serie: pd.Series) -> tuple:
+    """
+    Valori della colonna da usare nella chiave di una cache, con le celle vuote (NaN) sostituite da None:
+    tolist() crea un nuovo NaN a ogni chiamata e NaN è uguale solo a se stesso, per cui una chiave
+    con NaN non verrebbe mai ritrovata
+    """
+    return tuple(serie.astype(object).where(serie.notna(), None).tolist())
+
+
+class RuleCompiler:
+    """
+    Compilatore dei template delle linee guida in espressioni regolari.
+
+    I codici di Rules.csv vengono riuniti in un'unica alternanza precompilata, ordinata per
+    lunghezza decrescente: ogni template viene scandito una sola volta da sinistra a destra
+    e ogni codice trovato (il più lungo possibile, es. 'nn' prima di 'n') viene sostituito
+    con la sua espressione regolare. Il testo già sostituito non viene più esaminato, quindi
+    l'espansione di una regola non può essere riscritta da una regola successiva.
+    """
+
+    def __init__(self, rules_dict: Dict[str, str]):
+        """
+        Args:
+            rules_dict: Dizionario codice -> espressione regolare (da Rules.csv)
+        """
+        self._rules = dict(rules_dict)
+        codici = sorted(self._rules.keys(), key=len, reverse=True)
+        self._codici_re = re.compile("|".join(re.escape(codice) for codice in codici))
+
+    @classmethod
+    def from_dict(cls, rules_dict: Dict[str, str]) -> 'RuleCompiler':
+        """
+        Restituisce il compilatore per il dizionario di regole, riutilizzando quello già costruito
+        per lo stesso insieme di regole.
+        """
+        chiave = tuple(rules_dict.items())
+        compilatore = _RULE_COMPILER_CACHE.get(chiave)
+        if compilatore is None:
+            compilatore = cls(rules_dict)
+            _RULE_COMPILER_CACHE[chiave] = compilatore
+        return compilatore
+
+    def _sostituisci(self, match) -> str:
+        return self._rules[match.group(0)]
+
+    def espandi(self, fl_value: str) -> str:
+        """
+        Converte un singolo template (es. 'kkE-yyyy-0A') nella corrispondente espressione regolare.
+        """
+        return self._codici_re.sub(self._sostituisci, fl_value)
+
+    def espandi_colonna(self, valori: pd.Series) -> pd.Series:
+        """
+        Converte un'intera colonna di template nelle corrispondenti espressioni regolari.
+
+        Args:
+            valori: Serie dei template (es. colonna FL o Check)
+
+        Returns:
+            pd.Series: Serie delle espressioni regolari; i valori non validi (nulli o non stringa)
+                       vengono segnalati e convertiti in stringa vuota
+        """
+        validi = valori.map(lambda v: isinstance(v, str))
+        for valore in valori[~validi]:
+            print(f"Attenzione: Valore non valido nella colonna {valori.name}: {valore}")
+
+        risultato = pd.Series("", index=valori.index, dtype=object, name=valori.name)
+        if validi.any():
+            risultato[validi] = valori[validi].str.replace(self._codici_re, self._sostituisci, regex=True)
+        return risultato
+
+
+class TemplateSignatureIndex:
+    """
+    Indice delle firme posizionali dei template delle linee guida.
+
+    Un template composto solo da caratteri letterali e classi di caratteri a larghezza fissa
+    (es. [A-Z][A-Z]E-[0-9A-Z]{4}-0A) equivale a una classe di caratteri per ogni posizione.
+    Per ogni coppia (lunghezza FL, numero di caratteri) l'indice memorizza, posizione per
+    posizione, una mappa carattere -> maschera di bit dei template che accettano quel carattere:
+    l'insieme dei template compatibili con una FL si ottiene con un AND delle maschere lette
+    per ciascun carattere, con un costo che dipende dalla lunghezza della FL e non dal numero
+    dei template. I template con lookahead (es. le regole nn e pp) vengono indicizzati sulla
+    loro firma posizionale e confermati con la relativa espressione regolare.
+    """
+
+    # Elementi ammessi in un template posizionale: classe [..] o carattere letterale,
+    # eventualmente ripetuti {n} volte, oppure un lookahead negativo (?!..)
+    _TOKEN_RE = re.compile(
+        r"(?:\[(?P<classe>[^\]\\^]+)\]|(?P<letterale>[A-Za-z0-9 _-]))(?:\{(?P<ripetizioni>\d+)\})?"
+        r"|(?P<lookahead>\(\?![^()\\]*\))"
+    )
+
+    def __init__(self):
+        # (lunghezza, numero caratteri) -> lista per posizione di {classe: maschera}
+        self._classi = {}
+        # (lunghezza, numero caratteri) -> (lista per posizione di {carattere: maschera}, maschera completa)
+        self._tabelle = {}
+        # lunghezza -> {indice: regex compilata} per i template da confermare con la regex
+        self._verifiche = {}
+
+    @staticmethod
+    def _espandi_classe(classe: str) -> Optional[FrozenSet[str]]:
+        """
+        Espande il contenuto di una classe di caratteri (es. '0-9A-Z') nell'insieme dei caratteri ammessi
+        """
+        caratteri = set()
+        i = 0
+        while i < len(classe):
+            if i + 2 < len(classe) and classe[i + 1] == '-':
+                inizio, fine = ord(classe[i]), ord(classe[i + 2])
+                if inizio > fine:
+                    return None
+                caratteri.update(chr(c) for c in range(inizio, fine + 1))
+                i += 3
+            else:
+                caratteri.add(classe[i])
+                i += 1
+        return frozenset(caratteri)
+
+    @classmethod
+    def firma_posizionale(cls, pattern: str) -> Optional[Tuple[List[FrozenSet[str]], bool]]:
+        """
+        Scompone un'espressione regolare nella sua firma posizionale.
+
+        Args:
+            pattern: Espressione regolare del template (colonna FL_RE)
+
+        Returns:
+            Tupla (lista delle classi di caratteri per posizione, True se il template contiene
+            lookahead e va confermato con la regex), None se il pattern non è posizionale
+        """
+        if not isinstance(pattern, str):
+            return None
+
+        firma = []
+        con_lookahead = False
+        posizione = 0
+        while posizione < len(pattern):
+            token = cls._TOKEN_RE.match(pattern, posizione)
+            if token is None:
+                return None
+            posizione = token.end()
+
+            if token.group('lookahead'):
+                con_lookahead = True
+                continue
+
+            if token.group('classe') is not None:
+                caratteri = cls._espandi_classe(token.group('classe'))
+                if caratteri is None:
+                    return None
+            else:
+                caratteri = frozenset(token.group('letterale'))
+
+            ripetizioni = int(token.group('ripetizioni')) if token.group('ripetizioni') else 1
+            firma.extend([caratteri] * ripetizioni)
+
+        return firma, con_lookahead
+
+    def aggiungi(self, lunghezza, indice: int, pattern: str) -> bool:
+        """
+        Aggiunge un template all'indice.
+
+        Args:
+            lunghezza: Numero di livelli della FL del template
+            indice: Posizione del template nella lista dei pattern della stessa lunghezza
+            pattern: Espressione regolare del template
+
+        Returns:
+            bool: True se il template è stato indicizzato, False se non è posizionale
+                  e deve essere verificato con la regex
+        """
+        risultato = self.firma_posizionale(pattern)
+        if risultato is None:
+            return False
+
+        firma, con_lookahead = risultato
+        bit = 1 << indice
+
+        classi = self._classi.setdefault((lunghezza, len(firma)), [{} for _ in firma])
+        for posizione, caratteri in enumerate(firma):
+            classi[posizione][caratteri] = classi[posizione].get(caratteri, 0) | bit
+
+        if con_lookahead:
+            self._verifiche.setdefault(lunghezza, {})[indice] = re.compile(pattern)
+
+        # L'indice va ricostruito alla prossima ricerca
+        self._tabelle.clear()
+        return True
+
+    def _tabella(self, lunghezza, numero_caratteri: int):
+        """
+        Restituisce le mappe carattere -> maschera per la coppia (lunghezza, numero di caratteri)
+        """
+        chiave = (lunghezza, numero_caratteri)
+        tabella = self._tabelle.get(chiave)
+        if tabella is None:
+            classi = self._classi.get(chiave)
+            if classi is None:
+                return None
+            posizioni = []
+            maschera_completa = 0
+            for classi_posizione in classi:
+                mappa = {}
+                for caratteri, maschera in classi_posizione.items():
+                    maschera_completa |= maschera
+                    for carattere in caratteri:
+                        mappa[carattere] = mappa.get(carattere, 0) | maschera
+                posizioni.append(mappa)
+            tabella = (posizioni, maschera_completa)
+            self._tabelle[chiave] = tabella
+        return tabella
+
+    def candidati(self, fl_value: str, lunghezza) -> List[int]:
+        """
+        Restituisce gli indici (in ordine crescente) dei template indicizzati che corrispondono alla FL.
+
+        Args:
+            fl_value: FL da verificare
+            lunghezza: Numero di livelli della FL
+
+        Returns:
+            Lista degli indici dei template corrispondenti
+        """
+        if not isinstance(fl_value, str):
+            raise TypeError(f"expected string or bytes-like object, got '{type(fl_value).__name__}'")
+
+        tabella = self._tabella(lunghezza, len(fl_value))
+        if tabella is None:
+            return []
+
+        posizioni, maschera = tabella
+        for mappa, carattere in zip(posizioni, fl_value):
+            maschera &= mappa.get(carattere, 0)
+            if not maschera:
+                return []
+
+        verifiche = self._verifiche.get(lunghezza, {})
+        indici = []
+        while maschera:
+            bit = maschera & -maschera
+            maschera ^= bit
+            indice = bit.bit_length() - 1
+            # I template con lookahead vengono confermati con la regex
+            regex = verifiche.get(indice)
+            if regex is None or regex.fullmatch(fl_value):
+                indici.append(indice)
+        return indici
+
+
+class GuidelineMatcher:
+    """
+    Matcher compilato delle espressioni regolari delle linee guida.
+
+    I pattern vengono raggruppati per lunghezza della FL (numero di livelli). I template
+    posizionali passano dall'indice delle firme (TemplateSignatureIndex); gli altri vengono
+    combinati, per ogni lunghezza, in un'unica alternanza con gruppi nominati (p0, p1, ...)
+    che permette di risalire al template vincente con una sola chiamata al motore regex.
+    Per rilevare le FL ambigue la ricerca riparte dal pattern successivo al vincente: i pattern
+    rimanenti vengono coperti da un albero di alternanze (ogni nodo copre un intervallo di
+    indici), compilate solo quando servono e riutilizzate per tutte le FL successive.
+    """
+
+    def __init__(self, patterns_by_length: Dict[int, List[str]]):
+        """
+        Inizializza il matcher verificando la validità di tutte le espressioni regolari.
+
+        Args:
+            patterns_by_length: Dizionario lunghezza FL -> lista dei pattern nell'ordine originale
+
+        Raises:
+            ValueError: Se una o più espressioni regolari non sono valide
+        """
+        # Verifichiamo che le espressioni regolari siano valide
+        invalid_patterns = []
+        for patterns in patterns_by_length.values():
+            for pattern in patterns:
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    invalid_patterns.append((pattern, str(e)))
+
+        if invalid_patterns:
+            error_details = "; ".join([f"'{p}': {e}" for p, e in invalid_patterns])
+            raise ValueError(f"Espressioni regolari non valide: {error_details}")
+
+        self._patterns = {lunghezza: list(patterns) for lunghezza, patterns in patterns_by_length.items()}
+
+        # Identificativo dell'insieme di pattern, usato per riferirsi al matcher nei processi worker
+        self.id_regole = hashlib.sha1(repr(list(self._patterns.items())).encode('utf-8')).hexdigest()
+
+        # Indicizzo i template posizionali; gli altri restano da verificare con le alternanze
+        self._indice = TemplateSignatureIndex()
+        self._non_posizionali = {}
+        for lunghezza, patterns in self._patterns.items():
+            for indice, pattern in enumerate(patterns):
+                if not self._indice.aggiungi(lunghezza, indice, pattern):
+                    self._non_posizionali.setdefault(lunghezza, []).append(indice)
+
+        # Alternanze compilate, indicizzate per (lunghezza, primo indice, indice finale escluso)
+        self._alternanze = {}
+
+    @classmethod
+    def from_dataframe(cls, df_regex: pd.DataFrame, colonna_re: str = 'FL_RE') -> 'GuidelineMatcher':
+        """
+        Restituisce il matcher per il DataFrame delle espressioni regolari, costruendolo
+        solo se lo stesso insieme di pattern non è già stato compilato in precedenza.
+
+        Args:
+            df_regex: DataFrame con le colonne colonna_re e 'FL_Lunghezza'
+            colonna_re: Nome della colonna contenente le espressioni regolari
+
+        Returns:
+            GuidelineMatcher: Matcher compilato per l'insieme di pattern
+        """
+        chiave = tuple(zip(_valori_chiave(df_regex['FL_Lunghezza']), _valori_chiave(df_regex[colonna_re])))
+
+        matcher = _GUIDELINE_MATCHER_CACHE.get(chiave)
+        if matcher is None:
+            patterns_by_length = {}
+            for lunghezza, pattern in zip(df_regex['FL_Lunghezza'].tolist(), df_regex[colonna_re].tolist()):
+                patterns_by_length.setdefault(lunghezza, []).append(pattern)
+            matcher = cls(patterns_by_length)
+            _GUIDELINE_MATCHER_CACHE[chiave] = matcher
+
+        return matcher
+
+    @property
+    def patterns_by_length(self) -> Dict[int, List[str]]:
+        """Pattern del matcher raggruppati per lunghezza della FL, nell'ordine originale"""
+        return self._patterns
+
+    def _alternanza(self, lunghezza, inizio: int, fine: int):
+        """
+        Restituisce l'alternanza compilata dei pattern non posizionali di una lunghezza
+        nell'intervallo [inizio, fine) della lista dei pattern non posizionali
+        """
+        chiave = (lunghezza, inizio, fine)
+        compiled = self._alternanze.get(chiave)
+        if compiled is None:
+            patterns = self._patterns[lunghezza]
+            indici = self._non_posizionali[lunghezza]
+            compiled = re.compile("|".join(f"(?P<p{i}>{patterns[indici[i]]})" for i in range(inizio, fine)))
+            self._alternanze[chiave] = compiled
+        return compiled
+
+    def _primo_pattern(self, fl_value: str, lunghezza, inizio: int, fine: int, minimo: int) -> Optional[int]:
+        """
+        Restituisce la posizione del primo pattern non posizionale dell'intervallo [inizio, fine)
+        con posizione >= minimo che corrisponde alla FL, oppure None se nessun pattern corrisponde
+        """
+        if fine <= minimo:
+            return None
+
+        # Nodo interamente coperto: una sola chiamata sull'alternanza del nodo
+        if inizio >= minimo:
+            match = self._alternanza(lunghezza, inizio, fine).fullmatch(fl_value)
+            if match is None:
+                return None
+            # Il nome del gruppo vincente contiene la posizione del pattern (p<posizione>)
+            return int(match.lastgroup[1:])
+
+        # Nodo coperto parzialmente: cerco prima nella metà sinistra e poi nella destra
+        meta = (inizio + fine) // 2
+        posizione = self._primo_pattern(fl_value, lunghezza, inizio, meta, minimo)
+        if posizione is None:
+            posizione = self._primo_pattern(fl_value, lunghezza, meta, fine, minimo)
+        return posizione
+
+    def trova_indici(self, fl_value: str, lunghezza) -> Optional[List[int]]:
+        """
+        Trova le posizioni dei pattern della lunghezza indicata che corrispondono interamente alla FL.
+
+        Args:
+            fl_value: FL da verificare
+            lunghezza: Numero di livelli della FL
+
+        Returns:
+            Lista crescente delle posizioni dei pattern corrispondenti nella lista della lunghezza,
+            None se non esistono pattern per la lunghezza indicata
+        """
+        patterns = self._patterns.get(lunghezza)
+        if not patterns:
+            return None
+
+        # Template posizionali: ricerca sull'indice delle firme
+        indici = self._indice.candidati(fl_value, lunghezza)
+
+        # Template non posizionali: ricerca sulle alternanze
+        non_posizionali = self._non_posizionali.get(lunghezza)
+        if non_posizionali:
+            indici_regex = []
+            posizione = self._primo_pattern(fl_value, lunghezza, 0, len(non_posizionali), 0)
+            while posizione is not None:
+                indici_regex.append(non_posizionali[posizione])
+                posizione = self._primo_pattern(fl_value, lunghezza, 0, len(non_posizionali), posizione + 1)
+            if indici_regex:
+                indici = sorted(indici + indici_regex)
+
+        return indici
+
+    def trova_pattern(self, fl_value: str, lunghezza) -> Optional[List[str]]:
+        """
+        Trova tutti i pattern della lunghezza indicata che corrispondono interamente alla FL.
+
+        Args:
+            fl_value: FL da verificare
+            lunghezza: Numero di livelli della FL
+
+        Returns:
+            Lista dei pattern corrispondenti nell'ordine originale,
+            None se non esistono pattern per la lunghezza indicata
+        """
+        indici = self.trova_indici(fl_value, lunghezza)
+        if indici is None:
+            return None
+
+        patterns = self._patterns[lunghezza]
+        return [patterns[indice] for indice in indici]
+
+    def verifica(self, fl_value: str, lunghezza) -> Union[bool, str]:
+        """
+        Verifica una FL e restituisce il valore da riportare nella colonna 'Check_Result'.
+
+        Args:
+            fl_value: FL da verificare
+            lunghezza: Numero di livelli della FL
+
+        Returns:
+            True se la FL corrisponde a un solo pattern, altrimenti il messaggio di errore
+        """
+        matching_patterns = self.trova_pattern(fl_value, lunghezza)
+
+        if matching_patterns is None:
+            return f"Nessuna espressione regolare disponibile per lunghezza {lunghezza}"
+
+        matching_patterns_count = len(matching_patterns)
+        if matching_patterns_count == 0:
+            return "Non corrisponde a nessuna espressione regolare valida"
+        elif matching_patterns_count == 1:
+            return True
+        else:
+            # Più di un pattern corrisponde, questo è un errore
+            patterns_str = ", ".join(matching_patterns)
+            return f"Errore: la FL corrisponde a {matching_patterns_count} espressioni regolari: {patterns_str}"
+
+
+# Cache dei matcher delle chiavi Check, indicizzata su pattern, lunghezze e attributi del DataFrame
+_CHECK_KEY_MATCHER_CACHE = {}
+
+class CheckKeyMatcher:
+    """
+    Matcher dei codici Check (es. 'GEN01_0A_4') con le espressioni regolari della colonna Check_RE.
+
+    Viene costruito una sola volta per ogni tabella delle linee guida e condiviso dai costruttori
+    delle tabelle di upload (CTRL_ASS e ZPM4R_GL_T_FL). I pattern vengono raggruppati per lunghezza
+    della FL come nel dizionario originale (un pattern ripetuto mantiene la prima posizione e gli
+    attributi dell'ultima riga) e la ricerca passa dal GuidelineMatcher, quindi costa O(1) per i
+    template posizionali invece di una fullmatch per ogni pattern. Se per la lunghezza del codice
+    non esistono pattern, la ricerca viene estesa a tutte le lunghezze.
+    """
+
+    # Chiave del gruppo che contiene i pattern di tutte le lunghezze, usato come ripiego
+    _TUTTE_LE_LUNGHEZZE = '*'
+
+    def __init__(self, regex_df: pd.DataFrame, colonne_attributi: List[str]):
+        """
+        Args:
+            regex_df: DataFrame con le colonne 'Check_RE', 'FL_Lunghezza' e colonne_attributi
+            colonne_attributi: Colonne da restituire per il pattern corrispondente
+
+        Raises:
+            ValueError: Se un'espressione regolare non è valida
+            KeyError: Se manca una delle colonne richieste
+        """
+        colonne = [regex_df[colonna].tolist() for colonna in ['Check_RE', 'FL_Lunghezza', *colonne_attributi]]
+
+        # lunghezza -> {pattern: attributi}, nell'ordine di prima comparsa del pattern
+        attributi_per_lunghezza = {}
+        for pattern, fl_length, *valori in zip(*colonne):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Espressione regolare non valida '{pattern}': {str(e)}")
+
+            chiave = self._chiave_lunghezza(fl_length)
+            attributi_per_lunghezza.setdefault(chiave, {})[pattern] = dict(zip(colonne_attributi, valori))
+
+        self._patterns = {}
+        self._attributi = {}
+        tutti_patterns = []
+        tutti_attributi = []
+        for chiave, attributi in attributi_per_lunghezza.items():
+            self._patterns[chiave] = list(attributi.keys())
+            self._attributi[chiave] = list(attributi.values())
+            tutti_patterns.extend(attributi.keys())
+            tutti_attributi.extend(attributi.values())
+
+        patterns_by_length = {(False, chiave): patterns for chiave, patterns in self._patterns.items()}
+        patterns_by_length[(True, self._TUTTE_LE_LUNGHEZZE)] = tutti_patterns
+        self._tutti_attributi = tutti_attributi
+        self._matcher = GuidelineMatcher(patterns_by_length)
+
+    @staticmethod
+    def _chiave_lunghezza(fl_length):
+        """
+        Converte la lunghezza della FL nella chiave del gruppo di pattern (None se non convertibile)
+        """
+        try:
+            if isinstance(fl_length, (int, float)):
+                return int(fl_length)
+            if isinstance(fl_length, str) and fl_length.strip().isdigit():
+                return int(fl_length)
+            return None
+        except (ValueError, TypeError, OverflowError):
+            return None
+
+    @classmethod
+    def from_dataframe(cls, regex_df: pd.DataFrame, colonne_attributi: List[str]) -> 'CheckKeyMatcher':
+        """
+        Restituisce il matcher per il DataFrame delle linee guida, costruendolo solo
+        la prima volta che la stessa tabella viene utilizzata
+        """
+        chiave = (tuple(colonne_attributi),) + tuple(
+            _valori_chiave(regex_df[colonna]) for colonna in ['Check_RE', 'FL_Lunghezza', *colonne_attributi]
+        )
+        matcher = _CHECK_KEY_MATCHER_CACHE.get(chiave)
+        if matcher is None:
+            matcher = cls(regex_df, colonne_attributi)
+            _CHECK_KEY_MATCHER_CACHE[chiave] = matcher
+        return matcher
+
+    def corrispondenza(self, code: str, fl_length: int) -> dict:
+        """
+        Restituisce gli attributi del pattern che corrisponde al codice.
+
+        Args:
+            code: Codice Check da verificare
+            fl_length: Lunghezza della FL indicata dall'ultimo carattere del codice
+
+        Returns:
+            dict: Attributi (colonne_attributi) del pattern corrispondente
+
+        Raises:
+            ValueError: Se il codice non corrisponde a nessun pattern o corrisponde a più pattern
+        """
+        if self._patterns.get(fl_length):
+            chiave = (False, fl_length)
+            attributi = self._attributi[fl_length]
+        else:
+            # Se non ci sono pattern per questa lunghezza, provo con tutte le regex
+            chiave = (True, self._TUTTE_LE_LUNGHEZZE)
+            attributi = self._tutti_attributi
+
+        indici = self._matcher.trova_indici(code, chiave) or []
+
+        if not indici:
+            raise ValueError(f"Il codice {code} non corrisponde a nessuna espressione regolare")
+        elif len(indici) > 1:
+            patterns = self._matcher.patterns_by_length[chiave]
+            raise ValueError(f"Il codice {code} corrisponde a più espressioni regolari: {', '.join(patterns[i] for i in indici)}")
+
+        return attributi[indici[0]]
+
+
+# Cache delle tabelle di smistamento per categoria, indicizzata sul dizionario delle categorie
+_CATEGORY_DISPATCHER_CACHE = {}
+
+class CategoryDispatcher:
+    """
+    Tabella di smistamento delle FL nelle categorie definite dal dizionario di regex (es. SubStation, Common).
+
+    I pattern delle categorie hanno quasi sempre la forma ^<testa>-<codice>, dove la testa è un
+    template posizionale a larghezza fissa (es. ^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-) e il codice un valore
+    letterale del livello 3 (0A, 00, ZZ, ...). Per questi pattern la testa viene verificata una sola
+    volta per tutte le FL e la categoria si ottiene con una ricerca del codice in un dizionario;
+    solo i pattern di altra forma vengono verificati con la regex. Come nel filtro originale
+    ogni riga viene assegnata alla prima categoria del dizionario che la riconosce.
+    """
+
+    # Pattern ancorato all'inizio composto da una testa che termina con '-' e da un codice letterale
+    _PATTERN_LETTERALE_RE = re.compile(r"\^(?P<testa>.*-)(?P<letterale>[A-Za-z0-9]+)")
+
+    def __init__(self, regex_dict: Dict[str, List[str]]):
+        """
+        Args:
+            regex_dict: Dizionario categoria -> lista di regex in OR tra loro
+        """
+        self.categorie = list(regex_dict.keys())
+        # testa -> (regex compilata, larghezza, {lunghezza codice: {codice: posizione categoria}})
+        self._teste = {}
+        # (posizione categoria, regex compilata) per i pattern che non hanno la forma testa-codice
+        self._regex = []
+
+        for rango, patterns in enumerate(regex_dict.values()):
+            for pattern in patterns or []:
+                try:
+                    regex = re.compile(pattern)
+                except re.error:
+                    print(f"Avviso: '{pattern}' non è un'espressione regolare valida, verrà ignorata")
+                    continue
+
+                scomposto = self._scomponi(pattern)
+                if scomposto is None:
+                    self._regex.append((rango, regex))
+                    continue
+
+                testa, larghezza, letterale = scomposto
+                voce = self._teste.setdefault(testa, (re.compile(testa), larghezza, {}))
+                # A parità di codice vince la prima categoria
+                voce[2].setdefault(len(letterale), {}).setdefault(letterale, rango)
+
+    @classmethod
+    def from_dict(cls, regex_dict: Dict[str, List[str]]) -> 'CategoryDispatcher':
+        """
+        Restituisce la tabella di smistamento per il dizionario di categorie,
+        costruendola solo la prima volta che il dizionario viene utilizzato
+        """
+        chiave = tuple((categoria, tuple(patterns or ())) for categoria, patterns in regex_dict.items())
+        dispatcher = _CATEGORY_DISPATCHER_CACHE.get(chiave)
+        if dispatcher is None:
+            dispatcher = cls(regex_dict)
+            _CATEGORY_DISPATCHER_CACHE[chiave] = dispatcher
+        return dispatcher
+
+    @staticmethod
+    def _scomponi(pattern: str) -> Optional[Tuple[str, int, str]]:
+        """
+        Scompone un pattern nella forma ^<testa>-<codice>.
+
+        Returns:
+            Tupla (testa, larghezza della testa, codice) oppure None se il pattern
+            non ha una testa posizionale a larghezza fissa seguita da un codice letterale
+        """
+        match = CategoryDispatcher._PATTERN_LETTERALE_RE.fullmatch(pattern)
+        if match is None:
+            return None
+
+        firma = TemplateSignatureIndex.firma_posizionale(match.group('testa'))
+        if firma is None or firma[1]:
+            return None
+
+        return match.group('testa'), len(firma[0]), match.group('letterale')
+
+    def assegna(self, valori: pd.Series) -> np.ndarray:
+        """
+        Assegna ogni valore alla prima categoria che lo riconosce.
+
+        Args:
+            valori: Serie delle FL da classificare
+
+        Returns:
+            np.ndarray: Posizione della categoria in self.categorie per ciascun valore,
+                        len(self.categorie) per i valori che non appartengono a nessuna categoria
+        """
+        nessuna = len(self.categorie)
+        ranghi = np.full(len(valori), nessuna, dtype=np.int64)
+
+        for regex_testa, larghezza, tabelle in self._teste.values():
+            # Verifico la testa una sola volta per tutti i codici che la condividono
+            con_testa = valori.str.match(regex_testa).eq(True).to_numpy()
+            if not con_testa.any():
+                continue
+
+            coda = valori[con_testa].str.slice(larghezza)
+            for lunghezza, tabella in tabelle.items():
+                trovati = coda.str.slice(0, lunghezza).map(tabella).fillna(nessuna).to_numpy(dtype=np.int64)
+                ranghi[con_testa] = np.minimum(ranghi[con_testa], trovati)
+
+        for rango, regex in self._regex:
+            corrisponde = valori.str.contains(regex, regex=True).eq(True).to_numpy()
+            ranghi[corrisponde & (ranghi > rango)] = rango
+
+        return ranghi
+
+
+class VerificaMemo:
+    """
+    Memoria dei risultati della verifica delle FL con le linee guida.
+
+    Per ogni FL già verificata conserva la categoria e il valore di Check_Result, validi finché
+    non cambiano le linee guida o il dizionario delle categorie (impronta delle regole). Alla
+    verifica successiva vengono elaborate solo le FL nuove o modificate; le altre riutilizzano
+    il risultato memorizzato.
+    """
+
+    def __init__(self, max_voci: int = 500000):
+        """
+        Args:
+            max_voci: Numero massimo di FL memorizzate; superato il limite la memoria viene svuotata
+        """
+        self.max_voci = max_voci
+        self._impronta_regole = None
+        self._verdetti = {}
+
+    @staticmethod
+    def impronta_regole(df_regex: pd.DataFrame, categorie_dict: Dict[str, List[str]]) -> str:
+        """
+        Calcola l'impronta dell'insieme di regole: pattern delle linee guida con la loro lunghezza
+        e dizionario delle categorie
+        """
+        impronta = hashlib.sha1()
+        impronta.update(repr(df_regex['FL_Lunghezza'].tolist()).encode('utf-8'))
+        impronta.update(repr(df_regex['FL_RE'].tolist()).encode('utf-8'))
+        impronta.update(repr(list(categorie_dict.items())).encode('utf-8'))
+        return impronta.hexdigest()
+
+    def svuota(self):
+        """Elimina tutti i risultati memorizzati"""
+        self._verdetti.clear()
+
+    def verifica(self,
+                 df_fl_completo: pd.DataFrame,
+                 df_regex_completo: pd.DataFrame,
+                 categorie_dict: Dict[str, List[str]],
+                 colonna_fl: str = 'FL',
+                 n_workers: int = 1,
+                 chunk_size: int = 20000) -> pd.DataFrame:
+        """
+        Esegue verifica_fl_con_regex_per_categorie solo sulle FL non ancora verificate e
+        ricompone il risultato completo, con le righe nello stesso ordine della verifica completa.
+        """
+        impronta = self.impronta_regole(df_regex_completo, categorie_dict)
+        if impronta != self._impronta_regole or len(self._verdetti) > self.max_voci:
+            self._verdetti.clear()
+            self._impronta_regole = impronta
+
+        # Verifico solo le FL nuove o modificate (una volta per valore)
+        nuove = ~df_fl_completo[colonna_fl].map(self._verdetti.__contains__).astype(bool)
+        if nuove.any():
+            df_nuove = df_fl_completo[nuove].drop_duplicates(subset=[colonna_fl])
+            print(f"Verifica incrementale: {len(df_nuove)} FL nuove o modificate su {len(df_fl_completo)}")
+            risultato = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+                df_nuove.copy(), df_regex_completo, categorie_dict, colonna_fl,
+                n_workers=n_workers, chunk_size=chunk_size
+            )
+            if not risultato.empty:
+                self._verdetti.update(zip(
+                    risultato[colonna_fl].tolist(),
+                    zip(risultato['Categoria'].tolist(), risultato['Check_Result'].tolist())
+                ))
+
+        # Le FL delle categorie la cui verifica non è riuscita non compaiono nel risultato
+        note = df_fl_completo[colonna_fl].map(self._verdetti.__contains__).astype(bool)
+        df_risultati = df_fl_completo[note].copy()
+        if df_risultati.empty:
+            return pd.DataFrame()
+
+        verdetti = [self._verdetti[fl_value] for fl_value in df_risultati[colonna_fl].tolist()]
+        df_risultati['Categoria'] = [categoria for categoria, _ in verdetti]
+        df_risultati['Check_Result'] = pd.Series([esito for _, esito in verdetti], index=df_risultati.index, dtype=object)
+
+        # Come nella verifica completa le righe sono raggruppate per categoria, nell'ordine del dizionario
+        ordine_categorie = {categoria: posizione for posizione, categoria in enumerate([*categorie_dict, 'Others'])}
+        posizioni = df_risultati['Categoria'].map(ordine_categorie).to_numpy()
+        return df_risultati.iloc[np.argsort(posizioni, kind='stable')].reset_index(drop=True)
+
+
+def _verifica_righe(matcher: GuidelineMatcher, fl_values: list, lunghezze: list) -> list:
+    """
+    Verifica una sequenza di FL con il matcher e restituisce i valori della colonna Check_Result
+    """
+    risultati = []
+    for fl_value, lunghezza in zip(fl_values, lunghezze):
+        try:
+            risultati.append(matcher.verifica(fl_value, lunghezza))
+
+        except Exception as e:
+            # Catturiamo eventuali errori durante l'elaborazione della singola riga
+            error_msg = f"Errore nell'elaborazione della FL '{fl_value}': {str(e)}"
+            risultati.append(error_msg)
+            print(error_msg)  # Log dell'errore ma continuiamo con le altre righe
+    return risultati
+
+
+class _ErroreVerificaParallela(Exception):
+    """Errore di un blocco verificato in un processo worker (processo terminato, pool non disponibile...)"""
+
+
+# Insiemi di pattern ricevuti dal processo worker (id_regole -> pattern per lunghezza)
+_WORKER_REGOLE = {}
+
+def _inizializza_worker(regole: Dict[str, Dict[int, List[str]]]):
+    """
+    Inizializzatore dei processi worker: riceve una sola volta tutti gli insiemi di pattern
+    necessari alla verifica, invece di inviarli con ogni blocco di FL
+    """
+    _WORKER_REGOLE.clear()
+    _WORKER_REGOLE.update(regole)
+
+
+def _verifica_blocco(id_regole: str, fl_values: list, lunghezze: list) -> list:
+    """
+    Verifica un blocco di FL in un processo worker. Il matcher viene compilato alla prima
+    richiesta e riutilizzato per i blocchi successivi con lo stesso insieme di pattern.
+    """
+    patterns_by_length = _WORKER_REGOLE[id_regole]
+    chiave = tuple((lunghezza, pattern) for lunghezza, patterns in patterns_by_length.items() for pattern in patterns)
+    matcher = _GUIDELINE_MATCHER_CACHE.get(chiave)
+    if matcher is None:
+        matcher = GuidelineMatcher(patterns_by_length)
+        _GUIDELINE_MATCHER_CACHE[chiave] = matcher
+    return _verifica_righe(matcher, fl_values, lunghezze)
+
+
+class _PoolVerifica:
+    """
+    Pool di processi condiviso tra le verifiche: avviare i processi costa più della verifica
+    di molte migliaia di FL, per cui il pool viene creato alla prima verifica parallela e
+    riutilizzato finché il numero di processi resta lo stesso e i worker conoscono già tutti
+    gli insiemi di pattern richiesti. Quando servono nuovi pattern il pool viene ricreato
+    con l'unione di quelli vecchi e nuovi, così alternare le tecnologie non lo ricrea ogni volta.
+    """
+    executor: Optional[ProcessPoolExecutor] = None
+    n_workers: int = 0
+    regole: Dict[str, Dict[int, List[str]]] = {}
+
+    @classmethod
+    def ottieni(cls, n_workers: int, regole: Dict[str, Dict[int, List[str]]]) -> ProcessPoolExecutor:
+        """Restituisce il pool attivo, ricreandolo solo se non può servire la richiesta"""
+        if cls.executor is not None and cls.n_workers == n_workers and regole.keys() <= cls.regole.keys():
+            return cls.executor
+
+        regole_pool = {**cls.regole, **regole} if cls.n_workers == n_workers else dict(regole)
+        cls.chiudi()
+        print(f"Avvio del pool di verifica con {n_workers} processi")
+        cls.executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_inizializza_worker,
+                                           initargs=(regole_pool,))
+        cls.n_workers = n_workers
+        cls.regole = regole_pool
+        return cls.executor
+
+    @classmethod
+    def chiudi(cls):
+        """Termina i processi del pool (anche all'uscita del programma)"""
+        if cls.executor is not None:
+            cls.executor.shutdown(cancel_futures=True)
+        cls.executor = None
+        cls.n_workers = 0
+        cls.regole = {}
+
+
+atexit.register(_PoolVerifica.chiudi)
+
+
 class RegularExpressionsTools:
     """
     Classe di utility per la manipolazione dei DataFrame pandas e verifica regex
@@ -72,46 +934,21 @@ class RegularExpressionsTools:
             if not isinstance(regex_dict[key], list):
                 raise TypeError(f"Il valore per la chiave '{key}' deve essere una lista")
         
-        # Inizializzo il dizionario di risultati e mappe delle maschere
+        # Assegno ogni riga alla prima categoria che la riconosce con la tabella di smistamento
+        dispatcher = CategoryDispatcher.from_dict(regex_dict)
+        ranghi = dispatcher.assegna(df[column_name])
+
         result_dict = {}
-        mask_map = {}
-        
-        # Creo una maschera principale inizialmente tutta False
-        # Questa maschera terrà traccia di tutte le righe già classificate
-        master_mask = pd.Series(False, index=df.index)
-        
-        # Per ogni categoria nel dizionario
-        for category, patterns in regex_dict.items():
-            # Salto la categoria se non ci sono pattern
-            if not patterns:
+        for rango, category in enumerate(dispatcher.categorie):
+            # Categoria senza pattern
+            if not regex_dict[category]:
                 result_dict[category] = pd.DataFrame(columns=df.columns)
                 continue
-            
-            # Combino tutte le regex in OR per questa categoria
-            category_mask = pd.Series(False, index=df.index)
-            
-            for pattern in patterns:
-                try:
-                    # Compilo l'espressione regolare
-                    regex = re.compile(pattern)
-                    # Aggiorno la maschera della categoria con OR
-                    pattern_mask = df[column_name].str.contains(regex, regex=True)
-                    category_mask = category_mask | pattern_mask
-                except re.error:
-                    print(f"Avviso: '{pattern}' non è un'espressione regolare valida, verrà ignorata")
-            
-            # Filtro solo le righe che non sono già state classificate
-            unique_mask = category_mask & ~master_mask
-            
-            # Aggiorno la maschera principale
-            master_mask = master_mask | unique_mask
-            
-            # Salvo la maschera e il DataFrame filtrato
-            mask_map[category] = unique_mask
-            result_dict[category] = df[unique_mask].copy()
+
+            result_dict[category] = df[ranghi == rango].copy()
         
         # Creo la categoria "Others" per righe non classificate
-        result_dict['Others'] = df[~master_mask].copy()
+        result_dict['Others'] = df[ranghi == len(dispatcher.categorie)].copy()
         
         # Verifico che tutti i sottoinsiemi siano disgiunti e la loro unione sia il df originale
         total_rows = sum(len(subset) for subset in result_dict.values())
@@ -120,6 +957,35 @@ class RegularExpressionsTools:
         
         return result_dict
 
+    @staticmethod
+    def trova_fl_non_conformi(valori: pd.Series, regex_pattern: str) -> pd.DataFrame:
+        """
+        Verifica in un solo passaggio vettoriale tutti i valori rispetto a una maschera
+        e restituisce l'elenco completo di quelli che non la rispettano.
+        
+        Args:
+            valori (pd.Series): Serie delle FL da verificare, nell'ordine delle righe inserite
+            regex_pattern (str): Espressione regolare della maschera
+                
+        Returns:
+            pd.DataFrame: DataFrame con le colonne 'Riga' (numero della riga, a partire da 1)
+                          e 'FL' per ogni valore che non rispetta la maschera
+        
+        Raises:
+            ValueError: Se l'espressione regolare non è valida
+        """
+        try:
+            compiled_regex = re.compile(regex_pattern)
+        except re.error as e:
+            raise ValueError(f"Espressione regolare non valida '{regex_pattern}': {str(e)}")
+
+        valori = valori.reset_index(drop=True)
+        # I valori non stringa restituiscono NaN e vengono considerati non conformi
+        conformi = valori.str.fullmatch(compiled_regex).eq(True)
+
+        non_conformi = valori[~conformi]
+        return pd.DataFrame({'Riga': non_conformi.index + 1, 'FL': non_conformi.to_numpy()})
+
     @staticmethod
     def validate_filtering_result(
                     original_df: pd.DataFrame,
@@ -237,6 +1103,8 @@ class RegularExpressionsTools:
                 
                 if not rules_dict:
                     raise ValueError("Non è stato possibile estrarre regole valide dal file Rules.csv")
+
+                rule_compiler = RuleCompiler.from_dict(rules_dict)
                     
             except pd.errors.ParserError as e:
                 raise ValueError(f"Errore nel parsing del file Rules.csv: {str(e)}")
@@ -282,25 +1150,7 @@ class RegularExpressionsTools:
                     guideline_df['FL_Lunghezza'] = guideline_df['FL'].apply(lambda x: x.count('-') + 1)
 
                     # 4. Costruisce la colonna FL_RE con le espressioni regolari
-                    def create_regex(fl_value):
-                        if pd.isna(fl_value) or not isinstance(fl_value, str):
-                            print(f"Attenzione: Valore non valido nella colonna FL: {fl_value}")
-                            return ""
-                        
-                        # Copia il valore originale
-                        fl_regex = fl_value
-                        
-                        # Ordina le chiavi per lunghezza decrescente per evitare sostituzioni parziali
-                        ordered_keys = sorted(rules_dict.keys(), key=len, reverse=True)
-                        
-                        # Sostituisci ogni codice con la corrispondente espressione regolare
-                        for key in ordered_keys:
-                            fl_regex = fl_regex.replace(key, rules_dict[key])
-                            
-                        return fl_regex
-                    
-                    # Applica la funzione a ogni valore della colonna FL
-                    guideline_df['FL_RE'] = guideline_df['FL'].apply(create_regex)
+                    guideline_df['FL_RE'] = rule_compiler.espandi_colonna(guideline_df['FL'])
 
                     if combined_df is None:
                         combined_df = guideline_df
@@ -333,7 +1183,7 @@ class RegularExpressionsTools:
             # Crea la colonna ['Check'] per la costruzione delle tabelle di aggiornamento ZPMR_CTRL_ASS e ZPM4R_GL_T_FL
             if (DataFrameTools.Add_Column_Check_ZPMR(combined_df)):
                 # Applica la funzione a ogni valore della colonna FL
-                combined_df['Check_RE'] = combined_df['Check'].apply(create_regex)
+                combined_df['Check_RE'] = rule_compiler.espandi_colonna(combined_df['Check'])
             else:
                 print("Errore nella creazione della colonna Check nel DF guideline_df")
             # Aggiungi questo dataframe al dataframe combinato     
@@ -350,6 +1200,77 @@ class RegularExpressionsTools:
             print(f"Errore imprevisto: {str(e)}")
             raise
 
+    @staticmethod
+    def _hash_file_guideline(rules_file_path, guideline_files_list) -> str:
+        """
+        Calcola l'impronta SHA-256 del contenuto del file delle regole e dei file guideline.
+        L'ordine dei file fa parte dell'impronta perché determina l'ordine dei template
+        e la rimozione dei duplicati; i file mancanti vengono registrati come tali.
+        """
+        impronta = hashlib.sha256(f"v{_GUIDELINE_CACHE_VERSION}".encode('utf-8'))
+        for file_path in [rules_file_path, *guideline_files_list]:
+            impronta.update(os.path.basename(file_path).encode('utf-8'))
+            if Path(file_path).exists():
+                with open(file_path, 'rb') as f:
+                    impronta.update(hashlib.sha256(f.read()).digest())
+            else:
+                impronta.update(b'<mancante>')
+        return impronta.hexdigest()
+
+    @staticmethod
+    def Make_DF_RE_list_cached(rules_file_path, guideline_files_list, cache_dir):
+        """
+        Versione con cache su disco di Make_DF_RE_list.
+
+        Il DataFrame completo (FL_RE, FL_Lunghezza, Check, Check_RE) viene salvato in formato pickle
+        nella cartella cache_dir, con un nome che dipende dal contenuto del file delle regole e dei
+        file guideline: le esecuzioni successive caricano la tabella già costruita e la ricostruiscono
+        solo quando uno dei file di configurazione viene modificato.
+
+        Args:
+            rules_file_path (str): Percorso al file Rules.csv
+            guideline_files_list (list): Lista di percorsi ai file guideline da processare
+            cache_dir (str): Cartella in cui salvare le tabelle costruite
+
+        Returns:
+            pandas.DataFrame: Dataframe unificato con le nuove colonne
+        """
+        if not isinstance(guideline_files_list, list) or not Path(rules_file_path).exists():
+            # Lascio a Make_DF_RE_list la gestione degli errori sui parametri
+            return RegularExpressionsTools.Make_DF_RE_list(rules_file_path, guideline_files_list)
+
+        # La prima parte del nome identifica la combinazione di file (tecnologia / tipo di inverter),
+        # la seconda il loro contenuto
+        combinazione = hashlib.sha256(
+            "|".join(os.path.basename(f) for f in [rules_file_path, *guideline_files_list]).encode('utf-8')
+        ).hexdigest()[:16]
+        contenuto = RegularExpressionsTools._hash_file_guideline(rules_file_path, guideline_files_list)
+        cache_file = Path(cache_dir) / f"guideline_{combinazione}_{contenuto[:32]}.pkl"
+
+        if cache_file.exists():
+            try:
+                df_regex = pd.read_pickle(cache_file)
+                logger.info(f"Tabella delle linee guida caricata dalla cache: {cache_file.name}")
+                return df_regex
+            except Exception as e:
+                print(f"Attenzione: impossibile leggere la cache {cache_file}: {str(e)}, la tabella verrà ricostruita")
+
+        df_regex = RegularExpressionsTools.Make_DF_RE_list(rules_file_path, guideline_files_list)
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # Rimuovo le versioni precedenti della stessa combinazione di file
+            for vecchio_file in cache_file.parent.glob(f"guideline_{combinazione}_*.pkl"):
+                vecchio_file.unlink()
+            # Scrivo su un file temporaneo e lo rinomino per non lasciare cache incomplete
+            file_temporaneo = cache_file.with_suffix('.tmp')
+            df_regex.to_pickle(file_temporaneo)
+            os.replace(file_temporaneo, cache_file)
+        except Exception as e:
+            print(f"Attenzione: impossibile salvare la cache {cache_file}: {str(e)}")
+
+        return df_regex
+
     @staticmethod
     def Make_DF_RE(rules_file_path, gl_file_path):
         """
@@ -437,25 +1358,7 @@ class RegularExpressionsTools:
             
             # 4. Costruisce la colonna FL_RE con le espressioni regolari
             try:
-                def create_regex(fl_value):
-                    if pd.isna(fl_value) or not isinstance(fl_value, str):
-                        print(f"Attenzione: Valore non valido nella colonna FL: {fl_value}")
-                        return ""
-                    
-                    # Copia il valore originale
-                    fl_regex = fl_value
-                    
-                    # Ordina le chiavi per lunghezza decrescente per evitare sostituzioni parziali
-                    ordered_keys = sorted(rules_dict.keys(), key=len, reverse=True)
-                    
-                    # Sostituisci ogni codice con la corrispondente espressione regolare
-                    for key in ordered_keys:
-                        fl_regex = fl_regex.replace(key, rules_dict[key])
-                        
-                    return fl_regex
-                
-                # Applica la funzione a ogni valore della colonna FL
-                re_df['FL_RE'] = re_df['FL'].apply(create_regex)
+                re_df['FL_RE'] = RuleCompiler.from_dict(rules_dict).espandi_colonna(re_df['FL'])
                 
             except Exception as e:
                 raise ValueError(f"Errore nella creazione delle espressioni regolari: {str(e)}")
@@ -534,46 +1437,8 @@ class RegularExpressionsTools:
             # Parsing dell'intestazione per ottenere i nomi delle colonne
             column_names = [col.strip() for col in header_string.split(';')]
             
-            # Dizionario per memorizzare le espressioni regolari compilate, organizzate per lunghezza
-            # Questo ottimizza la ricerca successiva
-            compiled_patterns_by_length = {}
-
-            for _, row in regex_df.iterrows():
-                pattern = row['Check_RE']
-
-                # Estraggo la lunghezza della FL associata a questa regex
-                try:
-                    fl_length = row['FL_Lunghezza']
-                    
-                    # Converto in modo sicuro la lunghezza in intero
-                    if fl_length is not None:
-                        if isinstance(fl_length, (int, float)):
-                            fl_length = int(fl_length)
-                        elif isinstance(fl_length, str) and fl_length.strip().isdigit():
-                            fl_length = int(fl_length)
-                        else:
-                            # Se non convertibile, uso None come chiave
-                            fl_length = None
-                except:
-                    fl_length = None
-
-                try:
-                    regex_data = {
-                        'regex': re.compile(pattern),
-                        'AM Section': row['AM Section'],
-                        'AM Part': row['AM Part'],
-                        'AM Component': row['AM Component'],
-                        'Element Type': row['Element Type']
-                    }
-                    # Inizializzo il dizionario per questa lunghezza se non esiste
-                    if fl_length not in compiled_patterns_by_length:
-                        compiled_patterns_by_length[fl_length] = {}
-                        
-                    # Aggiungo il pattern al dizionario per questa lunghezza
-                    compiled_patterns_by_length[fl_length][pattern] = regex_data
-                
-                except re.error as e:
-                    raise ValueError(f"Espressione regolare non valida '{pattern}': {str(e)}")
+            # Matcher dei codici Check, costruito una sola volta per tabella delle linee guida
+            check_matcher = CheckKeyMatcher.from_dataframe(regex_df, ['AM Section', 'AM Part', 'AM Component', 'Element Type'])
 
             # Lista per raccogliere le righe valide
             valid_rows = []
@@ -594,34 +1459,9 @@ class RegularExpressionsTools:
                 # Converto in intero
                 fl_length = int(fl_length_char)
                 
-                # Verifico se il codice corrisponde a qualche espressione regolare
+                # Verifico che il codice corrisponda a una sola espressione regolare
                 # Usando solo quelle con la lunghezza corrispondente
-                matching_patterns = []
-                matching_pattern_data = {}
-                
-                # Ottengo il sottoinsieme di pattern per questa lunghezza
-                patterns_for_length = compiled_patterns_by_length.get(fl_length, {})
-                
-                # Se non ci sono pattern per questa lunghezza, provo con tutte le regex
-                if not patterns_for_length:
-                    # Cerco in tutti i pattern (fallback)
-                    for length, patterns in compiled_patterns_by_length.items():
-                        for pattern, data in patterns.items():
-                            if data['regex'].fullmatch(code):
-                                matching_patterns.append(pattern)
-                                matching_pattern_data = data
-                else:
-                    # Verifico solo i pattern con la lunghezza corrispondente
-                    for pattern, data in patterns_for_length.items():
-                        if data['regex'].fullmatch(code):
-                            matching_patterns.append(pattern)
-                            matching_pattern_data = data
-                
-                # Verifico i risultati della corrispondenza
-                if not matching_patterns:
-                    raise ValueError(f"Il codice {code} non corrisponde a nessuna espressione regolare")
-                elif len(matching_patterns) > 1:
-                    raise ValueError(f"Il codice {code} corrisponde a più espressioni regolari: {', '.join(matching_patterns)}")
+                matching_pattern_data = check_matcher.corrispondenza(code, fl_length)
                 
                 # Split del codice in base al separatore "_"
                 code_parts = code.split('_')
@@ -724,44 +1564,8 @@ class RegularExpressionsTools:
             # Parsing dell'intestazione per ottenere i nomi delle colonne
             column_names = [col.strip() for col in header_string.split(';')]
                         
-            # Dizionario per memorizzare le espressioni regolari compilate, organizzate per lunghezza
-            # Questo ottimizza la ricerca successiva
-            compiled_patterns_by_length = {}
-
-            for _, row in regex_df.iterrows():
-                pattern = row['Check_RE']
-
-                # Estraggo la lunghezza della FL associata a questa regex
-                try:
-                    fl_length = row['FL_Lunghezza']
-                    
-                    # Converto in modo sicuro la lunghezza in intero
-                    if fl_length is not None:
-                        if isinstance(fl_length, (int, float)):
-                            fl_length = int(fl_length)
-                        elif isinstance(fl_length, str) and fl_length.strip().isdigit():
-                            fl_length = int(fl_length)
-                        else:
-                            # Se non convertibile, uso None come chiave
-                            fl_length = None
-                except:
-                    fl_length = None
-
-                try:
-                    regex_data = {
-                        'regex': re.compile(pattern),
-                        'Tech.Obj.SAP CODE': row['Tech.Obj.SAP CODE'],
-                        'Catalog Profile': row['Catalog Profile']
-                    }
-                    # Inizializzo il dizionario per questa lunghezza se non esiste
-                    if fl_length not in compiled_patterns_by_length:
-                        compiled_patterns_by_length[fl_length] = {}
-                        
-                    # Aggiungo il pattern al dizionario per questa lunghezza
-                    compiled_patterns_by_length[fl_length][pattern] = regex_data
-                
-                except re.error as e:
-                    raise ValueError(f"Espressione regolare non valida '{pattern}': {str(e)}")
+            # Matcher dei codici Check, costruito una sola volta per tabella delle linee guida
+            check_matcher = CheckKeyMatcher.from_dataframe(regex_df, ['Tech.Obj.SAP CODE', 'Catalog Profile'])
 
             # Lista per raccogliere le righe valide
             valid_rows = []
@@ -782,34 +1586,9 @@ class RegularExpressionsTools:
                 # Converto in intero
                 fl_length = int(fl_length_char)
                 
-                # Verifico se il codice corrisponde a qualche espressione regolare
+                # Verifico che il codice corrisponda a una sola espressione regolare
                 # Usando solo quelle con la lunghezza corrispondente
-                matching_patterns = []
-                matching_pattern_data = {}
-                
-                # Ottengo il sottoinsieme di pattern per questa lunghezza
-                patterns_for_length = compiled_patterns_by_length.get(fl_length, {})
-                
-                # Se non ci sono pattern per questa lunghezza, provo con tutte le regex
-                if not patterns_for_length:
-                    # Cerco in tutti i pattern (fallback)
-                    for length, patterns in compiled_patterns_by_length.items():
-                        for pattern, data in patterns.items():
-                            if data['regex'].fullmatch(code):
-                                matching_patterns.append(pattern)
-                                matching_pattern_data = data
-                else:
-                    # Verifico solo i pattern con la lunghezza corrispondente
-                    for pattern, data in patterns_for_length.items():
-                        if data['regex'].fullmatch(code):
-                            matching_patterns.append(pattern)
-                            matching_pattern_data = data
-                
-                # Verifico i risultati della corrispondenza
-                if not matching_patterns:
-                    raise ValueError(f"Il codice {code} non corrisponde a nessuna espressione regolare")
-                elif len(matching_patterns) > 1:
-                    raise ValueError(f"Il codice {code} corrisponde a più espressioni regolari: {', '.join(matching_patterns)}")
+                matching_pattern_data = check_matcher.corrispondenza(code, fl_length)
                 
                 # Split del codice in base al separatore "_"
                 code_parts = code.split('_')
@@ -850,7 +1629,7 @@ class RegularExpressionsTools:
             raise Exception(f"Errore nell'analisi dei codici e creazione del DataFrame: {str(e)}") from e
 
     @staticmethod
-    def verifica_fl_con_regex(df_fl, df_regex):
+    def verifica_fl_con_regex(df_fl, df_regex, executor=None, chunk_size=None):
         """
         Verifica ciascuna riga della colonna FL del primo DataFrame con le espressioni regolari
         del secondo DataFrame, controllando solo quelle con pari lunghezza.
@@ -859,6 +1638,10 @@ class RegularExpressionsTools:
             df_fl (pd.DataFrame): DataFrame contenente una colonna 'FL' e una colonna 'FL_Lunghezza'
             df_regex (pd.DataFrame): DataFrame contenente le espressioni regolari nella colonna 'FL_RE'
                                    e la loro lunghezza nella colonna 'FL_Lunghezza'
+            executor (ProcessPoolExecutor, optional): Pool di processi inizializzato con _inizializza_worker
+                                   e con i pattern di df_regex; se indicato le FL vengono verificate
+                                   in parallelo a blocchi di chunk_size righe con la stessa lunghezza
+            chunk_size (int, optional): Numero massimo di righe per blocco nella verifica parallela
         
         Returns:
             pd.DataFrame: DataFrame originale con una colonna aggiuntiva 'Check_Result' che contiene
@@ -867,6 +1650,7 @@ class RegularExpressionsTools:
         Raises:
             ValueError: Se mancano colonne richieste nei DataFrame
             TypeError: Se i tipi di dati non sono corretti
+            _ErroreVerificaParallela: Se un blocco verificato nei processi worker non restituisce risultati
             Exception: Per altri errori imprevisti
         """
         try:
@@ -900,77 +1684,55 @@ class RegularExpressionsTools:
             if not pd.api.types.is_numeric_dtype(df_regex['FL_Lunghezza']):
                 raise TypeError("La colonna 'FL_Lunghezza' deve contenere valori numerici")
             
-            # Verifichiamo che le espressioni regolari siano valide
-            invalid_patterns = []
-            for idx, pattern in enumerate(df_regex['FL_RE']):
-                try:
-                    re.compile(pattern)
-                except re.error as e:
-                    invalid_patterns.append((pattern, str(e)))
-            
-            if invalid_patterns:
-                error_details = "; ".join([f"'{p}': {e}" for p, e in invalid_patterns])
-                raise ValueError(f"Espressioni regolari non valide: {error_details}")
-                
+            # Costruiamo (o recuperiamo dalla cache) il matcher compilato:
+            # la costruzione verifica anche che le espressioni regolari siano valide
+            matcher = GuidelineMatcher.from_dataframe(df_regex)
+
             # Creiamo una copia del DataFrame per non modificare l'originale
             result_df = df_fl.copy()
-            result_df['Check_Result'] = None
-            
-            # Dizionario per memorizzare le espressioni regolari compilate
-            compiled_patterns = {}
-            
-            # Per ogni riga nel DataFrame delle FL
-            for idx, row in result_df.iterrows():
-                try:
-                    fl_value = row['FL']
-                    lunghezza = row['FL_Lunghezza']
-                    
-                    # Filtriamo le espressioni regolari con la stessa lunghezza
-                    regex_match = df_regex[df_regex['FL_Lunghezza'] == lunghezza]
-                    
-                    if regex_match.empty:
-                        result_df.at[idx, 'Check_Result'] = f"Nessuna espressione regolare disponibile per lunghezza {lunghezza}"
-                        continue
-                    
-                    # Verifichiamo se la FL corrisponde ad almeno una delle espressioni regolari
-                    matching_patterns_count = 0
-                    matching_patterns = []
 
-                    for _, regex_row in regex_match.iterrows():
-                        pattern = regex_row['FL_RE']
-                        
-                        # Compiliamo l'espressione regolare solo una volta e la riutilizziamo
-                        if pattern not in compiled_patterns:
-                            try:
-                                compiled_patterns[pattern] = re.compile(pattern)
-                            except re.error as e:
-                                # Questo non dovrebbe mai accadere dato il controllo iniziale
-                                raise ValueError(f"Errore nella compilazione di '{pattern}': {e}")
-                        
-                        # Usiamo l'espressione regolare compilata e contiamo le corrispondenze
-                        if compiled_patterns[pattern].fullmatch(fl_value):
-                            matching_patterns_count += 1
-                            matching_patterns.append(pattern)
-
-                    # Aggiorniamo il risultato in base al numero di pattern corrispondenti
-                    if matching_patterns_count == 0:
-                        result_df.at[idx, 'Check_Result'] = "Non corrisponde a nessuna espressione regolare valida"
-                    elif matching_patterns_count == 1:
-                        result_df.at[idx, 'Check_Result'] = True
-                    else:
-                        # Più di un pattern corrisponde, questo è un errore
-                        patterns_str = ", ".join(matching_patterns)
-                        result_df.at[idx, 'Check_Result'] = f"Errore: la FL corrisponde a {matching_patterns_count} espressioni regolari: {patterns_str}"
-                
-                except Exception as e:
-                    # Catturiamo eventuali errori durante l'elaborazione della singola riga
-                    error_msg = f"Errore nell'elaborazione della FL '{row.get('FL', 'N/A')}': {str(e)}"
-                    result_df.at[idx, 'Check_Result'] = error_msg
-                    print(error_msg)  # Log dell'errore ma continuiamo con le altre righe
-            
+            fl_values = result_df['FL'].tolist()
+            lunghezze = result_df['FL_Lunghezza'].tolist()
+
+            if executor is None:
+                # Verifichiamo ogni FL con un solo passaggio sul matcher
+                risultati = _verifica_righe(matcher, fl_values, lunghezze)
+            else:
+                # Suddividiamo le righe in blocchi di pari lunghezza e li verifichiamo nei processi worker
+                chunk_size = max(1, int(chunk_size or len(fl_values)))
+                posizioni_per_lunghezza = {}
+                for posizione, lunghezza in enumerate(lunghezze):
+                    posizioni_per_lunghezza.setdefault(lunghezza, []).append(posizione)
+
+                blocchi = []
+                for lunghezza, posizioni in posizioni_per_lunghezza.items():
+                    for inizio in range(0, len(posizioni), chunk_size):
+                        posizioni_blocco = posizioni[inizio:inizio + chunk_size]
+                        future = executor.submit(
+                            _verifica_blocco,
+                            matcher.id_regole,
+                            [fl_values[i] for i in posizioni_blocco],
+                            [lunghezza] * len(posizioni_blocco)
+                        )
+                        blocchi.append((posizioni_blocco, future))
+
+                # Ricomponiamo i risultati nell'ordine originale delle righe
+                risultati = [None] * len(fl_values)
+                for posizioni_blocco, future in blocchi:
+                    try:
+                        risultati_blocco = future.result()
+                    except Exception as e:
+                        for _, altro in blocchi:
+                            altro.cancel()
+                        raise _ErroreVerificaParallela(str(e)) from e
+                    for posizione, risultato in zip(posizioni_blocco, risultati_blocco):
+                        risultati[posizione] = risultato
+
+            result_df['Check_Result'] = pd.Series(risultati, index=result_df.index, dtype=object)
+
             return result_df
         
-        except (ValueError, TypeError) as e:
+        except (ValueError, TypeError, _ErroreVerificaParallela) as e:
             # Rilanciamo queste eccezioni per essere gestite dal chiamante
             print(f"Errore: {str(e)}")
             raise
@@ -985,7 +1747,10 @@ class RegularExpressionsTools:
         df_fl_completo: pd.DataFrame,
         df_regex_completo: pd.DataFrame,
         categorie_dict: Dict[str, List[str]],
-        colonna_fl: str = 'FL'
+        colonna_fl: str = 'FL',
+        n_workers: int = 1,
+        chunk_size: int = 20000,
+        memo: Optional['VerificaMemo'] = None
     ) -> pd.DataFrame:
         """
         Applica la funzione verifica_fl_con_regex a ciascuna categoria di FL
@@ -996,9 +1761,20 @@ class RegularExpressionsTools:
             df_regex_completo (pd.DataFrame): DataFrame contenente le espressioni regolari
             categorie_dict (Dict[str, List[str]]): Dizionario con le categorie e le relative regex
             colonna_fl (str): Nome della colonna contenente le FL
+            n_workers (int): Numero di processi per la verifica parallela (1 = verifica sequenziale);
+                             il pool di processi viene riutilizzato tra una chiamata e l'altra
+            chunk_size (int): Numero di righe per blocco nella verifica parallela; la verifica
+                              parallela viene usata solo se le FL sono più di un blocco
+            memo (VerificaMemo, optional): Memoria dei risultati precedenti; se indicata vengono
+                              verificate solo le FL nuove o modificate
             
         Returns:
             pd.DataFrame: DataFrame unificato con i risultati della verifica
+
+        Raises:
+            ValueError: Se gli input non sono validi
+            RuntimeError: Se la verifica parallela di un blocco non riesce (ad esempio per un
+                          processo worker terminato): una categoria incompleta non viene restituita
         """
         # Verifica degli input
         if not isinstance(df_fl_completo, pd.DataFrame) or df_fl_completo.empty:
@@ -1023,6 +1799,10 @@ class RegularExpressionsTools:
         # Assicuriamoci che i tipi siano corretti
         df_fl_completo['FL_Lunghezza'] = df_fl_completo['FL_Lunghezza'].astype(int)
         df_regex_completo['FL_Lunghezza'] = df_regex_completo['FL_Lunghezza'].astype(int)
+
+        if memo is not None:
+            return memo.verifica(df_fl_completo, df_regex_completo, categorie_dict, colonna_fl,
+                                 n_workers=n_workers, chunk_size=chunk_size)
         
         # Inizializziamo il risultato
         risultati_categorie = {}
@@ -1033,10 +1813,9 @@ class RegularExpressionsTools:
         # Filtriamo anche il DataFrame delle espressioni regolari per categoria
         df_regex_per_categoria = RegularExpressionsTools.filter_dataframe_by_regex(df_regex_completo, categorie_dict)
         
-        # Eseguiamo la verifica per ogni categoria
+        # Prepariamo le coppie (FL, regex) da verificare per ogni categoria
+        categorie_da_verificare = []
         for categoria in df_per_categoria.keys():
-            print(f"Elaborazione categoria: {categoria}")
-            
             # Otteniamo i DataFrame relativi alla categoria corrente
             df_fl_categoria = df_per_categoria[categoria]
             df_regex_categoria = df_regex_per_categoria.get(categoria, pd.DataFrame())
@@ -1050,17 +1829,48 @@ class RegularExpressionsTools:
                 # Se non ci sono regex specifiche per questa categoria, usiamo tutte le regex
                 print(f"Nessuna regex specifica per {categoria}, utilizzeremo tutte le regex disponibili")
                 df_regex_categoria = df_regex_completo.copy()
-            
+
+            categorie_da_verificare.append((categoria, df_fl_categoria, df_regex_categoria))
+
+        # La verifica parallela conviene solo quando le FL sono più di un blocco
+        executor = None
+        n_righe = sum(len(df_fl_categoria) for _, df_fl_categoria, _ in categorie_da_verificare)
+        if n_workers and n_workers > 1 and n_righe > chunk_size:
+            # Inviamo ai worker tutti gli insiemi di pattern una sola volta, all'avvio del processo
+            regole = {}
+            for categoria, _, df_regex_categoria in categorie_da_verificare:
+                try:
+                    matcher = GuidelineMatcher.from_dataframe(df_regex_categoria)
+                    regole[matcher.id_regole] = matcher.patterns_by_length
+                except Exception:
+                    # L'errore verrà segnalato dalla verifica della categoria
+                    continue
+            print(f"Verifica parallela di {n_righe} FL con {n_workers} processi (blocchi da {chunk_size} righe)")
+            executor = _PoolVerifica.ottieni(n_workers, regole)
+
+        # Eseguiamo la verifica per ogni categoria
+        for categoria, df_fl_categoria, df_regex_categoria in categorie_da_verificare:
+            print(f"Elaborazione categoria: {categoria}")
+
             # Eseguiamo la verifica
             try:
-            
+
                 # Aggiungiamo una colonna per indicare la categoria
                 df_fl_categoria['Categoria'] = categoria
-                
+
                 # Chiamiamo la funzione di verifica
-                risultato = RegularExpressionsTools.verifica_fl_con_regex(df_fl_categoria, df_regex_categoria)
+                risultato = RegularExpressionsTools.verifica_fl_con_regex(
+                    df_fl_categoria, df_regex_categoria, executor=executor, chunk_size=chunk_size
+                )
                 risultati_categorie[categoria] = risultato
-                
+
+            except _ErroreVerificaParallela as e:
+                # Un blocco perso nei processi worker renderebbe il risultato incompleto
+                # senza che la categoria risulti in errore: interrompiamo la verifica
+                if isinstance(e.__cause__, BrokenProcessPool):
+                    _PoolVerifica.chiudi()
+                raise RuntimeError(f"Verifica parallela della categoria {categoria} non riuscita: {e}") from e.__cause__
+
             except Exception as e:
                 print(f"Errore durante la verifica della categoria {categoria}: {str(e)}")
                 # Continuiamo con le altre categorie
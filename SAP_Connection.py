@@ -1,15 +1,32 @@
-import win32com.client
-from typing import Optional
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import Config.constants as constants
+
+try:
+    import pythoncom
+    import win32com.client
+except ImportError:
+    # Ambiente senza SAP GUI (es. misure con le sessioni simulate di utils/sap_fake.py)
+    pythoncom = None
+    win32com = None
 
 class SAPGuiConnection:
     """
     Classe per gestire la connessione con SAP GUI utilizzando win32com
     """
     
-    def __init__(self):
+    def __init__(self, sapgui: Optional[Callable[[], Any]] = None):
         """
         Inizializza gli attributi della connessione
+
+        Args:
+            sapgui: Funzione che restituisce l'oggetto SAPGUI; di default viene ottenuto da win32com
         """
+        self.sapgui = sapgui or (lambda: win32com.client.GetObject('SAPGUI'))
         self.SapGuiAuto: Optional[object] = None
         self.application: Optional[object] = None
         self.connection: Optional[object] = None
@@ -24,7 +41,7 @@ class SAPGuiConnection:
         """
         try:
             # Stabilisco una connessione con SAP
-            self.SapGuiAuto = win32com.client.GetObject('SAPGUI')
+            self.SapGuiAuto = self.sapgui()
             if not self.SapGuiAuto:
                 print("Errore: Impossibile ottenere l'oggetto SAPGUI")
                 return False
@@ -101,6 +118,269 @@ class SAPGuiConnection:
 
 
 
+class SAPConnectionManager:
+    """
+    Connessione SAP GUI condivisa tra estrazione e caricamento, mantenuta aperta tra un'operazione e l'altra.
+
+    La connessione viene stabilita al primo utilizzo; a ogni utilizzo successivo viene verificata con
+    una sonda leggera (lettura della finestra principale della sessione) e, se SAP GUI è stato chiuso
+    o la sessione non risponde più, viene ristabilita. Dopo idle_timeout_minuti di inattività gli oggetti
+    COM vengono rilasciati e la connessione verrà ristabilita al prossimo utilizzo.
+
+    Si usa come context manager: il blocco with riceve la SAPGuiConnection attiva (o non connessa, se
+    SAP GUI non è disponibile) e alla fine la connessione resta aperta.
+    """
+
+    def __init__(self, sapgui: Optional[Callable[[], Any]] = None,
+                 idle_timeout_minuti: float = constants.SAP_connessione_inattiva_minuti,
+                 orologio: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            sapgui: Funzione che restituisce l'oggetto SAPGUI (es. un motore di scripting simulato);
+                    di default viene ottenuto da win32com
+            idle_timeout_minuti: Minuti di inattività dopo i quali la connessione viene rilasciata (0 = mai)
+            orologio: Funzione che restituisce l'istante corrente in secondi
+        """
+        self.sap = SAPGuiConnection(sapgui)
+        self.idle_timeout_secondi = idle_timeout_minuti * 60
+        self.orologio = orologio
+        self._ultimo_utilizzo: Optional[float] = None
+        # Numero di blocchi with in corso: durante l'utilizzo la connessione non è mai inattiva
+        self._in_uso = 0
+        self._lock = threading.RLock()
+        self.n_connessioni = 0
+
+    def _inattiva(self) -> bool:
+        return (self.idle_timeout_secondi > 0 and not self._in_uso and self._ultimo_utilizzo is not None
+                and self.orologio() - self._ultimo_utilizzo >= self.idle_timeout_secondi)
+
+    def sonda(self) -> bool:
+        """
+        Verifica che la sessione risponda ancora (una sola chiamata a SAP GUI)
+
+        Returns:
+            bool: True se la sessione è utilizzabile, False altrimenti
+        """
+        if not self.sap.is_connected():
+            return False
+        try:
+            return self.sap.session.findById("wnd[0]") is not None
+        except Exception as e:
+            print(f"La sessione SAP non risponde: {str(e)}")
+            return False
+
+    def connetti(self) -> SAPGuiConnection:
+        """
+        Restituisce la connessione attiva, stabilendola o ristabilendola se necessario
+
+        Returns:
+            SAPGuiConnection: Connessione SAP (is_connected() è False se SAP GUI non è disponibile)
+        """
+        with self._lock:
+            if self.sap.is_connected() and self._inattiva():
+                print("Connessione SAP inattiva: la ristabilisco")
+                self.sap.disconnect()
+            elif self.sap.is_connected() and not self.sonda():
+                print("Connessione SAP non più valida: la ristabilisco")
+                self.sap.disconnect()
+
+            if not self.sap.is_connected() and self.sap.connect():
+                self.n_connessioni += 1
+            self._ultimo_utilizzo = self.orologio()
+            return self.sap
+
+    def rilascia_se_inattiva(self) -> bool:
+        """
+        Rilascia la connessione se è inattiva da più di idle_timeout_minuti
+
+        Returns:
+            bool: True se la connessione è stata rilasciata
+        """
+        with self._lock:
+            if self.sap.is_connected() and self._inattiva():
+                self.sap.disconnect()
+                return True
+            return False
+
+    def chiudi(self) -> None:
+        """
+        Rilascia la connessione
+        """
+        with self._lock:
+            if self.sap.is_connected():
+                self.sap.disconnect()
+            self._ultimo_utilizzo = None
+
+    def __enter__(self) -> SAPGuiConnection:
+        with self._lock:
+            sap = self.connetti()
+            self._in_uso += 1
+            return sap
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # La connessione resta aperta: aggiorno solo l'istante dell'ultimo utilizzo
+        with self._lock:
+            self._in_uso -= 1
+            self._ultimo_utilizzo = self.orologio()
+
+
+class SAPSessionPool:
+    """
+    Insieme di sessioni SAP GUI della stessa connessione, usate per eseguire più estrazioni in parallelo.
+
+    La prima sessione è quella già usata da SAPGuiConnection (Children(0)); le altre vengono aperte
+    con CreateSession fino a n_sessioni e chiuse alla fine. Le sessioni già aperte dall'utente non
+    vengono mai usate. Ogni compito viene eseguito in un thread con una sessione libera: gli oggetti
+    COM non possono passare da un thread all'altro, per cui ogni thread recupera la propria sessione
+    dal motore di scripting tramite il suo Id. Una sessione che smette di rispondere viene esclusa
+    dal pool e il compito viene ripetuto su un'altra sessione.
+    """
+
+    # Numero massimo di sessioni per connessione consentito da SAP GUI
+    MAX_SESSIONI = 6
+
+    def __init__(self, connection, n_sessioni: int = 4, motore_thread: Optional[Callable[[], Any]] = None,
+                 timeout: int = constants.timeoutSeconds):
+        """
+        Args:
+            connection: Connessione SAP GUI (es. SAPGuiConnection.connection)
+            n_sessioni: Numero di sessioni desiderate (compresa la sessione principale)
+            motore_thread: Funzione che restituisce il motore di scripting nel thread corrente;
+                           di default viene ottenuto da win32com dopo aver inizializzato COM
+            timeout: Tempo massimo di attesa in secondi per l'apertura di una sessione
+        """
+        self.connection = connection
+        self.n_sessioni = max(1, min(n_sessioni, self.MAX_SESSIONI))
+        self.motore_thread = motore_thread or self._motore_scripting_thread
+        self.timeout = timeout
+        self.sessioni: List[str] = []
+        self._sessioni_aperte: List[str] = []
+
+    @staticmethod
+    def _motore_scripting_thread():
+        """
+        Inizializza COM nel thread corrente e restituisce il motore di scripting SAP GUI
+        """
+        pythoncom.CoInitialize()
+        return win32com.client.GetObject('SAPGUI').GetScriptingEngine
+
+    def _id_sessioni(self) -> List[str]:
+        figli = self.connection.Children
+        return [figli(i).Id for i in range(figli.Count)]
+
+    def apri(self) -> int:
+        """
+        Apre le sessioni mancanti fino a n_sessioni; se SAP non ne apre altre si prosegue con quelle disponibili
+
+        Returns:
+            int: Numero di sessioni utilizzabili
+        """
+        self.sessioni = [self.connection.Children(0).Id]
+        while len(self.sessioni) < self.n_sessioni:
+            esistenti = set(self._id_sessioni())
+            if len(esistenti) >= self.MAX_SESSIONI:
+                print(f"Raggiunto il numero massimo di sessioni SAP: uso {len(self.sessioni)} sessioni")
+                break
+            try:
+                self.connection.Children(0).CreateSession()
+            except Exception as e:
+                print(f"Errore nell'apertura di una nuova sessione SAP: {str(e)}")
+                break
+
+            # La nuova sessione compare tra i figli della connessione in modo asincrono
+            nuove = []
+            start_time = time.time()
+            while not nuove and time.time() - start_time <= self.timeout:
+                time.sleep(0.2)
+                nuove = [s for s in self._id_sessioni() if s not in esistenti]
+            if not nuove:
+                print(f"Timeout dopo {self.timeout} secondi nell'apertura di una nuova sessione SAP")
+                break
+            self.sessioni.append(nuove[0])
+            self._sessioni_aperte.append(nuove[0])
+
+        return len(self.sessioni)
+
+    def esegui(self, compiti: Dict[str, Callable[[Any], Any]]) -> Dict[str, Any]:
+        """
+        Esegue i compiti in parallelo, ognuno su una sessione libera del pool
+
+        Args:
+            compiti: Dizionario nome -> funzione che riceve la sessione SAP (es. lambda s: SAPDataExtractor(s).extract_ZPMR_CTRL_ASS(tech))
+
+        Returns:
+            Dict[str, Any]: Risultato di ogni compito (False se il compito non è andato a buon fine
+                            o se non è rimasta nessuna sessione utilizzabile)
+        """
+        if not self.sessioni:
+            self.apri()
+
+        libere = queue.Queue()
+        for id_sessione in self.sessioni:
+            libere.put(id_sessione)
+        lock = threading.Lock()
+
+        def esegui_compito(nome, compito):
+            while True:
+                id_sessione = libere.get()
+                if id_sessione is None:
+                    # Nessuna sessione utilizzabile: sblocco anche gli altri compiti in attesa
+                    libere.put(None)
+                    return False
+                session = None
+                try:
+                    session = self.motore_thread().findById(id_sessione)
+                    risultato = compito(session)
+                except Exception as e:
+                    print(f"Errore nell'esecuzione di {nome} sulla sessione {id_sessione}: {str(e)}")
+                    risultato = False
+                if risultato is not False or self._sessione_valida(session):
+                    libere.put(id_sessione)
+                    return risultato
+
+                # La sessione non risponde più: la escludo e ripeto il compito su un'altra sessione
+                print(f"Sessione {id_sessione} non più utilizzabile: ripeto {nome} su un'altra sessione")
+                with lock:
+                    self.sessioni.remove(id_sessione)
+                    if not self.sessioni:
+                        libere.put(None)
+
+        with ThreadPoolExecutor(max_workers=len(self.sessioni)) as executor:
+            futures = {nome: executor.submit(esegui_compito, nome, compito) for nome, compito in compiti.items()}
+            return {nome: future.result() for nome, future in futures.items()}
+
+    @staticmethod
+    def _sessione_valida(session) -> bool:
+        """
+        Verifica che la sessione risponda ancora (vedi SAPConnectionManager.sonda)
+        """
+        if session is None:
+            return False
+        try:
+            return session.findById("wnd[0]") is not None
+        except Exception:
+            return False
+
+    def chiudi(self) -> None:
+        """
+        Chiude le sessioni aperte dal pool
+        """
+        for id_sessione in self._sessioni_aperte:
+            try:
+                self.connection.CloseSession(id_sessione)
+            except Exception as e:
+                print(f"Errore nella chiusura della sessione {id_sessione}: {str(e)}")
+        self._sessioni_aperte = []
+        self.sessioni = []
+
+    def __enter__(self):
+        self.apri()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.chiudi()
+
+
 """ 
 
 def main():
@@ -1,12 +1,118 @@
+import os
+import re
+import threading
 import time
-import win32clipboard
+import uuid
 import pandas as pd
 
 from collections import Counter
-from typing import List, Dict, Optional
+from typing import Any, Callable, Iterable, List, Dict, Optional, Tuple, Union
 import Config.constants as constants
-import os
-from typing import Dict, Any, Optional
+from DF_Tools import DataFrameTools
+
+try:
+    import win32clipboard
+except ImportError:
+    # Ambiente senza Windows (es. misure con le sessioni simulate di utils/sap_fake.py)
+    win32clipboard = None
+
+
+class SAPWaitStrategy:
+    """
+    Strategia di attesa per le operazioni in SAP GUI.
+
+    Invece di pause fisse controlla la condizione attesa (sessione non più Busy, comparsa o chiusura
+    di un controllo, dati nella clipboard) a intervalli crescenti in modo esponenziale, da
+    attesa_iniziale fino ad attesa_massima, e registra la durata di ogni passo. La stessa istanza
+    può essere condivisa tra più sessioni (SAPSessionPool).
+    """
+
+    def __init__(self, attesa_iniziale: float = 0.005, attesa_massima: float = 0.25, fattore: float = 2.0,
+                 sleep=time.sleep, orologio=time.monotonic):
+        """
+        Args:
+            attesa_iniziale: Primo intervallo tra due controlli, in secondi
+            attesa_massima: Intervallo massimo tra due controlli, in secondi
+            fattore: Fattore di crescita dell'intervallo dopo ogni controllo fallito
+            sleep: Funzione di attesa (sostituibile nei test)
+            orologio: Funzione che restituisce il tempo corrente in secondi (sostituibile nei test)
+        """
+        self.attesa_iniziale = attesa_iniziale
+        self.attesa_massima = attesa_massima
+        self.fattore = fattore
+        self.sleep = sleep
+        self.orologio = orologio
+        # Durate registrate per ogni passo, in secondi
+        self.latenze: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def attendi(self, passo: str, condizione: Callable[[], bool], timeout: float = constants.timeoutSeconds) -> bool:
+        """
+        Attende che la condizione sia vera
+
+        Args:
+            passo: Nome del passo, usato per registrare la latenza
+            condizione: Funzione senza argomenti che restituisce True quando l'attesa è finita
+            timeout: Tempo massimo di attesa in secondi
+
+        Returns:
+            bool: True se la condizione si è verificata, False se è scaduto il timeout
+        """
+        inizio = self.orologio()
+        attesa = self.attesa_iniziale
+        while True:
+            if condizione():
+                self._registra(passo, self.orologio() - inizio)
+                return True
+            trascorso = self.orologio() - inizio
+            if trascorso > timeout:
+                self._registra(passo, trascorso)
+                return False
+            self.sleep(attesa)
+            attesa = min(attesa * self.fattore, self.attesa_massima)
+
+    def attendi_sap(self, session, passo: str, timeout: float = constants.timeoutSeconds) -> bool:
+        """
+        Attende che la sessione SAP non sia più occupata
+        """
+        return self.attendi(passo, lambda: not session.Busy, timeout)
+
+    @staticmethod
+    def controllo_presente(session, id_controllo: str) -> bool:
+        """
+        Verifica se il controllo (es. "wnd[1]" o "wnd[0]/usr/ctxtI2-LOW") è presente nella sessione
+        """
+        try:
+            # Con il secondo argomento a False findById restituisce None invece di sollevare un errore
+            return session.findById(id_controllo, False) is not None
+        except Exception:
+            return False
+
+    def attendi_controllo(self, session, id_controllo: str, passo: str, presente: bool = True,
+                          timeout: float = constants.timeoutSeconds) -> bool:
+        """
+        Attende che la sessione sia libera e che il controllo sia comparso (presente=True) o chiuso (presente=False)
+        """
+        return self.attendi(
+            passo,
+            lambda: not session.Busy and self.controllo_presente(session, id_controllo) == presente,
+            timeout
+        )
+
+    def _registra(self, passo: str, durata: float) -> None:
+        with self._lock:
+            self.latenze.setdefault(passo, []).append(durata)
+
+    def riepilogo(self) -> pd.DataFrame:
+        """
+        Restituisce le latenze registrate per passo (numero di attese, totale, media e massimo in secondi),
+        ordinate per tempo totale decrescente
+        """
+        with self._lock:
+            righe = [(passo, len(durate), sum(durate), sum(durate) / len(durate), max(durate))
+                     for passo, durate in self.latenze.items()]
+        df = pd.DataFrame(righe, columns=['Passo', 'Attese', 'Totale [s]', 'Media [s]', 'Massimo [s]'])
+        return df.sort_values('Totale [s]', ascending=False, ignore_index=True)
 
 
 class SAPDataUpLoader:
@@ -14,39 +120,51 @@ class SAPDataUpLoader:
     Classe: SAPDataUpLoader
     Descrizione: Classe contenente i metodi per l' aggiornamento delle tabelle globali in SAP 
     """
-    def __init__(self, session):
+    def __init__(self, session, attesa: Optional[SAPWaitStrategy] = None):
         """
         Inizializza la classe con una sessione SAP attiva
         
         Args:
             session: Oggetto sessione SAP attiva
+            attesa: Strategia di attesa delle operazioni SAP (default: SAPWaitStrategy)
         """
         self.session = session
+        self.attesa = attesa or SAPWaitStrategy()
 
-    def wait_for_sap(self, timeout: int = 30):  # timeout in secondi
+    def wait_for_sap(self, timeout: int = 30, passo: str = "SAP occupato"):  # timeout in secondi
         """
         Attende che SAP finisca le operazioni in corso
         
         Args:
             timeout: Tempo massimo di attesa in secondi
+            passo: Nome del passo per il quale si attende (per le latenze di SAPWaitStrategy)
         
         Returns:
             bool: True se SAP è diventato disponibile, False se è scaduto il timeout
         """
-        start_time = time.time()
-        
         try:
-            while self.session.Busy:
-                # Verifica timeout
-                if time.time() - start_time > timeout:
-                    print(f"Timeout dopo {timeout} secondi di attesa")
-                    return False
-                    
-                time.sleep(0.5)
-                print("SAP is busy")
-            
+            if not self.attesa.attendi_sap(self.session, passo, timeout):
+                print(f"Timeout dopo {timeout} secondi di attesa")
+                return False
             return True
             
+        except Exception as e:
+            print(f"Errore durante l'attesa: {str(e)}")
+            return False
+
+    def wait_for_control(self, id_controllo: str, passo: str, presente: bool = True, timeout: int = 30) -> bool:
+        """
+        Attende che il controllo indicato compaia (o si chiuda, con presente=False) nella sessione SAP
+        
+        Returns:
+            bool: True se il controllo è nello stato atteso, False se è scaduto il timeout
+        """
+        try:
+            if not self.attesa.attendi_controllo(self.session, id_controllo, passo, presente, timeout):
+                print(f"Timeout dopo {timeout} secondi di attesa del controllo {id_controllo}")
+                return False
+            return True
+
         except Exception as e:
             print(f"Errore durante l'attesa: {str(e)}")
             return False        
@@ -175,10 +293,12 @@ class SAPDataUpLoader:
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nZPM4R_UPL_FL_FILE"
             self.session.findById("wnd[0]").sendVKey(0)
             # attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadLivello_2_SAP: avvio transazione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            if not self.wait_for_control("wnd[0]/usr/radR_BUT1", "UpLoadLivello_2_SAP: schermata di caricamento"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
             # seleziono il bottone <Tabella per 1 e 2 livello>
             self.session.findById("wnd[0]/usr/radR_BUT1").select()
             # seleziono il radio button <Con intestazione?>
@@ -186,7 +306,9 @@ class SAPDataUpLoader:
             # apro finestra dialogo per selezione file
             self.session.findById("wnd[0]/usr/ctxtP_FILE").caretPosition = 0
             self.session.findById("wnd[0]").sendVKey(4)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[1]/usr/ctxtDY_PATH", "UpLoadLivello_2_SAP: finestra selezione file"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # imposto path e nome file
             self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = result['folderPath']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = result['fileName']
@@ -195,10 +317,9 @@ class SAPDataUpLoader:
             # eseguo upload del file
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadLivello_2_SAP: caricamento file"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
             return True
         
         except Exception as e:
@@ -224,10 +345,12 @@ class SAPDataUpLoader:
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nZPM4R_UPL_FL_FILE"
             self.session.findById("wnd[0]").sendVKey(0)
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadLivello_n_SAP: avvio transazione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            if not self.wait_for_control("wnd[0]/usr/radR_BUT2", "UpLoadLivello_n_SAP: schermata di caricamento"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
             # seleziono il bottone <Tabella per 3,4,5 e 6 livello
             self.session.findById("wnd[0]/usr/radR_BUT2").select()
             # seleziono il radio button <Con intestazione?>
@@ -235,7 +358,9 @@ class SAPDataUpLoader:
             # apro finestra dialogo per selezione file
             self.session.findById("wnd[0]/usr/ctxtP_FILE").caretPosition = 0
             self.session.findById("wnd[0]").sendVKey(4)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[1]/usr/ctxtDY_PATH", "UpLoadLivello_n_SAP: finestra selezione file"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # imposto path e nome file
             self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = result['folderPath']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = result['fileName']
@@ -244,10 +369,9 @@ class SAPDataUpLoader:
             # eseguo upload del file
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadLivello_n_SAP: caricamento file"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
             return True
         
         except Exception as e:
@@ -274,29 +398,34 @@ class SAPDataUpLoader:
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nZPM4R_UPL_FL_FILE"
             self.session.findById("wnd[0]").sendVKey(0)
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadCTRL_ASS: avvio transazione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            if not self.wait_for_control("wnd[0]/usr/radR_BUT3", "UpLoadCTRL_ASS: schermata di caricamento"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)                  
             #self.session.findById("wnd[0]/usr/radR_BUT3").setFocus()
             self.session.findById("wnd[0]/usr/radR_BUT3").select()
             self.session.findById("wnd[0]/usr/chkP_INT").selected = True
             #self.session.findById("wnd[0]/usr/ctxtP_FILE").setFocus()
             self.session.findById("wnd[0]/usr/ctxtP_FILE").caretPosition = 0
             self.session.findById("wnd[0]").sendVKey(4)
-            time.sleep(0.5)   
+            if not self.wait_for_control("wnd[1]/usr/ctxtDY_PATH", "UpLoadCTRL_ASS: finestra selezione file"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = result['folderPath']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = result['fileName']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 17
             self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
-            time.sleep(0.5)   
+            if not self.wait_for_control("wnd[1]", "UpLoadCTRL_ASS: chiusura finestra selezione file", presente=False):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # eseguo upload del file                   
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadCTRL_ASS: caricamento file"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5) 
             return True
         
         except Exception as e:
@@ -322,29 +451,34 @@ class SAPDataUpLoader:
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nZPM4R_UPL_FL_FILE"
             self.session.findById("wnd[0]").sendVKey(0)
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadTECH_OBJ: avvio transazione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            if not self.wait_for_control("wnd[0]/usr/radR_BUT4", "UpLoadTECH_OBJ: schermata di caricamento"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)                       
             #self.session.findById("wnd[0]/usr/radR_BUT4").setFocus()
             self.session.findById("wnd[0]/usr/radR_BUT4").select()
             self.session.findById("wnd[0]/usr/chkP_INT").selected = True
             self.session.findById("wnd[0]/usr/ctxtP_FILE").setFocus()
             self.session.findById("wnd[0]/usr/ctxtP_FILE").caretPosition = 0
             self.session.findById("wnd[0]").sendVKey(4)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[1]/usr/ctxtDY_PATH", "UpLoadTECH_OBJ: finestra selezione file"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = result['folderPath']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = result['fileName']
             self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 17
             self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[1]", "UpLoadTECH_OBJ: chiusura finestra selezione file", presente=False):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # eseguo upload del file 
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "UpLoadTECH_OBJ: caricamento file"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)   
             return True
         
         except Exception as e:
@@ -353,42 +487,297 @@ class SAPDataUpLoader:
 
 # ----Fine Classe SAPDataUpLoader----------------------------------------------------------
 
+class WindowsClipboard:
+    """
+    Accesso alla clipboard di Windows in cui SAP esporta i dati delle tabelle
+    """
+    # Eccezione sollevata quando la clipboard è temporaneamente occupata da un altro processo
+    errore = win32clipboard.error if win32clipboard else OSError
+
+    def svuota(self) -> None:
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+        finally:
+            win32clipboard.CloseClipboard()
+
+    def leggi(self) -> Optional[str]:
+        """
+        Restituisce il testo presente nella clipboard o None se la clipboard non contiene testo
+        """
+        win32clipboard.OpenClipboard()
+        try:
+            if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+                return win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+            return None
+        finally:
+            win32clipboard.CloseClipboard()
+
+
+class SelezioneSE16:
+    """
+    Compressione dei valori di una selezione multipla SE16 in valori singoli e intervalli.
+
+    I valori con lo stesso prefisso e un suffisso numerico della stessa lunghezza (es. H11, H12, H13)
+    che formano una sequenza continua diventano un intervallo: a parità di prefisso e di numero di
+    cifre l'ordine alfabetico usato da SAP coincide con quello numerico, per cui l'intervallo seleziona
+    almeno tutti i valori richiesti (più eventuali valori intermedi non numerici, che non alterano la verifica).
+    """
+    _SUFFISSO_NUMERICO = re.compile(r'(.*?)(\d+)')
+
+    @staticmethod
+    def comprimi(valori: Iterable[str], min_intervallo: int = 3) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        Comprime i valori in valori singoli e intervalli
+
+        Args:
+            valori: Valori da selezionare
+            min_intervallo: Numero minimo di valori consecutivi per creare un intervallo
+
+        Returns:
+            Tuple: (valori singoli ordinati, intervalli (da, a) ordinati)
+
+        Esempio:
+            comprimi(["H11", "H12", "H13", "01", "X"]) -> (["01", "X"], [("H11", "H13")])
+        """
+        singoli, intervalli = [], []
+        gruppi = {}
+        for valore in set(valori):
+            trovato = SelezioneSE16._SUFFISSO_NUMERICO.fullmatch(valore)
+            if trovato is None:
+                singoli.append(valore)
+                continue
+            prefisso, cifre = trovato.groups()
+            gruppi.setdefault((prefisso, len(cifre)), []).append(int(cifre))
+
+        for (prefisso, larghezza), numeri in gruppi.items():
+            numeri.sort()
+            inizio = 0
+            # Divido i numeri ordinati in sequenze continue
+            for fine in range(1, len(numeri) + 1):
+                if fine < len(numeri) and numeri[fine] == numeri[fine - 1] + 1:
+                    continue
+                sequenza = [f"{prefisso}{numero:0{larghezza}d}" for numero in numeri[inizio:fine]]
+                if len(sequenza) >= min_intervallo:
+                    intervalli.append((sequenza[0], sequenza[-1]))
+                else:
+                    singoli.extend(sequenza)
+                inizio = fine
+
+        return sorted(singoli), sorted(intervalli)
+
+    @staticmethod
+    def applicabile(valori: Iterable[str]) -> bool:
+        """
+        Indica se i valori possono essere selezionati nella finestra di selezione multipla, cioè se
+        le voci (valori singoli + intervalli) non superano constants.SAP_selezione_max_valori
+        """
+        singoli, intervalli = SelezioneSE16.comprimi(valori)
+        return len(singoli) + len(intervalli) <= constants.SAP_selezione_max_valori
+
+
 class SAPDataExtractor:
     """
     Classe per eseguire estrazioni dati da SAP utilizzando una sessione esistente
     """
+    # La clipboard è unica per tutte le sessioni: con più estrazioni in parallelo (SAPSessionPool)
+    # l'esportazione e la lettura dei dati devono avvenire una alla volta
+    clipboard_lock = threading.Lock()
+    
+    # Voce di menu Sistema > Lista > Salva > File locale (%pc) e formati della finestra di esportazione
+    MENU_ESPORTA = "wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]"
+    FORMATO_NON_CONVERTITO = "wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[0,0]"
+    FORMATO_CLIPBOARD = "wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]"
+    # Codifica UTF-8 nella finestra di salvataggio del file
+    CODIFICA_UTF8 = "4110"
+    # Tabelle dei valori singoli e degli intervalli nella finestra di selezione multipla
+    TABELLA_SINGOLI = "wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE"
+    TABELLA_INTERVALLI = "wnd[1]/usr/tabsTAB_STRIP/tabpINTL/ssubSCREEN_HEADER:SAPLALDB:3020/tblSAPLALDBINTERVAL"
     
-    def __init__(self, session):
+    def __init__(self, session, clipboard=None, attesa: Optional[SAPWaitStrategy] = None,
+                 cartella_export: Optional[str] = None):
         """
         Inizializza la classe con una sessione SAP attiva
         
         Args:
             session: Oggetto sessione SAP attiva
+            clipboard: Clipboard da cui leggere i dati esportati (default: clipboard di Windows)
+            attesa: Strategia di attesa delle operazioni SAP (default: SAPWaitStrategy)
+            cartella_export: Cartella in cui salvare le liste esportate; se None i dati passano dalla clipboard
         """
         self.session = session
+        self.clipboard = clipboard or WindowsClipboard()
+        self.attesa = attesa or SAPWaitStrategy()
+        self.cartella_export = cartella_export
 
+    def _imposta_selezione(self, nome: str, campo: Optional[str], valori: Iterable[str]) -> bool:
+        """
+        Limita la selezione SE16 ai valori indicati del campo VALUE, compressi in valori singoli e
+        intervalli nella finestra di selezione multipla. Il filtro non viene mai saltato: il chiamante
+        deve passare solo selezioni applicabili (SelezioneSE16.applicabile), altrimenti il risultato
+        verrebbe scambiato per una selezione parziale.
+        
+        Args:
+            nome: Nome della tabella (per i messaggi e le latenze)
+            campo: Id del campo di selezione di VALUE nella schermata SE16 della tabella (es. "I1")
+            valori: Valori di 'Valore Livello' da selezionare
+            
+        Returns:
+            bool: True se la selezione è stata impostata, False in caso di timeout
 
-    def extract_ZPMR_CONTROL_FL1(self, fltechnology: str) -> List[Dict]:
+        Raises:
+            ValueError: Se il campo non è indicato o le voci superano constants.SAP_selezione_max_valori
         """
-        Estrae dati relativi alla tabella ZPMR_CTRL_ASS utilizzando la transazione SE16
+        if not campo:
+            raise ValueError(f"{nome}: campo di selezione di VALUE non definito")
+        singoli, intervalli = SelezioneSE16.comprimi(valori)
+        if len(singoli) + len(intervalli) > constants.SAP_selezione_max_valori:
+            raise ValueError(f"{nome}: {len(singoli) + len(intervalli)} voci di selezione, "
+                             f"oltre il limite di {constants.SAP_selezione_max_valori}")
+        print(f"{nome}: selezione di {len(singoli)} valori e {len(intervalli)} intervalli")
+
+        self.session.findById(f"wnd[0]/usr/btn%_{campo}_%_APP_%-VALU_PUSH").press()
+        if not self.wait_for_control(self.TABELLA_SINGOLI, f"{nome}: selezione multipla"):
+            return False
+        self._compila_tabella(self.TABELLA_SINGOLI, [(valore,) for valore in singoli], ["RSCSEL_255-SLOW_I"])
+        if intervalli:
+            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpINTL").select()
+            if not self.wait_for_control(self.TABELLA_INTERVALLI, f"{nome}: selezione intervalli"):
+                return False
+            self._compila_tabella(self.TABELLA_INTERVALLI, intervalli, ["RSCSEL_255-ILOW_I", "RSCSEL_255-IHIGH_I"])
+        # Applico la selezione (F8) e torno alla schermata di selezione
+        self.session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        return self.wait_for_control("wnd[1]", f"{nome}: chiusura selezione multipla", presente=False)
+
+    def _compila_tabella(self, id_tabella: str, righe: List[tuple], campi: List[str]) -> None:
+        """
+        Scrive le righe nella tabella della selezione multipla: per ogni riga la tabella viene
+        fatta scorrere in modo che la riga da compilare sia la prima visibile
+        """
+        for posizione, valori_riga in enumerate(righe):
+            self.session.findById(id_tabella).verticalScrollbar.position = posizione
+            for colonna, (campo, valore) in enumerate(zip(campi, valori_riga), 1):
+                # I campi con aiuto alla ricerca sono 'ctxt', gli altri 'txt'
+                id_campo = f"{id_tabella}/ctxt{campo}[{colonna},0]"
+                if not self.attesa.controllo_presente(self.session, id_campo):
+                    id_campo = f"{id_tabella}/txt{campo}[{colonna},0]"
+                self.session.findById(id_campo).text = valore
+
+    def _selezione_vuota(self) -> bool:
+        """
+        Verifica, dopo l'esecuzione (F8), se la barra di stato riporta che la selezione non ha trovato righe:
+        in questo caso SE16 resta sulla schermata di selezione e non c'è una lista da esportare
+        """
+        barra = self.session.findById("wnd[0]/sbar")
+        if barra.MessageType in ("E", "A"):
+            return False
+        testo = (barra.Text or "").lower()
+        return any(messaggio.lower() in testo for messaggio in constants.SAP_messaggi_nessuna_voce)
+
+    @staticmethod
+    def _lista_vuota(nome: str) -> pd.DataFrame:
+        """
+        Risultato di una selezione senza righe: DataFrame vuoto con le colonne della lista della tabella
+        """
+        print(f"{nome}: nessuna riga per i valori selezionati")
+        return pd.DataFrame(columns=constants.SAP_colonne_lista[nome], dtype=object)
+
+    def _esporta_lista(self, nome: str):
+        """
+        Esporta la lista SE16 visualizzata e ne restituisce i dati.
+        
+        Con cartella_export la lista viene salvata in un file temporaneo "non convertito" e letta con
+        DataFrameTools.clean_data_file: non si usa la clipboard e più estrazioni possono procedere in
+        parallelo. Altrimenti la lista viene copiata nella clipboard, riservata fino alla lettura dei dati.
+        
+        Args:
+            nome: Nome della tabella estratta (per i messaggi e le latenze)
+            
+        Returns:
+            DataFrame pulito (esportazione su file), testo della clipboard, oppure False in caso di timeout
+        """
+        self.session.findById(self.MENU_ESPORTA).select()
+        if not self.wait_for_control("wnd[1]", f"{nome}: finestra formato esportazione"):
+            print(f"Timeout durante l'esecuzione della transazione")
+            return False
+
+        if self.cartella_export:
+            return self._esporta_file(nome)
+
+        with self.clipboard_lock:
+            # Svuota la clipboard prima dell'esportazione
+            self.clipboard.svuota()
+            self.session.findById(self.FORMATO_CLIPBOARD).select()
+            self.session.findById(self.FORMATO_CLIPBOARD).setFocus()
+            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+            # Attendi che SAP sia pronto
+            if not self.wait_for_sap(30, f"{nome}: esportazione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            # Attendi che la clipboard sia riempita
+            if not self.wait_for_clipboard_data(30, f"{nome}: clipboard"):
+                # Gestisci il caso in cui non sono stati trovati dati
+                print("Nessun dato trovato nella clipboard")
+                # Eventuali azioni di fallback
+            # Leggo il contenuto della clipboard
+            return self.clipboard_data()
+
+    def _esporta_file(self, nome: str):
+        """
+        Salva la lista in un file temporaneo della cartella di export e lo legge (vedi _esporta_lista)
+        """
+        os.makedirs(self.cartella_export, exist_ok=True)
+        nome_file = f"{nome}_{uuid.uuid4().hex}.txt"
+        percorso = os.path.join(self.cartella_export, nome_file)
+        try:
+            self.session.findById(self.FORMATO_NON_CONVERTITO).select()
+            self.session.findById(self.FORMATO_NON_CONVERTITO).setFocus()
+            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+            # Finestra di salvataggio: cartella, nome e codifica del file
+            if not self.wait_for_control("wnd[1]/usr/ctxtDY_PATH", f"{nome}: finestra salvataggio file"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = self.cartella_export
+            self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = nome_file
+            if self.attesa.controllo_presente(self.session, "wnd[1]/usr/ctxtDY_FILE_ENCODING"):
+                self.session.findById("wnd[1]/usr/ctxtDY_FILE_ENCODING").text = self.CODIFICA_UTF8
+            # Sostituisci (il file non esiste ancora, ma evita la richiesta di conferma)
+            self.session.findById("wnd[1]/tbar[0]/btn[11]").press()
+            if not self.wait_for_control("wnd[1]", f"{nome}: esportazione su file", presente=False):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
+            if not self.attesa.attendi(f"{nome}: scrittura file", lambda: os.path.exists(percorso)):
+                print(f"Nessun file esportato trovato: {percorso}")
+                return False
+            return DataFrameTools.clean_data_file(percorso)
+        finally:
+            try:
+                if os.path.exists(percorso):
+                    os.remove(percorso)
+            except OSError as e:
+                print(f"Attenzione: impossibile eliminare il file temporaneo {percorso}: {str(e)}")
+
+
+    def extract_ZPMR_CONTROL_FL1(self, fltechnology: str) -> Union[pd.DataFrame, str, bool]:
+        """
+        Estrae dati relativi alla tabella ZPMR_CONTROL_FL1 utilizzando la transazione SE16.
+        La tabella viene sempre estratta per intero (nessuna selezione sui valori, vedi constants.SAP_campi_valore).
         
         Args:
             fltechnology: Tecnologia ricavate dalle FL
             
         Returns:
-            True se la transazione va a buon fine, False altrimenti
+            DataFrame pulito (esportazione su file), testo della clipboard, oppure False in caso di errore
         """
         try:
-            # Svuota la clipboard prima dell'estrazione
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.CloseClipboard()
             # Naviga alla transazione SE16
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16"
             self.session.findById("wnd[0]").sendVKey(0)
             self.session.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text = "ZPMR_CONTROL_FL1"
             self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[0]/usr/ctxtI2-LOW", "ZPMR_CONTROL_FL1: schermata di selezione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             self.session.findById("wnd[0]/usr/ctxtI2-LOW").text = "Z-R" + fltechnology + "M"
             self.session.findById("wnd[0]/usr/ctxtI4-LOW").text = fltechnology
             self.session.findById("wnd[0]/usr/txtMAX_SEL").text = "9999999"
@@ -396,53 +785,37 @@ class SAPDataExtractor:
             self.session.findById("wnd[0]/usr/ctxtI4-LOW").caretPosition = 1
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "ZPMR_CONTROL_FL1: esecuzione selezione"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
-            self.session.findById("wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
-            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
-                print(f"Timeout durante l'esecuzione della transazione")
-                return False
-            time.sleep(0.5)
-            # Attendi che la clipboard sia riempita
-            if not self.wait_for_clipboard_data(30):
-                # Gestisci il caso in cui non sono stati trovati dati
-                print("Nessun dato trovato nella clipboard")
-                # Eventuali azioni di fallback
-            # Leggo il contenuto della clipboard
-            return self.clipboard_data()
+            # Esporto la lista (su file o nella clipboard) e leggo i dati
+            return self._esporta_lista("ZPMR_CONTROL_FL1")
             
         except Exception as e:
             print(f"Errore nell'estrazione ZPMR_CONTROL_FL1: {str(e)}")
             return False  
 
 
-    def extract_ZPMR_CONTROL_FL2(self, fltechnology: str) -> List[Dict]:
+    def extract_ZPMR_CONTROL_FL2(self, fltechnology: str) -> Union[pd.DataFrame, str, bool]:
         """
-        Estrae dati relativi alla tabella ZPMR_CTRL_ASS utilizzando la transazione SE16
+        Estrae dati relativi alla tabella ZPMR_CONTROL_FL2 utilizzando la transazione SE16.
+        La tabella viene sempre estratta per intero (nessuna selezione sui valori, vedi constants.SAP_campi_valore).
         
         Args:
             fltechnology: Tecnologia ricavate dalle FL
             
         Returns:
-            True se la transazione va a buon fine, False altrimenti
+            DataFrame pulito (esportazione su file), testo della clipboard, oppure False in caso di errore
         """
         try:
-            # Svuota la clipboard prima dell'estrazione
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.CloseClipboard()
             # Naviga alla transazione SE16
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16"
             self.session.findById("wnd[0]").sendVKey(0)
             self.session.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text = "ZPMR_CONTROL_FL2"
             self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[0]/usr/ctxtI2-LOW", "ZPMR_CONTROL_FL2: schermata di selezione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             self.session.findById("wnd[0]/usr/ctxtI2-LOW").text = "Z-RLS" if fltechnology == "H" else "Z-R" + fltechnology + "S"
             self.session.findById("wnd[0]/usr/ctxtI4-LOW").text = fltechnology
             self.session.findById("wnd[0]/usr/txtMAX_SEL").text = "9999999"
@@ -450,234 +823,186 @@ class SAPDataExtractor:
             self.session.findById("wnd[0]/usr/ctxtI4-LOW").caretPosition = 1
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "ZPMR_CONTROL_FL2: esecuzione selezione"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
-            self.session.findById("wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
-            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
-                print(f"Timeout durante l'esecuzione della transazione")
-                return False
-            time.sleep(0.5)
-            # Attendi che la clipboard sia riempita
-            if not self.wait_for_clipboard_data(30):
-                # Gestisci il caso in cui non sono stati trovati dati
-                print("Nessun dato trovato nella clipboard")
-                # Eventuali azioni di fallback
-            # Leggo il contenuto della clipboard
-            return self.clipboard_data()
+            # Esporto la lista (su file o nella clipboard) e leggo i dati
+            return self._esporta_lista("ZPMR_CONTROL_FL2")
             
         except Exception as e:
             print(f"Errore nell'estrazione ZPMR_CONTROL_FL2: {str(e)}")
             return False
         
 
-    def extract_ZPMR_CTRL_ASS(self, fltechnology: str) -> List[Dict]:
+    def extract_ZPMR_CTRL_ASS(self, fltechnology: str, valori: Optional[Iterable[str]] = None,
+                  campo_valore: Optional[str] = constants.SAP_campi_valore["ZPMR_CTRL_ASS"]) -> Union[pd.DataFrame, str, bool]:
         """
         Estrae dati relativi alla tabella ZPMR_CTRL_ASS utilizzando la transazione SE16
         
         Args:
             fltechnology: Tecnologia ricavate dalle FL
+            valori: Valori di 'Valore Livello' da estrarre (None = tutti i valori della tecnologia)
+            campo_valore: Id del campo di selezione di VALUE (None = filtro sui valori disattivato)
             
         Returns:
-            True se la transazione va a buon fine, False altrimenti
+            DataFrame pulito (esportazione su file), testo della clipboard, DataFrame vuoto con le colonne
+            della lista se la selezione non trova righe, oppure False in caso di errore
         """
         try:
-            # Svuota la clipboard prima dell'estrazione
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.CloseClipboard()
             # Naviga alla transazione SE16
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16"
             self.session.findById("wnd[0]").sendVKey(0)
             self.session.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text = "ZPMR_CTRL_ASS"
             self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[0]/usr/txtI4-LOW", "ZPMR_CTRL_ASS: schermata di selezione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # filtro in base alla tecnologia                
             self.session.findById("wnd[0]/usr/txtI4-LOW").text = "Z-RLS" if fltechnology == "H" else "Z-R" + fltechnology + "S"
             self.session.findById("wnd[0]/usr/txtI5-LOW").text = fltechnology      
             # modifico il numero massimo di risultati
             self.session.findById("wnd[0]/usr/txtMAX_SEL").text = "9999999"
             self.session.findById("wnd[0]").sendVKey(0)
-            # avvio la transazione
-            self.session.findById("wnd[0]").sendVKey(8)
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            # Limito l'estrazione ai valori richiesti dalle FL
+            if valori and not self._imposta_selezione("ZPMR_CTRL_ASS", campo_valore, valori):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)    
-            # esporto i valori nella clipboard
-            self.session.findById("wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]").select()
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
-                print(f"Timeout durante l'esecuzione della transazione")
-                return False
-            time.sleep(0.5)                          
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
-            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+            # avvio la transazione
+            self.session.findById("wnd[0]").sendVKey(8)
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "ZPMR_CTRL_ASS: esecuzione selezione"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
-            # Attendi che la clipboard sia riempita
-            if not self.wait_for_clipboard_data(30):
-                # Gestisci il caso in cui non sono stati trovati dati
-                print("Nessun dato trovato nella clipboard")
-                # Eventuali azioni di fallback
-            # Leggo il contenuto della clipboard
-            return self.clipboard_data()
+            # Nessuna riga per i valori selezionati: non c'è una lista da esportare
+            if self._selezione_vuota():
+                return self._lista_vuota("ZPMR_CTRL_ASS")
+            # Esporto la lista (su file o nella clipboard) e leggo i dati
+            return self._esporta_lista("ZPMR_CTRL_ASS")
             
         except Exception as e:
             print(f"Errore nell'estrazione ZPMR_CTRL_ASS: {str(e)}")
             return False        
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    def extract_ZPM4R_GL_T_FL(self, fltechnology: str) -> List[Dict]:
+    def extract_ZPM4R_GL_T_FL(self, fltechnology: str, valori: Optional[Iterable[str]] = None,
+                  campo_valore: Optional[str] = constants.SAP_campi_valore["ZPM4R_GL_T_FL"]) -> Union[pd.DataFrame, str, bool]:
         """
         Estrae dati relativi alla tabella ZPM4R_GL_T_FL utilizzando la transazione SE16
         
         Args:
             fltechnology: Tecnologia ricavate dalle FL
+            valori: Valori di 'Valore Livello' da estrarre (None = tutti i valori della tecnologia)
+            campo_valore: Id del campo di selezione di VALUE (None = filtro sui valori disattivato)
             
         Returns:
-            True se la transazione va a buon fine, False altrimenti
+            DataFrame pulito (esportazione su file), testo della clipboard, DataFrame vuoto con le colonne
+            della lista se la selezione non trova righe, oppure False in caso di errore
         """
         try:
-            # Svuota la clipboard prima dell'estrazione
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.CloseClipboard()
             # Naviga alla transazione SE16
             self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16"
             self.session.findById("wnd[0]").sendVKey(0)
             self.session.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text = "ZPM4R_GL_T_FL"
             self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(0.5)
+            if not self.wait_for_control("wnd[0]/usr/ctxtI4-LOW", "ZPM4R_GL_T_FL: schermata di selezione"):
+                print(f"Timeout durante l'esecuzione della transazione")
+                return False
             # filtro in base alla tecnologia                
             self.session.findById("wnd[0]/usr/ctxtI4-LOW").text = "Z-RLS" if fltechnology == "H" else "Z-R" + fltechnology + "S"
             self.session.findById("wnd[0]/usr/ctxtI5-LOW").text = "L" if fltechnology == "H" else fltechnology
             # modifico il numero massimo di risultati
             self.session.findById("wnd[0]/usr/txtMAX_SEL").text = "9999999"
             self.session.findById("wnd[0]").sendVKey(0)
-            # avvio la transazione
-            self.session.findById("wnd[0]").sendVKey(8)
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
-                print(f"Timeout durante l'esecuzione della transazione")
-                return False
-            time.sleep(0.5)    
-            # esporto i valori nella clipboard
-            self.session.findById("wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]").select()
-            # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            # Limito l'estrazione ai valori richiesti dalle FL
+            if valori and not self._imposta_selezione("ZPM4R_GL_T_FL", campo_valore, valori):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)                          
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
-            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
-            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+            # avvio la transazione
+            self.session.findById("wnd[0]").sendVKey(8)
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
+            if not self.wait_for_sap(30, "ZPM4R_GL_T_FL: esecuzione selezione"):
                 print(f"Timeout durante l'esecuzione della transazione")
                 return False
-            time.sleep(0.5)
-            # Attendi che la clipboard sia riempita
-            if not self.wait_for_clipboard_data(30):
-                # Gestisci il caso in cui non sono stati trovati dati
-                print("Nessun dato trovato nella clipboard")
-                # Eventuali azioni di fallback
-            # Leggo il contenuto della clipboard
-            return self.clipboard_data()
+            # Nessuna riga per i valori selezionati: non c'è una lista da esportare
+            if self._selezione_vuota():
+                return self._lista_vuota("ZPM4R_GL_T_FL")
+            # Esporto la lista (su file o nella clipboard) e leggo i dati
+            return self._esporta_lista("ZPM4R_GL_T_FL")
             
         except Exception as e:
             print(f"Errore nell'estrazione ZPM4R_GL_T_FL: {str(e)}")
             return False
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    def wait_for_sap(self, timeout: int = 30):  # timeout in secondi
+    def wait_for_sap(self, timeout: int = 30, passo: str = "SAP occupato"):  # timeout in secondi
         """
         Attende che SAP finisca le operazioni in corso
         
         Args:
             timeout: Tempo massimo di attesa in secondi
+            passo: Nome del passo per il quale si attende (per le latenze di SAPWaitStrategy)
         
         Returns:
             bool: True se SAP è diventato disponibile, False se è scaduto il timeout
         """
-        start_time = time.time()
-        
         try:
-            while self.session.Busy:
-                # Verifica timeout
-                if time.time() - start_time > timeout:
-                    print(f"Timeout dopo {timeout} secondi di attesa")
-                    return False
-                    
-                time.sleep(0.5)
-                print("SAP is busy")
-            
+            if not self.attesa.attendi_sap(self.session, passo, timeout):
+                print(f"Timeout dopo {timeout} secondi di attesa")
+                return False
             return True
             
         except Exception as e:
             print(f"Errore durante l'attesa: {str(e)}")
             return False
+
+    def wait_for_control(self, id_controllo: str, passo: str, presente: bool = True, timeout: int = 30) -> bool:
+        """
+        Attende che il controllo indicato compaia (o si chiuda, con presente=False) nella sessione SAP
+        
+        Returns:
+            bool: True se il controllo è nello stato atteso, False se è scaduto il timeout
+        """
+        try:
+            if not self.attesa.attendi_controllo(self.session, id_controllo, passo, presente, timeout):
+                print(f"Timeout dopo {timeout} secondi di attesa del controllo {id_controllo}")
+                return False
+            return True
+
+        except Exception as e:
+            print(f"Errore durante l'attesa: {str(e)}")
+            return False
             
-    def wait_for_clipboard_data(self, timeout: int = 30) -> bool:
+    def wait_for_clipboard_data(self, timeout: int = 30, passo: str = "Clipboard") -> bool:
         """
         Attende che la clipboard contenga dei dati
         
         Args:
             timeout: Tempo massimo di attesa in secondi
+            passo: Nome del passo per il quale si attende (per le latenze di SAPWaitStrategy)
             
         Returns:
             bool: True se sono stati trovati dati, False se è scaduto il timeout
         """
-        start_time = time.time()
-        last_print_time = 0  # Per limitare i messaggi di log
-        print_interval = 2   # Intervallo in secondi tra i messaggi di log
-        
-        while True:
-            current_time = time.time()
-            
-            # Verifica timeout
-            if current_time - start_time > timeout:
-                print(f"Timeout: nessun dato trovato nella clipboard dopo {timeout} secondi")
-                return False
-            
+        def dati_presenti():
             try:
-                # Controlla il contenuto della clipboard
-                win32clipboard.OpenClipboard()
-                try:
-                    # Verifica se c'è del testo nella clipboard
-                    if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
-                        data = win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
-                        if data and data.strip():
-                            print("Dati trovati nella clipboard")
-                            return True
-                finally:
-                    win32clipboard.CloseClipboard()
-                
-                # Stampa il messaggio di attesa solo ogni print_interval secondi
-                if current_time - last_print_time >= print_interval:
-                    print("In attesa dei dati nella clipboard...")
-                    last_print_time = current_time
-                
-                # Aspetta prima del prossimo controllo
-                time.sleep(0.1)  # Ridotto il tempo di attesa per una risposta più veloce
-                
-            except win32clipboard.error as we:
+                # Verifica se c'è del testo nella clipboard
+                data = self.clipboard.leggi()
+            except self.clipboard.errore as we:
+                # Clipboard occupata da un altro processo: riprovo al controllo successivo
                 print(f"Errore Windows Clipboard: {str(we)}")
-                time.sleep(0.5)  # Attesa più lunga in caso di errore
-                continue
-            except Exception as e:
-                print(f"Errore durante il controllo della clipboard: {str(e)}")
-                return False  
+                return False
+            return bool(data and data.strip())
+
+        try:
+            if self.attesa.attendi(passo, dati_presenti, timeout):
+                print("Dati trovati nella clipboard")
+                return True
+            print(f"Timeout: nessun dato trovato nella clipboard dopo {timeout} secondi")
+            return False
+
+        except Exception as e:
+            print(f"Errore durante il controllo della clipboard: {str(e)}")
+            return False  
 
     def clipboard_data(self) -> Optional[pd.DataFrame]:
         """
@@ -689,11 +1014,7 @@ class SAPDataExtractor:
         """
         try:
             # Legge il contenuto della clipboard
-            win32clipboard.OpenClipboard()
-            try:
-                data = win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
-            finally:
-                win32clipboard.CloseClipboard()
+            data = self.clipboard.leggi()
 
             if not data:
                 print("Nessun dato trovato nella clipboard")
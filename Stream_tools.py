@@ -0,0 +1,185 @@
+import logging
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from DF_Tools import DataFrameTools
+from RE_tools import RegularExpressionsTools
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("StreamValidator")
+
+
+class StreamValidator:
+    """
+    Validazione in streaming di file di FL di grandi dimensioni.
+
+    Il file viene letto a blocchi di chunk_size righe: per ogni blocco vengono eseguiti i controlli
+    di maschera generica, maschera della tecnologia, duplicati e linee guida, e i risultati vengono
+    accodati al file di output. In memoria restano solo il blocco corrente e le impronte a 64 bit
+    delle FL distinte già lette, usate per riconoscere i duplicati tra blocchi diversi: sono tenute in
+    array np.uint64 ordinati (8 byte per FL distinta), fusi a coppie di dimensione simile man mano che
+    i blocchi vengono aggiunti, per cui la ricerca costa al più una searchsorted per array e ogni
+    impronta viene copiata O(log n) volte.
+    """
+
+    # Colonne del file dei risultati
+    COLONNE_OUTPUT = ['Riga', 'FL', 'FL_Lunghezza', 'Categoria',
+                      'Maschera_Generica', 'Maschera_Tecnologia', 'Duplicato', 'Check_Result']
+
+    def __init__(self,
+                 maschera_generica: str,
+                 df_regex: pd.DataFrame,
+                 regex_dict: Dict[str, List[str]],
+                 maschera_tecnologia: Optional[str] = None,
+                 chunk_size: int = 50000):
+        """
+        Args:
+            maschera_generica: Regex della maschera generica delle FL
+            df_regex: DataFrame delle linee guida prodotto da Make_DF_RE_list
+            regex_dict: Dizionario delle categorie usato da verifica_fl_con_regex_per_categorie
+            maschera_tecnologia: Regex della maschera specifica della tecnologia (colonna Regex di Mask_FL.csv)
+            chunk_size: Numero di righe elaborate per blocco
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size deve essere un intero positivo")
+
+        self.maschera_generica = re.compile(maschera_generica)
+        self.maschera_tecnologia = re.compile(maschera_tecnologia) if maschera_tecnologia else None
+        self.df_regex = df_regex
+        self.regex_dict = regex_dict
+        self.chunk_size = chunk_size
+
+        # Impronte ordinate delle FL già elaborate, per il controllo dei duplicati tra blocchi
+        self._impronte: List[np.ndarray] = []
+
+    @staticmethod
+    def _impronte_blocco(fl: pd.Series) -> np.ndarray:
+        """Impronte a 64 bit delle FL, usate al posto delle stringhe nel controllo dei duplicati"""
+        return pd.util.hash_array(fl.to_numpy(dtype=object))
+
+    def _gia_lette(self, impronte: np.ndarray) -> np.ndarray:
+        """Indica per ogni impronta se appartiene a una FL dei blocchi precedenti"""
+        trovate = np.zeros(impronte.size, dtype=bool)
+        for ordinate in self._impronte:
+            posizioni = np.searchsorted(ordinate, impronte)
+            posizioni[posizioni == ordinate.size] = 0
+            trovate |= ordinate[posizioni] == impronte
+        return trovate
+
+    def _aggiungi_impronte(self, impronte: np.ndarray) -> None:
+        """Aggiunge impronte nuove (distinte e non ancora presenti) agli array ordinati"""
+        self._impronte.append(np.sort(impronte))
+        # Fondo l'ultimo array con il precedente finché non è molto più piccolo: restano O(log n) array
+        while len(self._impronte) > 1 and self._impronte[-2].size <= 2 * self._impronte[-1].size:
+            ultimo = self._impronte.pop()
+            # L'ordinamento stabile di due sequenze già ordinate è una fusione lineare
+            self._impronte[-1] = np.sort(np.concatenate((self._impronte[-1], ultimo)), kind='stable')
+
+    @property
+    def n_impronte(self) -> int:
+        """Numero di FL distinte lette"""
+        return sum(ordinate.size for ordinate in self._impronte)
+
+    def _leggi_blocchi(self, file_input: str) -> Iterator[List[Tuple[int, str]]]:
+        """
+        Legge il file a blocchi di chunk_size righe non vuote, restituendo coppie (numero riga, FL)
+        """
+        with open(file_input, 'r', encoding='utf-8') as f:
+            righe = ((numero, riga.strip()) for numero, riga in enumerate(f, 1))
+            righe = (riga for riga in righe if riga[1])
+            while True:
+                blocco = list(islice(righe, self.chunk_size))
+                if not blocco:
+                    break
+                yield blocco
+
+    def _valida_blocco(self, blocco: List[Tuple[int, str]]) -> pd.DataFrame:
+        """
+        Esegue tutti i controlli su un blocco di righe e restituisce il DataFrame dei risultati
+        """
+        df_blocco = pd.DataFrame(blocco, columns=['Riga', 'FL'])
+        fl = df_blocco['FL']
+
+        # Maschere generica e della tecnologia
+        df_blocco['Maschera_Generica'] = fl.str.match(self.maschera_generica)
+        if self.maschera_tecnologia is not None:
+            df_blocco['Maschera_Tecnologia'] = fl.str.match(self.maschera_tecnologia)
+        else:
+            df_blocco['Maschera_Tecnologia'] = None
+
+        # Duplicati: la prima occorrenza è valida, le successive (nel blocco o nei blocchi precedenti) vengono segnalate
+        impronte = self._impronte_blocco(fl)
+        gia_lette = self._gia_lette(impronte)
+        ripetute = pd.Series(impronte).duplicated().to_numpy()
+        df_blocco['Duplicato'] = gia_lette | ripetute
+        nuove = ~(gia_lette | ripetute)
+        if nuove.any():
+            self._aggiungi_impronte(impronte[nuove])
+
+        # Linee guida
+        df_livelli, error = DataFrameTools.add_level_lunghezza(df_blocco[['Riga', 'FL']], 'FL')
+        if error is not None:
+            raise ValueError(f"Errore nel calcolo dei livelli del blocco: {error}")
+
+        df_verifica = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+            df_livelli, self.df_regex, self.regex_dict
+        )
+        df_blocco['FL_Lunghezza'] = df_livelli['FL_Lunghezza']
+
+        if df_verifica.empty:
+            df_blocco['Categoria'] = None
+            df_blocco['Check_Result'] = None
+        else:
+            df_blocco = df_blocco.merge(df_verifica[['Riga', 'Categoria', 'Check_Result']], on='Riga', how='left')
+
+        return df_blocco[self.COLONNE_OUTPUT]
+
+    def valida_file(self, file_input: str, file_output: str) -> Dict[str, int]:
+        """
+        Valida un file di FL (una FL per riga) scrivendo i risultati in modo incrementale.
+
+        Args:
+            file_input: Percorso del file delle FL
+            file_output: Percorso del file CSV dei risultati (separatore ';')
+
+        Returns:
+            Dict[str, int]: Riepilogo con il numero di righe elaborate e di errori per tipo di controllo
+
+        Raises:
+            FileNotFoundError: Se il file di input non esiste
+        """
+        if not Path(file_input).exists():
+            raise FileNotFoundError(f"Il file delle FL non esiste: {file_input}")
+
+        self._impronte.clear()
+        riepilogo = {
+            'Righe': 0,
+            'Blocchi': 0,
+            'Errori_Maschera_Generica': 0,
+            'Errori_Maschera_Tecnologia': 0,
+            'Duplicati': 0,
+            'Errori_Linee_Guida': 0
+        }
+
+        with open(file_output, 'w', encoding='utf-8', newline='') as output:
+            for blocco in self._leggi_blocchi(file_input):
+                df_risultati = self._valida_blocco(blocco)
+
+                # Scrivo il blocco e libero la memoria prima di leggere il successivo
+                df_risultati.to_csv(output, sep=';', index=False, header=(riepilogo['Blocchi'] == 0))
+
+                riepilogo['Righe'] += len(df_risultati)
+                riepilogo['Blocchi'] += 1
+                riepilogo['Errori_Maschera_Generica'] += int((df_risultati['Maschera_Generica'] == False).sum())
+                riepilogo['Errori_Maschera_Tecnologia'] += int((df_risultati['Maschera_Tecnologia'] == False).sum())
+                riepilogo['Duplicati'] += int(df_risultati['Duplicato'].sum())
+                riepilogo['Errori_Linee_Guida'] += int((df_risultati['Check_Result'] != True).sum())
+
+                logger.info(f"Blocco {riepilogo['Blocchi']} elaborato: {riepilogo['Righe']} righe totali")
+
+        return riepilogo
@@ -0,0 +1,250 @@
+from itertools import chain
+import numpy as np
+import pandas as pd
+from typing import Iterable, List
+
+
+class FLTree:
+    """
+    Albero compatto delle FL (gerarchia dei livelli separati da '-').
+
+    Ogni nodo è identificato da un intero: i segmenti vengono internati in un'unica lista di
+    stringhe e la struttura è memorizzata in array NumPy (genitore, segmento, livello, presenza
+    nella lista di input) con i figli in formato CSR (offset + indici), così che anche centinaia
+    di migliaia di nodi non richiedano un oggetto Python per nodo. I nodi non presenti nella
+    lista di input sono gli antenati mancanti delle FL inserite.
+    """
+
+    def __init__(self, segmenti: List[str], parent: np.ndarray, segmento: np.ndarray,
+                 livello: np.ndarray, presente: np.ndarray, nodi_input: np.ndarray):
+        """
+        Args:
+            segmenti: Segmenti internati (id segmento -> stringa)
+            parent: Indice del nodo genitore (-1 per i nodi di livello 1)
+            segmento: Id del segmento di ogni nodo
+            livello: Livello di ogni nodo (1-based)
+            presente: True se la FL del nodo è presente nella lista di input
+            nodi_input: Nodo corrispondente a ogni FL di input (-1 per i valori non validi)
+        """
+        self.segmenti = segmenti
+        self.parent = parent
+        self.segmento = segmento
+        self.livello = livello
+        self.presente = presente
+        self.nodi_input = nodi_input
+
+        n_nodi = len(parent)
+        con_genitore = parent >= 0
+
+        # Figli in formato CSR: i figli del nodo i sono figli[figli_offset[i]:figli_offset[i + 1]]
+        conteggi = np.bincount(parent[con_genitore], minlength=n_nodi)
+        self.figli_offset = np.zeros(n_nodi + 1, dtype=np.int32)
+        np.cumsum(conteggi, out=self.figli_offset[1:])
+        ordine = np.argsort(parent, kind='stable').astype(np.int32)
+        self.figli_indici = ordine[np.count_nonzero(~con_genitore):]
+
+        # Nodi ordinati per livello: i nodi del livello l sono nodi_per_livello[livelli_offset[l - 1]:livelli_offset[l]]
+        self.nodi_per_livello = np.argsort(livello, kind='stable').astype(np.int32)
+        max_livello = int(livello.max()) if n_nodi else 0
+        self.livelli_offset = np.zeros(max_livello + 1, dtype=np.int32)
+        np.cumsum(np.bincount(livello, minlength=max_livello + 1)[1:], out=self.livelli_offset[1:])
+
+        # Indice di ricerca (genitore, segmento) -> nodo, come array ordinato di chiavi int64
+        chiavi = (parent.astype(np.int64) + 1) * max(len(segmenti), 1) + segmento
+        ordine_chiavi = np.argsort(chiavi, kind='stable')
+        self._chiavi = chiavi[ordine_chiavi]
+        self._nodi_chiavi = ordine_chiavi.astype(np.int32)
+        self._id_segmenti = {s: i for i, s in enumerate(segmenti)}
+
+    @classmethod
+    def from_fl(cls, fl_values: Iterable[str]) -> 'FLTree':
+        """
+        Costruisce l'albero a partire da una sequenza di FL, creando anche i nodi degli antenati mancanti.
+
+        Args:
+            fl_values: FL da inserire (es. df['FL'])
+
+        Returns:
+            FLTree: Albero delle FL
+        """
+        valori = list(fl_values)
+        # I valori non stringa non vengono inseriti nell'albero
+        righe_valide = np.flatnonzero(np.fromiter((isinstance(v, str) for v in valori), dtype=np.bool_, count=len(valori)))
+        n_righe = len(righe_valide)
+        if n_righe == 0:
+            vuoto = np.empty(0, dtype=np.int32)
+            return cls(segmenti=[], parent=vuoto, segmento=vuoto.copy(), livello=np.empty(0, dtype=np.int8),
+                       presente=np.empty(0, dtype=np.bool_), nodi_input=np.full(len(valori), -1, dtype=np.int32))
+
+        # Segmenti di tutte le FL, internati nell'ordine di lettura delle righe:
+        # i segmenti della riga i sono codici[inizio[i]:inizio[i] + lunghezze[i]]
+        parti = [valori[riga].split('-') for riga in righe_valide.tolist()]
+        lunghezze = np.fromiter(map(len, parti), dtype=np.int64, count=n_righe)
+        inizio = np.zeros(n_righe, dtype=np.int64)
+        np.cumsum(lunghezze[:-1], out=inizio[1:])
+        codici, segmenti = pd.factorize(np.fromiter(chain.from_iterable(parti), dtype=object, count=int(lunghezze.sum())))
+        n_livelli = int(lunghezze.max())
+
+        # Per ogni livello un nodo per ogni prefisso distinto, identificato dalla coppia (nodo genitore, segmento):
+        # pd.factorize numera i nodi del livello nell'ordine di prima comparsa nelle righe
+        n_segmenti = max(len(segmenti), 1)
+        prime_righe, genitori_livello, segmenti_livello = [], [], []
+        nodi_righe = np.full(n_righe, -1, dtype=np.int64)
+        for lv in range(n_livelli):
+            righe = np.flatnonzero(lunghezze > lv)
+            chiavi = (nodi_righe[righe] + 1) * n_segmenti + codici[inizio[righe] + lv]
+            nodi, uniche = pd.factorize(chiavi)
+            nodi_righe[righe] = nodi
+            # Una riga introduce un nuovo nodo quando il suo codice supera tutti i precedenti
+            massimi = np.maximum.accumulate(nodi)
+            prime = np.flatnonzero(np.concatenate(([True], massimi[1:] != massimi[:-1])))
+            prime_righe.append(righe[prime])
+            genitori_livello.append(uniche // n_segmenti - 1)
+            segmenti_livello.append(uniche % n_segmenti)
+
+        # I nodi sono numerati come se le FL venissero inserite una alla volta:
+        # per riga di prima comparsa e, a parità di riga, per livello
+        conteggi = [len(prime) for prime in prime_righe]
+        livello = np.repeat(np.arange(1, n_livelli + 1, dtype=np.int8), conteggi)
+        ordine = np.lexsort((livello, np.concatenate(prime_righe)))
+        numerazione = np.empty(len(ordine), dtype=np.int32)
+        numerazione[ordine] = np.arange(len(ordine), dtype=np.int32)
+        offset_livelli = np.concatenate(([0], np.cumsum(conteggi)))
+
+        parent = np.empty(len(ordine), dtype=np.int32)
+        for lv in range(n_livelli):
+            genitori = genitori_livello[lv]
+            if lv > 0:
+                genitori = numerazione[offset_livelli[lv - 1] + genitori]
+            parent[numerazione[offset_livelli[lv]:offset_livelli[lv + 1]]] = genitori
+        segmento = np.empty(len(ordine), dtype=np.int32)
+        segmento[numerazione] = np.concatenate(segmenti_livello)
+        livello_nodi = np.empty(len(ordine), dtype=np.int8)
+        livello_nodi[numerazione] = livello
+
+        # Nodo dell'ultimo livello di ogni FL di input
+        nodi_validi = numerazione[offset_livelli[lunghezze - 1] + nodi_righe]
+        presente = np.zeros(len(ordine), dtype=np.bool_)
+        presente[nodi_validi] = True
+        nodi_input = np.full(len(valori), -1, dtype=np.int32)
+        nodi_input[righe_valide] = nodi_validi
+
+        return cls(
+            segmenti=list(segmenti),
+            parent=parent,
+            segmento=segmento,
+            livello=livello_nodi,
+            presente=presente,
+            nodi_input=nodi_input
+        )
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dagli array dell'albero (esclusi i segmenti internati)"""
+        return sum(a.nbytes for a in (self.parent, self.segmento, self.livello, self.presente, self.nodi_input,
+                                      self.figli_offset, self.figli_indici, self.nodi_per_livello,
+                                      self.livelli_offset, self._chiavi, self._nodi_chiavi))
+
+    def nodo(self, fl_value: str) -> int:
+        """
+        Restituisce il nodo della FL, -1 se la FL non appartiene all'albero
+        """
+        nodo = -1
+        n_segmenti = max(len(self.segmenti), 1)
+        for testo in fl_value.split('-'):
+            id_segmento = self._id_segmenti.get(testo)
+            if id_segmento is None:
+                return -1
+            chiave = (nodo + 1) * n_segmenti + id_segmento
+            posizione = np.searchsorted(self._chiavi, chiave)
+            if posizione == len(self._chiavi) or self._chiavi[posizione] != chiave:
+                return -1
+            nodo = int(self._nodi_chiavi[posizione])
+        return nodo
+
+    def antenati(self, nodo: int) -> np.ndarray:
+        """
+        Restituisce il percorso dal nodo di livello 1 al nodo indicato (incluso)
+        """
+        percorso = np.empty(int(self.livello[nodo]), dtype=np.int32)
+        for posizione in range(len(percorso) - 1, -1, -1):
+            percorso[posizione] = nodo
+            nodo = self.parent[nodo]
+        return percorso
+
+    def percorso(self, nodo: int) -> List[str]:
+        """
+        Restituisce i segmenti della FL del nodo, dal livello 1 al livello del nodo
+        """
+        return [self.segmenti[s] for s in self.segmento[self.antenati(nodo)]]
+
+    def fl(self, nodo: int) -> str:
+        """
+        Ricostruisce la FL del nodo
+        """
+        return '-'.join(self.percorso(nodo))
+
+    def figli(self, nodo: int) -> np.ndarray:
+        """
+        Restituisce i figli diretti del nodo
+        """
+        return self.figli_indici[self.figli_offset[nodo]:self.figli_offset[nodo + 1]]
+
+    def nodi_livello(self, livello: int) -> np.ndarray:
+        """
+        Restituisce i nodi del livello indicato (1-based), nell'ordine di creazione
+        """
+        if livello < 1 or livello >= len(self.livelli_offset):
+            return np.empty(0, dtype=np.int32)
+        return self.nodi_per_livello[self.livelli_offset[livello - 1]:self.livelli_offset[livello]]
+
+    def conteggio_sottoalbero(self) -> np.ndarray:
+        """
+        Restituisce, per ogni nodo, il numero di FL presenti nel suo sottoalbero (nodo incluso)
+        """
+        conteggi = self.presente.astype(np.int64)
+        # Accumulo i conteggi dal livello più profondo verso la radice
+        for livello in range(len(self.livelli_offset) - 1, 1, -1):
+            nodi = self.nodi_livello(livello)
+            np.add.at(conteggi, self.parent[nodi], conteggi[nodi])
+        return conteggi
+
+    def _nodi_parent_mancanti(self, max_livello: int) -> np.ndarray:
+        """
+        Restituisce i nodi dei genitori diretti mancanti delle FL di input di livello 2..max_livello,
+        senza duplicati, ordinati per livello della FL figlia e poi per ordine delle righe di input
+        """
+        validi = self.nodi_input[self.nodi_input >= 0]
+        livelli = self.livello[validi]
+        figli = validi[(livelli >= 2) & (livelli <= max_livello)]
+        genitori = self.parent[figli]
+        mancanti = ~self.presente[genitori]
+
+        # Ordino per livello mantenendo l'ordine delle righe e tengo la prima occorrenza di ogni genitore
+        genitori = genitori[mancanti][np.argsort(self.livello[figli[mancanti]], kind='stable')]
+        _, prime = np.unique(genitori, return_index=True)
+        return genitori[np.sort(prime)]
+
+    def parent_mancanti(self, max_livello: int = 6) -> List[str]:
+        """
+        Restituisce i genitori diretti mancanti delle FL di input di livello 2..max_livello,
+        senza duplicati, per livello crescente e nell'ordine delle FL di input
+        """
+        return [self.fl(int(nodo)) for nodo in self._nodi_parent_mancanti(max_livello)]
+
+    def antenati_mancanti(self, max_livello: int = 6) -> List[str]:
+        """
+        Restituisce i genitori mancanti e tutti i loro antenati mancanti, ordinati per livello
+        in modo che ogni FL segua il proprio genitore
+        """
+        ordine = {}
+        for nodo in self._nodi_parent_mancanti(max_livello).tolist():
+            # Risalgo la gerarchia fino al primo antenato presente o già raccolto
+            while nodo >= 0 and not self.presente[nodo] and nodo not in ordine:
+                ordine[nodo] = int(self.livello[nodo])
+                nodo = int(self.parent[nodo])
+
+        return [self.fl(nodo) for nodo in sorted(ordine, key=ordine.get)]
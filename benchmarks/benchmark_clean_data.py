@@ -0,0 +1,49 @@
+"""
+Confronto dei tempi di clean_data con la versione originale riga per riga, sulla stampa SE16
+ricostruita dall'estratto df_ZPM4R_GL_T_FL.csv del repository.
+
+Uso:
+    python benchmarks/benchmark_clean_data.py [ripetizioni]
+"""
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+# I moduli del programma e gli estratti di esempio sono nella cartella principale del repository
+CARTELLA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARTELLA_REPO)
+
+from DF_Tools import DataFrameTools
+from utils.lista_se16 import clean_data_originale, rendi_lista_se16
+
+
+def misura(funzione, testo, ripetizioni):
+    """Restituisce la mediana dei tempi di esecuzione in millisecondi"""
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione(testo)
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return statistics.median(tempi)
+
+
+def main():
+    ripetizioni = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    df = pd.read_csv(os.path.join(CARTELLA_REPO, "df_ZPM4R_GL_T_FL.csv"), sep=';', dtype=str, keep_default_na=False)
+    testo = rendi_lista_se16(list(df.columns), df.to_numpy().tolist())
+    print(f"Stampa SE16 di {len(df)} righe ({len(testo.encode('utf-8')) / 1e6:.1f} MB), mediana di {ripetizioni} esecuzioni")
+
+    risultati = {
+        "clean_data originale": lambda t: clean_data_originale(t),
+        "clean_data originale + strip dei valori": lambda t: clean_data_originale(t).apply(lambda c: c.str.strip()),
+        "clean_data (valori già ripuliti)": DataFrameTools.clean_data,
+    }
+    for nome, funzione in risultati.items():
+        print(f"  {nome:<42} {misura(funzione, testo, ripetizioni):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
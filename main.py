@@ -2,6 +2,7 @@ from ast import pattern
 from opcode import hasconst
 import os
 import sys
+import multiprocessing
 import pandas as pd
 import re
 import DF_Tools
@@ -9,14 +10,16 @@ import File_tools
 import RE_tools
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, 
                            QHBoxLayout, QWidget, QTextEdit, QListWidget, QLabel, QMessageBox,
-                           QDialog, QRadioButton, QButtonGroup, QDialogButtonBox, QListWidgetItem, QStyle, QMenu, QAction)
-from PyQt5.QtCore import Qt
+                           QDialog, QRadioButton, QButtonGroup, QDialogButtonBox, QListWidgetItem, QStyle, QMenu, QAction,
+                           QFileDialog)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QCursor
 import SAP_Connection
 import SAP_Transactions
 import DF_Tools
 import Config.constants as constants
 from RE_tools import RegularExpressionsTools
+from Stream_tools import StreamValidator
 
 import logging
 
@@ -40,6 +43,18 @@ class MainWindow(QMainWindow):
         self.df_utils = DF_Tools.DataFrameTools()
         self.file_utils = File_tools.FileTools()
         self.re_utils = RE_tools.RegularExpressionsTools()
+        # Livelli, lunghezza e Check delle FL già elaborate (indicizzati per FL) e risultati
+        # della verifica con le linee guida, riutilizzati quando la verifica viene ripetuta
+        self.df_FL_parse = None
+        self.verifica_memo = RE_tools.VerificaMemo()
+        # Snapshot locali delle tabelle globali SAP, riutilizzati finché non scadono
+        self.snapshot_SAP = File_tools.SAPSnapshotStore(constants.path_snapshot_SAP, constants.Snapshot_SAP_TTL_minuti)
+        # Connessione SAP condivisa da estrazione e caricamento, stabilita al primo utilizzo
+        self.sap_connessione = SAP_Connection.SAPConnectionManager()
+        # Controllo periodico (ogni minuto) dell'inattività della connessione SAP
+        self.timer_sap = QTimer(self)
+        self.timer_sap.timeout.connect(self.sap_connessione.rilascia_se_inattiva)
+        self.timer_sap.start(60 * 1000)
         # Inizializza l'interfaccia utente
         self.setWindowTitle("FL Validator")
         self.setGeometry(100, 100, 1000, 600)
@@ -110,6 +125,11 @@ class MainWindow(QMainWindow):
         self.extract_button.clicked.connect(self.extract_data)
         button_layout.addWidget(self.extract_button)
         
+        # Bottone Verifica File
+        self.verify_file_button = QPushButton('Verifica File')
+        self.verify_file_button.clicked.connect(self.verify_file)
+        button_layout.addWidget(self.verify_file_button)
+        
         # Bottone Upload
         self.upload_button = QPushButton('Upload Dati')
         self.upload_button.clicked.connect(self.upload_data)
@@ -179,6 +199,30 @@ class MainWindow(QMainWindow):
         self.log_list.addItem(item)
         self.log_list.scrollToBottom()
 
+    def log_messages(self, messages, icon_type='info'):
+        """
+        Aggiunge al log un elenco di messaggi con la stessa icona, aggiornando la vista una sola volta
+        """
+        icon = {
+            'info': QStyle.SP_MessageBoxInformation,
+            'error': QStyle.SP_MessageBoxCritical,
+            'success': QStyle.SP_DialogApplyButton,
+            'warning': QStyle.SP_MessageBoxWarning,
+            'loading': QStyle.SP_BrowserReload
+        }.get(icon_type)
+        icon = self.style().standardIcon(icon) if icon is not None else None
+
+        self.log_list.setUpdatesEnabled(False)
+        try:
+            for message in messages:
+                item = QListWidgetItem(message)
+                if icon is not None:
+                    item.setIcon(icon)
+                self.log_list.addItem(item)
+        finally:
+            self.log_list.setUpdatesEnabled(True)
+        self.log_list.scrollToBottom()
+
 
     """ 
         def log_message(self, message, icon_type='info'):
@@ -227,6 +271,30 @@ class MainWindow(QMainWindow):
         self.upload_button.setEnabled(False)
         self.log_message("Finestre pulite")
 
+    def log_validation_errors(self, df_errori, descrizione, titolo="Errore di Validazione"):
+        """
+        Riporta nel log tutte le righe che non hanno superato una validazione e mostra un unico
+        messaggio riepilogativo all'utente.
+
+        Args:
+            df_errori: DataFrame con le colonne 'Riga' e 'FL' delle righe non valide
+            descrizione: Descrizione della maschera non rispettata (es. "le maschere FL")
+            titolo: Titolo della finestra di dialogo
+        """
+        messaggi = [f"Errore riga {riga}: la FL: {fl} non rispetta {descrizione}"
+                    for riga, fl in zip(df_errori['Riga'].tolist(), df_errori['FL'].tolist())]
+        riepilogo = f"Errore: {len(messaggi)} FL non rispett{'a' if len(messaggi) == 1 else 'ano'} {descrizione}"
+
+        self.log_message(riepilogo, 'error')
+        self.log_messages(messaggi, 'error')
+
+        # Nella finestra di dialogo mostro solo le prime righe, l'elenco completo è nel log
+        max_righe = 20
+        dettaglio = "\n".join(messaggi[:max_righe])
+        if len(messaggi) > max_righe:
+            dettaglio += f"\n... altre {len(messaggi) - max_righe} righe (vedi log)"
+        QMessageBox.warning(self, titolo, f"{riepilogo}\n\n{dettaglio}")
+
     def validate_clipboard_data(self):
         """Valida i dati nella finestra di testo sinistra (clipboard_area)"""
         data = self.clipboard_area.toPlainText().strip().split('\n')
@@ -237,28 +305,17 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Attenzione", "Inserire i dati nella finestra di sinistra prima di procedere.")
             return False
             
-        # Esempio di pattern regex per la validazione
+        # Validazione di tutte le righe in un solo passaggio:
         # utilizzo una maschera generica, dato che ancora non ho rilevato la tecnologia
-        patterns = {
-            'MaskGenerica': r'^(?:([A-Z0-9]{3})(?:-([A-Z0-9]{4})(?:-([A-Z0-9]{2})(?:-([A-Z0-9]{2,3})(?:-([A-Z0-9]{2,3})(?:-([A-Z0-9]{2}))?)?)?)?)?)?$',
-            # aggiungere altre maschere se necessario
-        }
-        
-        #lines = data.split('\n')
-        for i, line in enumerate(data, 1):
-            if not line.strip():
-                continue
-                
-            try:
-                if not re.match(patterns['MaskGenerica'], line):
-                    error_msg = (f"Errore riga {i}: la FL: {line} non rispetta le maschere FL")
-                    self.log_message(error_msg, 'error')
-                    QMessageBox.warning(self, "Errore di Validazione", error_msg)
-                    return False                 
+        try:
+            df_errori = RegularExpressionsTools.trova_fl_non_conformi(pd.Series(data, dtype=object), constants.mask_FL_generica)
+        except Exception as e:
+            self.log_message(f"Errore nella validazione dei dati: {str(e)}", 'error')
+            return False
 
-            except Exception as e:
-                self.log_message(f"Errore nel processare la riga {i}: {str(e)}", 'error')
-                return False
+        if not df_errori.empty:
+            self.log_validation_errors(df_errori, "le maschere FL")
+            return False
                 
         self.log_message("Validazione dati completata con successo", 'success')
         return True  
@@ -285,35 +342,21 @@ class MainWindow(QMainWindow):
                                         valore_da_cercare=technology, 
                                         colonna_da_cercare="Tech", 
                                         colonna_da_restituire="Mask")
-            # Verifica se è stata trovata una maschera valida per la tecnologia specificata
-            try:
-                compiled_regex = re.compile(regex_pattern)
-                # La regex è valida
-            except re.error as e:
-                self.log_message(f"Errore nella regex: {str(e)}", 'error')
-                return False
-            
             # Log di successo se la maschera è stata trovata
             self.log_message(f"Mask: {technology} = {regex_mask}", 'success')
         
-        # Itera su tutti i valori nella colonna FL del dataframe
-        for valore in dataframe[nome_colonna_fl]:
-            try:
-                # Verifica se il valore corrente rispetta il pattern regex
-                if not compiled_regex.match(valore):
-                    # Crea un messaggio di errore dettagliato
-                    error_msg = (f"Errore il valore {valore} non rispetta la maschera {regex_mask}")
-                    # Log dell'errore
-                    self.log_message(error_msg, 'error')
-                    # Mostra una finestra di dialogo all'utente con l'errore
-                    QMessageBox.warning(self, "Errore di Validazione", error_msg)
-                    # Interrompe la validazione al primo errore trovato
-                    return False                 
-            except Exception as e:
-                # Gestisce eventuali eccezioni durante il processo di validazione
-                self.log_message(f"Errore nel processare il valore {valore}: {str(e)}", 'error')
-                # Interrompe la validazione in caso di eccezione
-                return False
+        # Verifica tutti i valori della colonna FL in un solo passaggio
+        try:
+            df_errori = RegularExpressionsTools.trova_fl_non_conformi(dataframe[nome_colonna_fl], regex_pattern)
+        except Exception as e:
+            # Gestisce regex non valide ed eventuali eccezioni durante il processo di validazione
+            self.log_message(f"Errore nella regex: {str(e)}", 'error')
+            return False
+
+        if not df_errori.empty:
+            # Riporta nel log tutte le FL che non rispettano la maschera
+            self.log_validation_errors(df_errori, f"la maschera {regex_mask}")
+            return False
                 
         # Se tutti i valori rispettano la maschera, log di successo
         #self.log_message("Validazione maschera completata con successo", 'success')
@@ -327,26 +370,15 @@ class MainWindow(QMainWindow):
             data = self.clipboard_area.toPlainText().strip().split('\n')
             data = [line.strip() for line in data if line.strip()]  # Rimuove linee vuote
             
-            # Crea DataFrame base con colonna FL
-            df = pd.DataFrame(data, columns=['FL'])
-            
-            # Aggiunge le colonne per i livelli e la lunghezza 
-            df, error = self.df_utils.add_level_lunghezza(df, 'FL')
-            if error is None:
-                print("Aggiunta colonna lunghezza al DF delle FL")
-                print(df)  # Funziona correttamente
-            else:
-                print(f"Si è verificato un errore: {error}")
-                return
+            # Elaboro solo le FL nuove o modificate rispetto alla verifica precedente:
+            # le altre riutilizzano livelli, lunghezza e Check già calcolati
+            risultato, error = self.df_utils.parse_fl_incrementale(data, self.df_FL_parse)
+            if error is not None:
+                self.log_message(f"Errore nella creazione del DataFrame: {error}", 'error')
+                return False
+            df, self.df_FL_parse = risultato
+            print(df)
 
-            # Aggiunge la colonna <Check> per la verifica della presenza delle singole FL nelle tabelle globali
-            df, error = self.df_utils.add_concatenated_column_FL(df, "Livello_6", "Livello_5", "Livello_4", "Livello_3", "FL_Lunghezza")
-            if error is None:
-                print("Aggiunta colonna check al DF delle FL")
-                print(df)  # Funziona correttamente
-            else:
-                print(f"Si è verificato un errore: {error}")
-                return            
             # Memorizza il DataFrame
             self.df_FL = df
             
@@ -372,62 +404,90 @@ class MainWindow(QMainWindow):
             self.log_message(f"Errore nella creazione del DataFrame: {str(e)}", 'error')
             return False       
 
-    def VerificaParent(self, df):
+    def VerificaParent(self, df, tutti_gli_antenati=False):
         """
-        Crea un dizionario con 6 chiavi (1-6) a partire da un DataFrame
-        che contiene le colonne 'FL' e 'FL_Lunghezza'.
-        Verifica anche che ogni elemento del livello n abbia un genitore nel livello n-1.
+        Verifica che ogni elemento del livello n abbia un genitore nel livello n-1,
+        a partire dalla gerarchia FLTree delle FL contenute nel DataFrame.
         
         Parameters:
-        df (pandas.DataFrame): DataFrame con colonne 'FL' e 'FL_Lunghezza'
+        df (pandas.DataFrame): DataFrame con la colonna 'FL'
+        tutti_gli_antenati (bool): Se True restituisce anche gli antenati mancanti dei genitori mancanti
         
         Returns:
         list: contenente gli elementi senza Parent
         """
-        # Verifica che il DataFrame contenga le colonne necessarie
-        if 'FL' not in df.columns or 'FL_Lunghezza' not in df.columns:
-            raise ValueError("Il DataFrame deve contenere le colonne 'FL' e 'FL_Lunghezza'")
-        
-        # Inizializza il dizionario con le 7 chiavi richieste
-        dizionario = {
-            1: [],
-            2: [],
-            3: [],
-            4: [],
-            5: [],
-            6: []
-        }
-        
-        # Prima passa: popoliamo il dizionario in base alla lunghezza FL
-        for i in range(1, 7):
-            filtered_df = df[df['FL_Lunghezza'] == i]
-            dizionario[i] = filtered_df['FL'].tolist()
-        
-        # Identificare gli elementi senza genitori corretti
-        parent_mancanti = []
-        
-        # Seconda passa: controlliamo che ogni elemento abbia un genitore corretto
-        for livello in range(2, 7):  # Partiamo dal livello 2 fino al 6
-            # Per ogni elemento nel livello corrente
-            for elemento in dizionario[livello][:]:  # Usiamo una copia della lista con [:]
-                # Troviamo il potenziale genitore rimuovendo l'ultimo segmento
-                ultima_occorrenza = elemento.rfind('-')
-                if ultima_occorrenza != -1:
-                    potenziale_genitore = elemento[:ultima_occorrenza]
-                    
-                    # Verifichiamo se il genitore è presente nel livello n-1
-                    if potenziale_genitore not in dizionario[livello-1]:
-                        # Se non è presente, lo spostiamo in NoParent
-                        self.append_unique(parent_mancanti, potenziale_genitore)
- 
-        return parent_mancanti
-    
-    # Funzione helper per aggiungere elementi univoci
-    def append_unique(self, lista, elemento):
-        if elemento not in lista:
-            lista.append(elemento)
-            return True
-        return False     
+        return self.df_utils.trova_parent_mancanti(df, tutti_gli_antenati)
+
+    def get_guideline_config(self, tech_code):
+        """
+        Restituisce i file delle linee guida e il dizionario delle categorie per la tecnologia.
+        Per la tecnologia solare chiede all'utente il tipo di inverter.
+
+        Returns:
+            tuple: (lista dei file guideline, dizionario delle categorie di regex),
+                   None se la tecnologia non è riconosciuta o la selezione viene annullata
+        """
+        if tech_code == 'E':
+            # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
+            File_guideLine_list = [constants.file_FL_B_SubStation, constants.file_FL_Bess]
+            # Definisco il dizionario di regex
+            regex_dict = {
+                'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
+                'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0E',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-WE',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZE']
+            }            
+
+        elif tech_code == 'W':
+            # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
+            File_guideLine_list = [constants.file_FL_W_SubStation, constants.file_FL_Wind]
+            # Definisco il dizionario di regex            
+            regex_dict = {
+                'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
+                'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00']
+            }             
+
+        elif tech_code == 'S':
+            # Apri la finestra di dialogo per selezionare il tipo di inverter
+            self.log_message("Tecnologia Solare rilevata: selezione tipo inverter...", 'info')
+            dialog = InverterSelectionDialog(self)
+            if dialog.exec_() == QDialog.Accepted:
+                inverter_type = dialog.get_selected_inverter_type()
+                self.log_message(f"Tipo di inverter selezionato: {inverter_type}", 'success')
+
+                # Creo una lista con i file delle guideLine da utilizzare per la tecnologia solare
+                # con il tipo di inverter specifico
+                File_guideLine_list = [constants.file_FL_S_SubStation, constants.file_FL_Solar_Common]
+
+                # Aggiungi il file specifico per il tipo di inverter selezionato
+                if inverter_type == "Central Inverter":
+                    File_guideLine_list.append(constants.file_FL_Solar_CentralInv)
+                elif inverter_type == "String Inverter":
+                    File_guideLine_list.append(constants.file_FL_Solar_StringInv)
+                elif inverter_type == "Inverter Module":
+                    File_guideLine_list.append(constants.file_FL_Solar_InvModule)
+                # Definisco il dizionario di regex                    
+                regex_dict = {
+                    'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
+                    'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZZ',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-9Z']
+                } 
+
+            else:
+                # L'utente ha annullato la selezione dell'inverter
+                self.log_message("Selezione tipo inverter annullata", 'warning')
+                return None
+
+        elif tech_code == 'H':
+            # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
+            File_guideLine_list = [constants.file_FL_Hydro]
+            # Definisco il dizionario di regex                    
+            regex_dict = {
+                'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
+                'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZZ',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-9Z']
+            }             
+        else:
+            self.log_message("Errore: Tecnologia non riconosciuta", 'error')
+            return None
+
+        return File_guideLine_list, regex_dict
 
     # ----------------------------------------------------
     # Routine associata al tasto <Estrai Dati>
@@ -582,9 +642,14 @@ class MainWindow(QMainWindow):
                     self.log_message("Check: Verifica Parent", 'success')
                 else:
                     self.log_message(f"Errore: {len(NoParentList)} Parent mancant{'e' if len(NoParentList) == 1 else 'i'}.", 'error')
-                for element in NoParentList:
-                    # Ottieni il messaggio di dettaglio
-                    self.log_message(f"Parent: {element} mancante.", 'warning')
+                    # Messaggi di dettaglio
+                    self.log_messages([f"Parent: {element} mancante." for element in NoParentList], 'warning')
+
+                    if constants.Check_parent_antenati:
+                        # Elenco completo degli antenati mancanti, ordinato per livello e pronto da incollare
+                        antenati_mancanti = self.VerificaParent(self.df_FL, tutti_gli_antenati=True)
+                        self.log_message(f"FL da aggiungere per completare la gerarchia: {len(antenati_mancanti)}", 'info')
+                        self.log_messages(antenati_mancanti, 'info')
                     
             except Exception as e:
                 print(f"Errore durante la verifica dei parent: {str(e)}")
@@ -600,77 +665,23 @@ class MainWindow(QMainWindow):
             Questo permette di applicare i pattern corretti a seconda della categoria di FL, in modo da non avere duplicati nei controlli
 
             """
-            if tech_code == 'E':
-                # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
-                File_guideLine_list = [constants.file_FL_B_SubStation, constants.file_FL_Bess]
-                # Definisco il dizionario di regex
-                regex_dict = {
-                    'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
-                    'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0E',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-WE',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZE']
-                }            
-
-            elif tech_code == 'W':
-                # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
-                File_guideLine_list = [constants.file_FL_W_SubStation, constants.file_FL_Wind]
-                # Definisco il dizionario di regex            
-                regex_dict = {
-                    'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
-                    'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00']
-                }             
-
-            elif tech_code == 'S':
-                # Apri la finestra di dialogo per selezionare il tipo di inverter
-                self.log_message("Tecnologia Solare rilevata: selezione tipo inverter...", 'info')
-                dialog = InverterSelectionDialog(self)
-                if dialog.exec_() == QDialog.Accepted:
-                    inverter_type = dialog.get_selected_inverter_type()
-                    self.log_message(f"Tipo di inverter selezionato: {inverter_type}", 'success')
-                    
-                    # Creo una lista con i file delle guideLine da utilizzare per la tecnologia solare
-                    # con il tipo di inverter specifico
-                    File_guideLine_list = [constants.file_FL_S_SubStation, constants.file_FL_Solar_Common]
-                    
-                    # Aggiungi il file specifico per il tipo di inverter selezionato
-                    if inverter_type == "Central Inverter":
-                        File_guideLine_list.append(constants.file_FL_Solar_CentralInv)
-                    elif inverter_type == "String Inverter":
-                        File_guideLine_list.append(constants.file_FL_Solar_StringInv)
-                    elif inverter_type == "Inverter Module":
-                        File_guideLine_list.append(constants.file_FL_Solar_InvModule)
-                    # Definisco il dizionario di regex                    
-                    regex_dict = {
-                        'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
-                        'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZZ',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-9Z']
-                    } 
-
-                else:
-                    # L'utente ha annullato la selezione dell'inverter
-                    self.log_message("Selezione tipo inverter annullata", 'warning')
-                    self.extract_button.setEnabled(True)
-                    return
-                
-            elif tech_code == 'H':
-                # Creo una lista con i file delle guideLine da utilizzare per la tecnologia
-                File_guideLine_list = [constants.file_FL_Hydro]
-                # Definisco il dizionario di regex                    
-                regex_dict = {
-                    'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
-                    'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZZ',r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-9Z']
-                }             
-            else:
-                self.log_message("Errore: Tecnologia non riconosciuta", 'error')
+            config_lineeGuida = self.get_guideline_config(tech_code)
+            if config_lineeGuida is None:
+                self.extract_button.setEnabled(True)
                 return
+            File_guideLine_list, regex_dict = config_lineeGuida
 
             # Genera un unico DataFrame con le espressioni regolari a partire dai file di regole e la lista delle guideLine
             try:
-                df_regex = RegularExpressionsTools.Make_DF_RE_list(constants.file_Rules, File_guideLine_list)
+                df_regex = RegularExpressionsTools.Make_DF_RE_list_cached(constants.file_Rules, File_guideLine_list, constants.path_cache)
             except Exception as e:
                 print(f"Errore durante il processing dei file: {str(e)}")
         
             print("#----------- df_regex ---------#")
             print(df_regex)
-            # salvo il df in un file csv
-            df_regex.to_csv('df_re_completo.csv', index=False)
+            if constants.DEBUG_MODE:
+                # salvo il df in un file csv
+                df_regex.to_csv('df_re_completo.csv', index=False)
             
             """ 
             Creo un Dizionario contenente i DataFrame filtrati con le chiavi contenute 
@@ -678,15 +689,22 @@ class MainWindow(QMainWindow):
             """
             try:
                 # Eseguiamo la verifica
-                result_df = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(self.df_FL, df_regex, regex_dict)
+                result_df = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+                    self.df_FL, df_regex, regex_dict,
+                    n_workers=constants.Parallel_workers, chunk_size=constants.Parallel_chunk_size,
+                    memo=self.verifica_memo
+                )
                 
                 # Stampiamo i risultati
                 print(f"\nRisultati della verifica: result_df = {len(result_df)} righe | self.df_fl = {len(self.df_FL)} righe")
                 print(result_df)
                 
             except Exception as e:
-                print(f"Errore nell'esecuzione: {str(e)}")   
-        
+                print(f"Errore nell'esecuzione: {str(e)}")
+                self.log_message(f"Errore nella verifica delle linee guida: {str(e)}", 'error')
+                self.extract_button.setEnabled(True)
+                return
+
             # salvo il df in un file csv
             result_df.to_csv('df_result_completo.csv', index=False)
             print(result_df)
@@ -720,17 +738,18 @@ class MainWindow(QMainWindow):
                 # Lista dei nomi dei DataFrame da caricare
                 df_list = [
                     "df_ZPMR_CTRL_ASS",
-                    "df_ZPM4R_GL_T_FL",
-                    "df_ZPMR_CONTROL_FL2_pivot",
-                    "df_ZPMR_CONTROL_FL1_pivot"
+                    "df_ZPM4R_GL_T_FL"
                 ]
                 dfs, error = self.df_utils.load_dataframes_from_csv(df_list)
+                # Gli indici dei livelli sono salvati nei file *_pivot.csv
+                if error is None:
+                    indice_ZPMR_CONTROL_FL1, error = self.df_utils.carica_indice_livelli("df_ZPMR_CONTROL_FL1_pivot.csv")
+                if error is None:
+                    indice_ZPMR_CONTROL_FL2, error = self.df_utils.carica_indice_livelli("df_ZPMR_CONTROL_FL2_pivot.csv")
                 # Verifica del risultato
-                if dfs:
+                if dfs and error is None:
                     print(f"File SAP caricati correttamente")
                     # Estrai i DataFrame in variabili separate
-                    df_ZPMR_CONTROL_FL1_pivot = dfs["df_ZPMR_CONTROL_FL1_pivot"]        
-                    df_ZPMR_CONTROL_FL2_pivot = dfs["df_ZPMR_CONTROL_FL2_pivot"]                        
                     df_ZPMR_CTRL_ASS = dfs["df_ZPMR_CTRL_ASS"]
                     df_ZPM4R_GL_T_FL = dfs["df_ZPM4R_GL_T_FL"]
 
@@ -740,41 +759,79 @@ class MainWindow(QMainWindow):
                     self.log_message("Errore nel caricamento dei file SAP", 'error')
 
             else:
-                # altrimenti estraggo i dati da SAP
-                self.log_message("Avvio estrazione...")
-                try:
-                    with SAP_Connection.SAPGuiConnection() as sap:
-                        if sap.is_connected():
-                            session = sap.get_session()
-                            if session:
-                                self.log_message("Connessione SAP attiva", 'success')
-                                extractor = SAP_Transactions.SAPDataExtractor(session)
-                                self.log_message("Estrazione dati tabella ZPMR_CONTROL_FL1", 'loading')
-                                string_ZPMR_CONTROL_FL1 = extractor.extract_ZPMR_CONTROL_FL1(tech_code)
-                                
-                                self.log_message("Estrazione dati tabella ZPMR_CONTROL_FL2", 'loading')
-                                string_ZPMR_CONTROL_FL2 = extractor.extract_ZPMR_CONTROL_FL2(tech_code)                        
-                                
-                                self.log_message("Estrazione dati tabella ZPM4R_GL_T_FL", 'loading')
-                                string_ZPM4R_GL_T_FL = extractor.extract_ZPM4R_GL_T_FL(tech_code)
-                                
-                                self.log_message("Estrazione dati tabella ZPMR_CTRL_ASS", 'loading')
-                                string_ZPMR_CTRL_ASS = extractor.extract_ZPMR_CTRL_ASS(tech_code)
-                                
-                                self.log_message("Estrazione completata con successo", 'success')
-                        else:
-                            self.log_message("Connessione SAP NON attiva", 'error')
-                            return
-                except Exception as e:
-                    self.log_message(f"Estrazione dati SAP: Errore: {str(e)}", 'error')
-                    return           
+                # altrimenti uso gli snapshot locali ancora validi ed estraggo da SAP solo le tabelle scadute
+                # o non coperte; con l'estrazione selettiva chiedo a SAP solo i valori presenti nelle FL
+                valori_richiesti = self.df_utils.valori_tabelle_SAP(self.df_FL) if constants.SAP_estrazione_selettiva else {}
+                tabelle_SAP = {}
+                # Tabelle da estrarre -> valori da selezionare (None = tabella completa)
+                da_estrarre = {}
+                for nome in ("ZPMR_CONTROL_FL1", "ZPMR_CONTROL_FL2", "ZPM4R_GL_T_FL", "ZPMR_CTRL_ASS"):
+                    # Le tabelle senza campo di selezione di VALUE (ZPMR_CONTROL_FL1/FL2) vengono sempre estratte per intero
+                    valori = (valori_richiesti.get(nome) or None) if nome in constants.SAP_campi_valore else None
+                    tabelle_SAP[nome] = self.snapshot_SAP.carica(nome, tech_code, valori)
+                    if tabelle_SAP[nome] is None:
+                        mancanti = (self.snapshot_SAP.valori_mancanti(nome, tech_code, valori) or None) if valori else None
+                        # Oltre il limite della selezione multipla estraggo la tabella completa, registrata come snapshot completo
+                        if mancanti and not SAP_Transactions.SelezioneSE16.applicabile(mancanti):
+                            print(f"{nome}: troppi valori da selezionare, estraggo la tabella completa")
+                            mancanti = None
+                        da_estrarre[nome] = mancanti
+                for nome, df_tabella in tabelle_SAP.items():
+                    if df_tabella is not None:
+                        eta_minuti = int(self.snapshot_SAP.eta(nome, tech_code) // 60)
+                        self.log_message(f"Tabella {nome}: uso lo snapshot locale estratto {eta_minuti} minuti fa", 'info')
+
+                if da_estrarre:
+                    self.log_message("Avvio estrazione...")
+                    try:
+                        with self.sap_connessione as sap:
+                            if sap.is_connected():
+                                session = sap.get_session()
+                                if session:
+                                    self.log_message("Connessione SAP attiva", 'success')
+                                    # Estraggo le tabelle in parallelo, una per sessione SAP, registrando i tempi di attesa di ogni passo
+                                    attesa = SAP_Transactions.SAPWaitStrategy()
+                                    # Con l'esportazione su file le liste non passano dalla clipboard
+                                    cartella_export = constants.path_export_SAP if constants.SAP_export_su_file else None
+                                    with SAP_Connection.SAPSessionPool(sap.connection, n_sessioni=min(len(da_estrarre), constants.SAP_sessioni_estrazione)) as pool:
+                                        self.log_message(f"Estrazione dati tabelle {', '.join(da_estrarre)} su {len(pool.sessioni)} sessioni", 'loading')
+                                        # Solo le tabelle con selezione sui valori ricevono i valori da estrarre
+                                        argomenti = {nome: (da_estrarre[nome],) if nome in constants.SAP_campi_valore else ()
+                                                     for nome in da_estrarre}
+                                        estrai = lambda nomi: pool.esegui({
+                                            nome: (lambda s, nome=nome: getattr(SAP_Transactions.SAPDataExtractor(s, attesa=attesa, cartella_export=cartella_export), f"extract_{nome}")(tech_code, *argomenti[nome]))
+                                            for nome in nomi
+                                        })
+                                        stringhe_SAP = estrai(da_estrarre)
+                                    print(f"Tempi di attesa SAP per passo:\n{attesa.riepilogo().to_string(index=False)}")
+                                    # Una selezione senza righe restituisce un DataFrame vuoto: False indica solo un errore
+                                    non_riuscite = [nome for nome in da_estrarre if stringhe_SAP[nome] is False]
+                                    if non_riuscite:
+                                        self.log_message(f"Estrazione non riuscita per le tabelle {', '.join(non_riuscite)}", 'error')
+                                        return
+                                    for nome in da_estrarre:
+                                        # Pulisce i dati estratti (l'esportazione su file restituisce già il DataFrame pulito)
+                                        # e aggiorna lo snapshot della tabella, unendo le righe estratte con la selezione
+                                        # a quelle dello snapshot parziale
+                                        estratto = stringhe_SAP[nome]
+                                        tabelle_SAP[nome] = estratto if isinstance(estratto, pd.DataFrame) else self.df_utils.clean_data(estratto)
+                                        if self.df_utils.check_dataframe(tabelle_SAP[nome], name=nome, ammetti_vuoto=da_estrarre[nome] is not None):
+                                            tabelle_SAP[nome] = self.snapshot_SAP.aggiorna(nome, tech_code, tabelle_SAP[nome], da_estrarre[nome])
+                                    
+                                    self.log_message("Estrazione completata con successo", 'success')
+                            else:
+                                self.log_message("Connessione SAP NON attiva", 'error')
+                                return
+                    except Exception as e:
+                        self.log_message(f"Estrazione dati SAP: Errore: {str(e)}", 'error')
+                        return           
                 # ------------estrazione SAP completata---------------
                 try:
                 # ----------------------------------------------------
                 # creo DF per ZPMR_CONTROL_FL1
                 # ----------------------------------------------------
-                    # Pulisce i nomi delle colonne
-                    df_ZPMR_CONTROL_FL1 = self.df_utils.clean_data(string_ZPMR_CONTROL_FL1)
+                    # DataFrame pulito della tabella (da snapshot o appena estratto)
+                    df_ZPMR_CONTROL_FL1 = tabelle_SAP["ZPMR_CONTROL_FL1"]
                     # Verifica che il DataFrame sia valido
                     if not(self.df_utils.check_dataframe(df_ZPMR_CONTROL_FL1, name="ZPM4R_GL_T_FL1")):
                         print("Errore nella verifica del DataFrame")
@@ -782,20 +839,17 @@ class MainWindow(QMainWindow):
                     else:
                         # Stampa anteprima del dataframe
                         self.df_utils.analyze_data(df_ZPMR_CONTROL_FL1)
-                    # creo un nuovo DF facendo pivot sulla colonna <Liv.Sede>
+                    # creo l'indice dei valori per livello (colonna <Liv.Sede>)
                     try:
-                        df_ZPMR_CONTROL_FL1_pivot = self.df_utils.pivot_hierarchy(df_ZPMR_CONTROL_FL1, "Valore Livello", "Liv.Sede")
-                        print("#---- df_ZPMR_CONTROL_FL1_pivot ----#")
-                        print(df_ZPMR_CONTROL_FL1_pivot)
+                        indice_ZPMR_CONTROL_FL1 = self.df_utils.indice_livelli(df_ZPMR_CONTROL_FL1, "Valore Livello", "Liv.Sede")
+                        print("---- indice_ZPMR_CONTROL_FL1 ----")
+                        print({livello: len(valori) for livello, valori in indice_ZPMR_CONTROL_FL1.items()})
                     except Exception as e:
                         print(f"Errore: {e}")            
-                    # Stampa anteprima del dataframe
-                    print("---- Stampa df: df_ZPMR_CONTROL_FL1_pivot ----")
-                    print(df_ZPMR_CONTROL_FL1_pivot)
-                    ## ------------Salvo il DF in un file---------------
+                    ## ------------Salvo l'indice in un file---------------
                     nome_file = os.path.join(constants.A_ScriptDir, "df_ZPMR_CONTROL_FL1_pivot") + ".csv"
-                    result, error = self.df_utils.save_dataframe_to_csv(df_ZPMR_CONTROL_FL1_pivot, 
-                                                                        nome_file)
+                    result, error = self.df_utils.salva_indice_livelli(indice_ZPMR_CONTROL_FL1, 
+                                                                       nome_file)
                     # Verifica del risultato
                     if result is True:
                         print(f"File {nome_file} salvato correttamente")
@@ -806,8 +860,8 @@ class MainWindow(QMainWindow):
                 # ----------------------------------------------------
                 # creo DF per ZPMR_CONTROL_FL2
                 # ----------------------------------------------------
-                    # Pulisce i nomi delle colonne
-                    df_ZPMR_CONTROL_FL2 = self.df_utils.clean_data(string_ZPMR_CONTROL_FL2)
+                    # DataFrame pulito della tabella (da snapshot o appena estratto)
+                    df_ZPMR_CONTROL_FL2 = tabelle_SAP["ZPMR_CONTROL_FL2"]
                     # Verifica che il DataFrame sia valido
                     if not(self.df_utils.check_dataframe(df_ZPMR_CONTROL_FL2, name="ZPM4R_GL_T_FL2")):
                         print("Errore nella verifica del DataFrame")
@@ -815,34 +869,32 @@ class MainWindow(QMainWindow):
                     else:
                         # Stampa anteprima del dataframe
                         self.df_utils.analyze_data(df_ZPMR_CONTROL_FL2)
-                    # creo un nuovo DF facendo pivot sulla colonna <Liv.Sede>
+                    # creo l'indice dei valori per livello (colonna <Liv.Sede>)
                     try:
-                        df_ZPMR_CONTROL_FL2_pivot = self.df_utils.pivot_hierarchy(df_ZPMR_CONTROL_FL2, "Valore Livello", "Liv.Sede")
-                        print("---- df_ZPMR_CONTROL_FL2_pivot ----")
-                        print(df_ZPMR_CONTROL_FL2_pivot)
+                        indice_ZPMR_CONTROL_FL2 = self.df_utils.indice_livelli(df_ZPMR_CONTROL_FL2, "Valore Livello", "Liv.Sede")
+                        print("---- indice_ZPMR_CONTROL_FL2 ----")
+                        print({livello: len(valori) for livello, valori in indice_ZPMR_CONTROL_FL2.items()})
                     except Exception as e:
                         print(f"Errore: {e}")            
-                    # Stampa anteprima del dataframe
-                    print("---- Stampa df: df_ZPMR_CONTROL_FL2_pivot ----")
-                    print(df_ZPMR_CONTROL_FL2_pivot)
-                    ## ------------Salvo il DF in un file---------------
+                    ## ------------Salvo l'indice in un file---------------
                     nome_file = os.path.join(constants.A_ScriptDir, "df_ZPMR_CONTROL_FL2_pivot") + ".csv"
-                    result, error = self.df_utils.save_dataframe_to_csv(df_ZPMR_CONTROL_FL2_pivot, 
-                                                                        nome_file)
+                    result, error = self.df_utils.salva_indice_livelli(indice_ZPMR_CONTROL_FL2, 
+                                                                       nome_file)
                     # Verifica del risultato
                     if result is True:
                         print(f"File {nome_file} salvato correttamente")
                         self.log_message("File " + nome_file + " creato correttamente!", 'success')
                     elif error is not None:
                         print(f"Si è verificato un errore nella creazione del file: " + nome_file + ": {error}")
-                        self.log_message("Errore nella creazione del file: " + nome_file, 'error')                    
+                        self.log_message("Errore nella creazione del file: " + nome_file, 'error')
                 # ----------------------------------------------------
                 # creo DF per ZPM4R_GL_T_FL
                 # ----------------------------------------------------
-                    # Pulisce i nomi delle colonne
-                    df_ZPM4R_GL_T_FL = self.df_utils.clean_data(string_ZPM4R_GL_T_FL)
+                    # DataFrame pulito della tabella (da snapshot o appena estratto)
+                    df_ZPM4R_GL_T_FL = tabelle_SAP["ZPM4R_GL_T_FL"]
                     # Verifica che il DataFrame sia valido
-                    if not(self.df_utils.check_dataframe(df_ZPM4R_GL_T_FL, name="ZPM4R_GL_T_FL")):
+                    # Con l'estrazione selettiva la tabella può non avere righe per i valori delle FL
+                    if not(self.df_utils.check_dataframe(df_ZPM4R_GL_T_FL, name="ZPM4R_GL_T_FL", ammetti_vuoto=constants.SAP_estrazione_selettiva)):
                         print("Errore nella verifica del DataFrame")
                         sys.exit(1)
                     else:
@@ -865,10 +917,11 @@ class MainWindow(QMainWindow):
                 # ----------------------------------------------------
                 # creo DF per ZPMR_CTRL_ASS
                 # ----------------------------------------------------
-                    # Pulisce i nomi delle colonne
-                    df_ZPMR_CTRL_ASS = self.df_utils.clean_data(string_ZPMR_CTRL_ASS)
+                    # DataFrame pulito della tabella (da snapshot o appena estratto)
+                    df_ZPMR_CTRL_ASS = tabelle_SAP["ZPMR_CTRL_ASS"]
                     # Verifica che il DataFrame sia valido
-                    if not(self.df_utils.check_dataframe(df_ZPMR_CTRL_ASS, name="ZPMR_CTRL_ASS")):
+                    # Con l'estrazione selettiva la tabella può non avere righe per i valori delle FL
+                    if not(self.df_utils.check_dataframe(df_ZPMR_CTRL_ASS, name="ZPMR_CTRL_ASS", ammetti_vuoto=constants.SAP_estrazione_selettiva)):
                         print("Errore nella verifica del DataFrame")
                         sys.exit(1)
                     else:
@@ -899,77 +952,48 @@ class MainWindow(QMainWindow):
             # verifica degli elementi della FL nelle tabelle
             # ----------------------------------------------------    
                 
-            # verifico la presenza degli elementi del primo livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL1_lev_1, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL1_pivot, 'Livello_1', 'Livello_1')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL1_lev_1 is not None)):
-                self.log_risultato_differenze("Livello_1", risultato_ZPMR_CONTROL_FL1_lev_1)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL1")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL1", 'error')
-            
-            # verifico la presenza degli elementi del secondo livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL1_lev_2, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL1_pivot, 'Livello_2', 'Livello_2')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL1_lev_2 is not None)):
-                self.log_risultato_differenze("Livello_2", risultato_ZPMR_CONTROL_FL1_lev_2)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL1_lev_2")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL1_lev_2", 'error')
-            
-            # verifico la presenza degli elementi del terzo livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL2_lev_3, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL2_pivot, 'Livello_3', 'Livello_3')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL2_lev_3 is not None)):
-                self.log_risultato_differenze("Livello_3", risultato_ZPMR_CONTROL_FL2_lev_3)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_3")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_3", 'error')
-
-            # verifico la presenza degli elementi del quarto livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL2_lev_4, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL2_pivot, 'Livello_4', 'Livello_4')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL2_lev_4 is not None)):
-                self.log_risultato_differenze("Livello_4", risultato_ZPMR_CONTROL_FL2_lev_4)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_4")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_4", 'error')
-
-            # verifico la presenza degli elementi del quinto livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL2_lev_5, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL2_pivot, 'Livello_5', 'Livello_5')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL2_lev_5 is not None)):
-                self.log_risultato_differenze("Livello_5", risultato_ZPMR_CONTROL_FL2_lev_5)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_5")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_5", 'error')
-
-            # verifico la presenza degli elementi del sesto livello nella tabella globale
-            risultato_ZPMR_CONTROL_FL2_lev_6, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CONTROL_FL2_pivot, 'Livello_6', 'Livello_6')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CONTROL_FL2_lev_6 is not None)):
-                self.log_risultato_differenze("Livello_6", risultato_ZPMR_CONTROL_FL2_lev_6)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_6")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CONTROL_FL2_lev_6", 'error')  
-
-            # verifico la presenza degli elementi della tabella df_ZPMR_CTRL_ASS
-            risultato_ZPMR_CTRL_ASS, error = self.df_utils.trova_differenze(self.df_FL, df_ZPMR_CTRL_ASS, 'Check', 'Check')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPMR_CTRL_ASS is not None)):
-                self.log_risultato_differenze("risultato_ZPMR_CTRL_ASS", risultato_ZPMR_CTRL_ASS)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPMR_CTRL_ASS")
-                self.log_message("Errore nella creazione della lista: risultato_ZPMR_CTRL_ASS", 'error')              
-
-            # verifico la presenza degli elementi della tabella df_ZPM4R_GL_T_FL
-            risultato_ZPM4R_GL_T_FL, error = self.df_utils.trova_differenze(self.df_FL, df_ZPM4R_GL_T_FL, 'Check', 'Check')
-            # Verifica del risultato
-            if ((error is None) and (risultato_ZPM4R_GL_T_FL is not None)):
-                self.log_risultato_differenze("risultato_ZPM4R_GL_T_FL", risultato_ZPM4R_GL_T_FL)
-            elif (error is not None):
-                print(f"Si è verificato un errore nella creazione della lista: risultato_ZPM4R_GL_T_FL")
-                self.log_message("Errore nella creazione della lista: risultato_ZPM4R_GL_T_FL", 'error')
+            # Valori SAP di ogni livello: livelli 1-2 da ZPMR_CONTROL_FL1, livelli 3-6 da ZPMR_CONTROL_FL2
+            livelli_sap = {}
+            for livello in range(1, 7):
+                indice = indice_ZPMR_CONTROL_FL1 if livello <= 2 else indice_ZPMR_CONTROL_FL2
+                if livello in indice:
+                    livelli_sap[livello] = indice[livello]
+            check_sap = {nome: df_sap['Check'] for nome, df_sap in (("risultato_ZPMR_CTRL_ASS", df_ZPMR_CTRL_ASS),
+                                                                  ("risultato_ZPM4R_GL_T_FL", df_ZPM4R_GL_T_FL))
+                         if 'Check' in df_sap.columns}
+
+            # verifico in un'unica passata la presenza degli elementi di ogni livello e delle chiavi Check nelle tabelle globali
+            risultati_differenze, error = self.df_utils.trova_differenze_gerarchia(self.df_FL, livelli_sap, check_sap)
+            if error is not None:
+                risultati_differenze = {}
+
+            # (chiave del risultato, nome della lista usato nei messaggi di errore)
+            confronti = [
+                ("Livello_1", "risultato_ZPMR_CONTROL_FL1"),
+                ("Livello_2", "risultato_ZPMR_CONTROL_FL1_lev_2"),
+                ("Livello_3", "risultato_ZPMR_CONTROL_FL2_lev_3"),
+                ("Livello_4", "risultato_ZPMR_CONTROL_FL2_lev_4"),
+                ("Livello_5", "risultato_ZPMR_CONTROL_FL2_lev_5"),
+                ("Livello_6", "risultato_ZPMR_CONTROL_FL2_lev_6"),
+                ("risultato_ZPMR_CTRL_ASS", "risultato_ZPMR_CTRL_ASS"),
+                ("risultato_ZPM4R_GL_T_FL", "risultato_ZPM4R_GL_T_FL")
+            ]
+            for chiave, nome_lista in confronti:
+                # Verifica del risultato
+                if chiave not in risultati_differenze:
+                    print(f"Si è verificato un errore nella creazione della lista: {nome_lista}")
+                    self.log_message(f"Errore nella creazione della lista: {nome_lista}", 'error')
+                elif risultati_differenze[chiave] is not None:
+                    self.log_risultato_differenze(chiave, risultati_differenze[chiave])
+
+            risultato_ZPMR_CONTROL_FL1_lev_1 = risultati_differenze.get("Livello_1")
+            risultato_ZPMR_CONTROL_FL1_lev_2 = risultati_differenze.get("Livello_2")
+            risultato_ZPMR_CONTROL_FL2_lev_3 = risultati_differenze.get("Livello_3")
+            risultato_ZPMR_CONTROL_FL2_lev_4 = risultati_differenze.get("Livello_4")
+            risultato_ZPMR_CONTROL_FL2_lev_5 = risultati_differenze.get("Livello_5")
+            risultato_ZPMR_CONTROL_FL2_lev_6 = risultati_differenze.get("Livello_6")
+            risultato_ZPMR_CTRL_ASS = risultati_differenze.get("risultato_ZPMR_CTRL_ASS")
+            risultato_ZPM4R_GL_T_FL = risultati_differenze.get("risultato_ZPM4R_GL_T_FL")
 
             # ----------------------------------------------------
             # creo i file per eseguire l'aggiornamento delle tabelle 
@@ -1122,6 +1146,74 @@ class MainWindow(QMainWindow):
         # ---------------------------------------------------- 
         self.extract_button.setEnabled(True)
 
+    # ----------------------------------------------------
+    # Routine associata al tasto <Verifica File>
+    # ----------------------------------------------------
+    def verify_file(self):
+        """
+        Valida un file di FL di grandi dimensioni (una FL per riga) in modalità streaming:
+        il file viene elaborato a blocchi e i risultati vengono scritti in un file CSV
+        accanto al file di origine, senza caricare tutte le FL in memoria
+        """
+        file_input, _ = QFileDialog.getOpenFileName(self, "Seleziona il file delle FL", self.current_dir,
+                                                    "File di testo (*.txt);;Tutti i file (*)")
+        if not file_input:
+            return
+
+        # Ricavo la tecnologia dalla prima FL del file (ultimo carattere del primo livello)
+        try:
+            with open(file_input, 'r', encoding='utf-8') as f:
+                prima_fl = next((riga.strip() for riga in f if riga.strip()), None)
+        except Exception as e:
+            self.log_message(f"Errore nella lettura del file {file_input}: {str(e)}", 'error')
+            return
+
+        if not prima_fl:
+            self.log_message(f"Errore: il file {file_input} non contiene FL", 'error')
+            return
+
+        tech_code = prima_fl.split('-')[0][-1:]
+        maschera_tecnologia = self.file_utils.trova_valore(constants.file_Mask,
+                                    valore_da_cercare=tech_code,
+                                    colonna_da_cercare="Tech",
+                                    colonna_da_restituire="Regex")
+        if maschera_tecnologia is None:
+            self.log_message(f"Errore: Valore maschera per tecnologia {tech_code} non trovata", 'error')
+            return
+
+        config_lineeGuida = self.get_guideline_config(tech_code)
+        if config_lineeGuida is None:
+            return
+        File_guideLine_list, regex_dict = config_lineeGuida
+
+        file_output = os.path.splitext(file_input)[0] + "_risultati.csv"
+        self.verify_file_button.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            df_regex = RegularExpressionsTools.Make_DF_RE_list_cached(constants.file_Rules, File_guideLine_list, constants.path_cache)
+            validator = StreamValidator(constants.mask_FL_generica, df_regex, regex_dict,
+                                        maschera_tecnologia=maschera_tecnologia,
+                                        chunk_size=constants.Stream_chunk_size)
+            riepilogo = validator.valida_file(file_input, file_output)
+        except Exception as e:
+            self.log_message(f"Errore durante la verifica del file: {str(e)}", 'error')
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+            self.verify_file_button.setEnabled(True)
+
+        self.log_message(f"Verifica file completata: {riepilogo['Righe']} FL elaborate in {riepilogo['Blocchi']} blocchi", 'success')
+        for controllo in ['Errori_Maschera_Generica', 'Errori_Maschera_Tecnologia', 'Duplicati', 'Errori_Linee_Guida']:
+            livello = 'warning' if riepilogo[controllo] else 'success'
+            self.log_message(f"{controllo.replace('_', ' ')}: {riepilogo[controllo]}", livello)
+        self.log_message(f"Risultati salvati nel file {file_output}", 'info')
+
+    def closeEvent(self, event):
+        # Rilascio la connessione SAP condivisa alla chiusura della finestra
+        self.timer_sap.stop()
+        self.sap_connessione.chiudi()
+        super().closeEvent(event)
+
     def upload_data(self):
         # ------------Verifico che ci siano file da caricare----------------------- 
         if (self.FileGenerated["Total_files"] == 0):
@@ -1164,7 +1256,7 @@ class MainWindow(QMainWindow):
                 self.log_message("Avvio caricamento degli aggiornamenti...", 'info')
                 print("Avvio caricamento degli aggiornamenti...")
                 try:
-                    with SAP_Connection.SAPGuiConnection() as sap:
+                    with self.sap_connessione as sap:
                         if sap.is_connected():
                             session = sap.get_session()
                             if session:
@@ -1181,6 +1273,8 @@ class MainWindow(QMainWindow):
                                             if result is True:
                                                 print(f"Tabella ZPMR_CONTROL_FL2 aggiornata correttamente!")
                                                 self.log_message("Tabella ZPMR_CONTROL_FL2 aggiornata correttamente!", 'success')
+                                                # La tabella in SAP è cambiata: lo snapshot locale non è più valido
+                                                self.snapshot_SAP.invalida("ZPMR_CONTROL_FL1")
                                             else:
                                                 print(f"Si è verificato un errore nel caricamento del file:\n\t {value["path"]}")
                                                 self.log_message("Errore nel caricamento del file: ZPMR_CONTROL_FL2", 'error')
@@ -1190,6 +1284,8 @@ class MainWindow(QMainWindow):
                                             if result is True:
                                                 print(f"Tabella ZPMR_CONTROL_FLn aggiornata correttamente!")
                                                 self.log_message("Tabella ZPMR_CONTROL_FLn aggiornata correttamente!", 'success')
+                                                # La tabella in SAP è cambiata: lo snapshot locale non è più valido
+                                                self.snapshot_SAP.invalida("ZPMR_CONTROL_FL2")
                                             else:
                                                 print(f"Si è verificato un errore nel caricamento del file:\n\t {value["path"]}")
                                                 self.log_message("Errore nel caricamento del file: ZPMR_CONTROL_FLn", 'error')
@@ -1199,6 +1295,8 @@ class MainWindow(QMainWindow):
                                             if result is True:
                                                 print(f"Tabella ZPMR_CTRL_ASS aggiornata correttamente!")
                                                 self.log_message("Tabella ZPMR_CTRL_ASS aggiornata correttamente!", 'success')
+                                                # La tabella in SAP è cambiata: lo snapshot locale non è più valido
+                                                self.snapshot_SAP.invalida("ZPMR_CTRL_ASS")
                                             else:
                                                 print(f"Si è verificato un errore nel caricamento del file:\n\t {value["path"]}")
                                                 self.log_message("Errore nel caricamento del file: ZPMR_CTRL_ASS", 'error')                                        
@@ -1208,6 +1306,8 @@ class MainWindow(QMainWindow):
                                             if result is True:
                                                 print(f"Tabella ZPM4R_GL_T_FL aggiornata correttamente!")
                                                 self.log_message("Tabella ZPM4R_GL_T_FL aggiornata correttamente!", 'success')
+                                                # La tabella in SAP è cambiata: lo snapshot locale non è più valido
+                                                self.snapshot_SAP.invalida("ZPM4R_GL_T_FL")
                                             else:
                                                 print(f"Si è verificato un errore nel caricamento del file:\n\t {value["path"]}")
                                                 self.log_message("Errore nel caricamento del file: ZPM4R_GL_T_FL", 'error')                                                  
@@ -1281,6 +1381,8 @@ class InverterSelectionDialog(QDialog):
             return None  # Nessuna selezione (non dovrebbe accadere)
 
 def main():
+    # Necessario per i processi worker della verifica parallela nell'eseguibile generato con PyInstaller
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
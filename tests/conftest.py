@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# I moduli del programma e gli estratti di esempio sono nella cartella principale del repository
+CARTELLA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARTELLA_REPO)
+
+import Config.constants as constants
+from RE_tools import RegularExpressionsTools
+from utils.lista_se16 import rendi_lista_se16
+from utils.sap_fake import FakeSAPConnection
+
+# Configurazione delle linee guida BESS, come in MainWindow.get_guideline_config
+REGEX_DICT_BESS = {
+    'SubStation': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0A'],
+    'Common': [r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-00', r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-0E',
+               r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-WE', r'^[a-zA-Z]{3}-[a-zA-Z0-9]{4}-ZE']
+}
+
+
+@pytest.fixture(scope="session")
+def df_regex():
+    """Espressioni regolari delle linee guida BESS (sottostazione e comuni)"""
+    return RegularExpressionsTools.Make_DF_RE_list(constants.file_Rules,
+                                                   [constants.file_FL_B_SubStation, constants.file_FL_Bess])
+
+
+TABELLE_SAP = ("ZPMR_CONTROL_FL1", "ZPMR_CONTROL_FL2", "ZPM4R_GL_T_FL", "ZPMR_CTRL_ASS")
+
+
+@pytest.fixture
+def tabelle_fake():
+    """Testo SE16 delle quattro tabelle globali con 'Valore Livello' H01..H20, AB e ZZ"""
+    valori = [f"H{n:02d}" for n in range(1, 21)] + ["AB", "ZZ"]
+    return {nome: rendi_lista_se16(["Liv.Sede", "Valore Livello", "Descrizione"],
+                             [[3, valore, f"{nome} {valore}"] for valore in valori])
+            for nome in TABELLE_SAP}
+
+
+@pytest.fixture
+def connessione_fake(tabelle_fake):
+    """Connessione SAP simulata con latenze ridotte"""
+    return FakeSAPConnection(tabelle_fake, latenza_query=0.01, latenza_export=0.01, latenza_popup=0.005,
+                             latenza_apertura=0.02)
@@ -0,0 +1,51 @@
+import io
+
+import pandas as pd
+
+import RE_tools
+from RE_tools import CheckKeyMatcher, GuidelineMatcher
+
+ATTRIBUTI = ['AM Section', 'AM Part', 'AM Component', 'Element Type']
+
+# Linee guida con celle vuote negli attributi, lette come NaN
+LINEE_GUIDA = """Check_RE;FL_Lunghezza;FL_RE;AM Section;AM Part;AM Component;Element Type
+^GEN[0-9]{2}_0A_4$;4;^[A-Z]{3}-[A-Z0-9]{4}-0A-GEN[0-9]{2}$;0000;11;;ALI
+^TR[0-9]_0A_4$;4;^[A-Z]{3}-[A-Z0-9]{4}-0A-TR[0-9]$;0000;;;
+^0A_3$;3;^[A-Z]{3}-[A-Z0-9]{4}-0A$;;;;
+"""
+
+
+def linee_guida() -> pd.DataFrame:
+    # Ogni lettura crea nuovi oggetti NaN, come a ogni verifica
+    return pd.read_csv(io.StringIO(LINEE_GUIDA), sep=';', dtype={'AM Section': str, 'AM Part': str})
+
+
+def test_matcher_riutilizzato_con_celle_vuote():
+    RE_tools._CHECK_KEY_MATCHER_CACHE.clear()
+    primo = CheckKeyMatcher.from_dataframe(linee_guida(), ATTRIBUTI)
+    secondo = CheckKeyMatcher.from_dataframe(linee_guida(), ATTRIBUTI)
+    assert secondo is primo
+    assert len(RE_tools._CHECK_KEY_MATCHER_CACHE) == 1
+
+    attributi = primo.corrispondenza("GEN01_0A_4", 4)
+    assert attributi['AM Section'] == '0000'
+    assert attributi['Element Type'] == 'ALI'
+    assert pd.isna(attributi['AM Component'])
+
+
+def test_celle_vuote_distinte_da_stringhe_vuote():
+    RE_tools._CHECK_KEY_MATCHER_CACHE.clear()
+    con_nan = CheckKeyMatcher.from_dataframe(linee_guida(), ATTRIBUTI)
+    con_stringhe_vuote = CheckKeyMatcher.from_dataframe(linee_guida().fillna(''), ATTRIBUTI)
+    assert con_stringhe_vuote is not con_nan
+    assert con_stringhe_vuote.corrispondenza("GEN01_0A_4", 4)['AM Component'] == ''
+
+
+def test_guideline_matcher_riutilizzato_con_lunghezze_vuote():
+    RE_tools._GUIDELINE_MATCHER_CACHE.clear()
+    df = linee_guida()
+    df.loc[2, 'FL_Lunghezza'] = None
+    primo = GuidelineMatcher.from_dataframe(df)
+    secondo = GuidelineMatcher.from_dataframe(df.copy())
+    assert secondo is primo
+    assert len(RE_tools._GUIDELINE_MATCHER_CACHE) == 1
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import CARTELLA_REPO
+from DF_Tools import DataFrameTools
+from utils.lista_se16 import clean_data_originale, rendi_lista_se16
+
+
+def atteso(testo):
+    return clean_data_originale(testo).apply(lambda colonna: colonna.str.strip())
+
+
+def lista_se16(nome_file, righe=None):
+    df = pd.read_csv(os.path.join(CARTELLA_REPO, nome_file), sep=';', dtype=str, keep_default_na=False, nrows=righe)
+    return rendi_lista_se16(list(df.columns), df.to_numpy().tolist())
+
+
+@pytest.mark.parametrize("nome_file", ["df_ZPMR_CTRL_ASS.csv", "df_ZPM4R_GL_T_FL.csv"])
+@pytest.mark.parametrize("a_capo", ['\n', '\r\n'])
+def test_estratti_come_versione_originale(nome_file, a_capo):
+    testo = lista_se16(nome_file).replace('\n', a_capo)
+    df = DataFrameTools.clean_data(testo)
+    pd.testing.assert_frame_equal(df, atteso(testo))
+    assert len(df) > 1000
+
+
+def test_righe_di_larghezza_diversa(monkeypatch):
+    # Righe non allineate (ad esempio spazi finali tagliati): la lettura passa per read_csv
+    testo = lista_se16("df_ZPMR_CTRL_ASS.csv", righe=200)
+    righe = testo.split('\n')
+    righe[5] = righe[5].replace('  |', '|')
+    righe[9] = '  ' + righe[9] + '   '
+    testo = '\n'.join(righe)
+
+    separatore = []
+    originale = DataFrameTools._colonne_separatore
+    monkeypatch.setattr(DataFrameTools, "_colonne_separatore",
+                        staticmethod(lambda righe: separatore.append(len(righe)) or originale(righe)))
+    pd.testing.assert_frame_equal(DataFrameTools.clean_data(testo), atteso(testo))
+    assert separatore
+
+
+def test_colonne_vuote_e_intestazioni_duplicate():
+    testo = rendi_lista_se16(["Codice", "Vuota", "Codice", "Descrizione"],
+                             [["01", "", "A", "Prima riga"], ["002", "", "B", " Seconda  "], ["3", "", "", "Terza"]])
+    df = DataFrameTools.clean_data(testo)
+    pd.testing.assert_frame_equal(df, atteso(testo))
+    assert list(df.columns) == ["Codice", "Vuota", "Codice_1", "Descrizione"]
+    # I codici restano stringhe
+    assert df["Codice"].tolist() == ["01", "002", "3"]
@@ -0,0 +1,103 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import CARTELLA_REPO, rendi_lista_se16
+from DF_Tools import DataFrameTools
+from SAP_Transactions import SAPDataExtractor, SAPWaitStrategy
+from utils.sap_fake import FakeSAPConnection
+
+
+def lista_se16(nome_file: str, righe: int = 2000, solo_ascii: bool = False) -> str:
+    """Rende un estratto salvato nel repository come lista SE16 "non convertita\""""
+    df = pd.read_csv(os.path.join(CARTELLA_REPO, nome_file), sep=';', dtype=str, keep_default_na=False, nrows=righe)
+    if solo_ascii:
+        # Gli estratti contengono anche spazi non separabili (U+00A0)
+        df = df[df.apply(lambda riga: all(valore.isascii() for valore in riga), axis=1)]
+    return rendi_lista_se16(list(df.columns), df.to_numpy().tolist())
+
+
+def confronta(tmp_path, testo: str, prefisso: bytes = b'', a_capo: str = '\n') -> None:
+    percorso = tmp_path / "lista.txt"
+    percorso.write_bytes(prefisso + testo.replace('\n', a_capo).encode('utf-8'))
+    atteso = DataFrameTools.clean_data(testo.replace('\n', a_capo))
+    pd.testing.assert_frame_equal(DataFrameTools.clean_data_file(str(percorso)), atteso)
+
+
+@pytest.mark.parametrize("nome_file", ["df_ZPMR_CTRL_ASS.csv", "df_ZPM4R_GL_T_FL.csv"])
+@pytest.mark.parametrize("a_capo", ['\n', '\r\n'])
+@pytest.mark.parametrize("bom", [b'', b'\xef\xbb\xbf'])
+def test_estratti_del_repository(tmp_path, nome_file, a_capo, bom):
+    confronta(tmp_path, lista_se16(nome_file), bom, a_capo)
+
+
+@pytest.mark.parametrize("a_capo", ['\n', '\r\n'])
+def test_riga_non_ascii(tmp_path, a_capo):
+    # df_ZPMR_CTRL_ASS è solo ASCII: aggiungo una riga con caratteri accentati
+    df = pd.read_csv(os.path.join(CARTELLA_REPO, "df_ZPMR_CTRL_ASS.csv"), sep=';', dtype=str,
+                     keep_default_na=False, nrows=50)
+    righe = df.to_numpy().tolist()
+    righe[10][8] = "Qualità"
+    testo = rendi_lista_se16(list(df.columns), righe)
+    confronta(tmp_path, testo, a_capo=a_capo)
+    percorso = tmp_path / "lista.txt"
+    assert DataFrameTools.clean_data_file(str(percorso))["Tipologia"].iloc[10] == "Qualità"
+
+
+def test_estratto_ascii_letto_dai_byte(tmp_path, monkeypatch):
+    percorso = tmp_path / "lista.txt"
+    testo = lista_se16("df_ZPMR_CTRL_ASS.csv", solo_ascii=True)
+    percorso.write_text(testo, encoding='utf-8')
+    atteso = DataFrameTools.clean_data(testo)
+    # Un file solo ASCII non passa dalla decodifica del testo
+    monkeypatch.setattr(DataFrameTools, "clean_data", staticmethod(lambda testo: pytest.fail("clean_data chiamata")))
+    df = DataFrameTools.clean_data_file(str(percorso))
+    pd.testing.assert_frame_equal(df, atteso)
+    assert len(df) > 1000
+    assert df["Check"].iloc[0] == "01_10_H11_6"
+
+
+def test_file_vuoto(tmp_path):
+    percorso = tmp_path / "lista.txt"
+    percorso.write_bytes(b'')
+    assert DataFrameTools.clean_data_file(str(percorso)) is None
+
+
+def _connessione_senza_latenze(tabelle):
+    return FakeSAPConnection(tabelle, latenza_query=0, latenza_export=0, latenza_popup=0)
+
+
+def test_esporta_file_elimina_il_file(tmp_path, tabelle_fake):
+    connessione = _connessione_senza_latenze(tabelle_fake)
+    session = connessione.Children(0)
+    scritti = []
+    chiudi_popup = session._chiudi_popup
+    def chiudi_e_registra():
+        scritti.extend(os.listdir(tmp_path))
+        chiudi_popup()
+    session._chiudi_popup = chiudi_e_registra
+
+    df = SAPDataExtractor(session, attesa=SAPWaitStrategy(), cartella_export=str(tmp_path)).extract_ZPMR_CTRL_ASS("W")
+    assert isinstance(df, pd.DataFrame) and len(df) == 22
+    assert len(scritti) == 1 and scritti[0].startswith("ZPMR_CTRL_ASS_")
+    assert os.listdir(tmp_path) == []
+
+
+def test_esporta_file_elimina_il_file_dopo_timeout(tmp_path, tabelle_fake):
+    connessione = _connessione_senza_latenze(tabelle_fake)
+    session = connessione.Children(0)
+    scritti = []
+    # La finestra di salvataggio non si chiude dopo la scrittura del file
+    session._chiudi_popup = lambda: scritti.extend(os.listdir(tmp_path))
+
+    # Orologio simulato: il timeout di 30 secondi scade senza attendere davvero
+    adesso = [0.0]
+    def sleep(secondi):
+        adesso[0] += secondi
+    attesa = SAPWaitStrategy(sleep=sleep, orologio=lambda: adesso[0])
+
+    risultato = SAPDataExtractor(session, attesa=attesa, cartella_export=str(tmp_path)).extract_ZPMR_CTRL_ASS("W")
+    assert risultato is False
+    assert len(scritti) == 1
+    assert os.listdir(tmp_path) == []
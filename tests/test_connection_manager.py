@@ -0,0 +1,166 @@
+import pytest
+
+import Config.constants as constants
+from SAP_Connection import SAPConnectionManager
+from SAP_Transactions import SAPDataExtractor, SAPDataUpLoader, SAPWaitStrategy
+from utils.sap_fake import FakeSAPGui
+
+
+class Orologio:
+    def __init__(self):
+        self.adesso = 0.0
+
+    def __call__(self) -> float:
+        return self.adesso
+
+    def avanza(self, minuti: float) -> None:
+        self.adesso += minuti * 60
+
+
+@pytest.fixture
+def orologio():
+    return Orologio()
+
+
+@pytest.fixture
+def gui(connessione_fake):
+    return FakeSAPGui(connessione_fake)
+
+
+@pytest.fixture
+def manager(gui, orologio):
+    return SAPConnectionManager(lambda: gui, idle_timeout_minuti=30, orologio=orologio)
+
+
+def test_connessione_al_primo_utilizzo(gui, manager):
+    # La creazione del manager non contatta SAP GUI
+    assert gui.chiamate == 0
+    assert not manager.sap.is_connected()
+    with manager as sap:
+        assert sap.is_connected()
+        assert sap.get_session() is gui.connessioni[0].Children(0)
+    assert gui.chiamate == 1
+    assert manager.n_connessioni == 1
+    # Alla fine del blocco with la connessione resta aperta
+    assert manager.sap.is_connected()
+
+
+def test_riutilizzo_della_connessione(gui, manager, orologio):
+    sessioni = []
+    for _ in range(3):
+        with manager as sap:
+            sessioni.append(sap.get_session())
+        orologio.avanza(10)
+    assert manager.n_connessioni == 1
+    assert gui.chiamate == 1
+    assert sessioni[0] is sessioni[1] is sessioni[2]
+
+
+def test_sonda_fallita_riconnette(gui, manager, connessione_fake):
+    with manager as sap:
+        vecchia = sap.get_session()
+    # L'utente chiude la sessione e ne apre un'altra
+    connessione_fake.CloseSession(vecchia.Id)
+    connessione_fake._aggiungi_sessione()
+    assert not manager.sonda()
+
+    with manager as sap:
+        assert sap.is_connected()
+        assert sap.get_session() is not vecchia
+        assert sap.get_session().Id == "/app/con[0]/ses[1]"
+    assert manager.n_connessioni == 2
+    assert gui.chiamate == 2
+
+
+def test_sap_gui_senza_connessioni(orologio):
+    gui = FakeSAPGui()
+    manager = SAPConnectionManager(lambda: gui, orologio=orologio)
+    with manager as sap:
+        assert not sap.is_connected()
+        assert sap.get_session() is None
+    assert manager.n_connessioni == 0
+    # Al tentativo successivo la connessione viene cercata di nuovo
+    with manager as sap:
+        assert not sap.is_connected()
+    assert gui.chiamate == 2
+
+
+def test_rilascio_dopo_inattivita(gui, manager, orologio):
+    with manager:
+        pass
+    orologio.avanza(29)
+    assert not manager.rilascia_se_inattiva()
+    assert manager.sap.is_connected()
+    orologio.avanza(1)
+    assert manager.rilascia_se_inattiva()
+    assert not manager.sap.is_connected()
+
+    # Al successivo utilizzo la connessione viene ristabilita
+    with manager as sap:
+        assert sap.is_connected()
+    assert manager.n_connessioni == 2
+
+
+def test_connessione_inattiva_ristabilita_all_utilizzo(gui, manager, orologio):
+    with manager:
+        pass
+    orologio.avanza(31)
+    with manager as sap:
+        assert sap.is_connected()
+    assert manager.n_connessioni == 2
+
+
+def test_connessione_in_uso_non_rilasciata(manager, orologio):
+    with manager as sap:
+        orologio.avanza(120)
+        assert not manager.rilascia_se_inattiva()
+        assert sap.is_connected()
+    # Il tempo di inattività parte dalla fine dell'utilizzo
+    orologio.avanza(29)
+    assert not manager.rilascia_se_inattiva()
+
+
+def test_timeout_inattivita_predefinito():
+    manager = SAPConnectionManager(lambda: FakeSAPGui())
+    assert manager.idle_timeout_secondi == constants.SAP_connessione_inattiva_minuti * 60
+
+
+def test_timeout_inattivita_disattivato(gui, orologio):
+    manager = SAPConnectionManager(lambda: gui, idle_timeout_minuti=0, orologio=orologio)
+    with manager:
+        pass
+    orologio.avanza(24 * 60)
+    assert not manager.rilascia_se_inattiva()
+
+
+def test_chiudi(manager):
+    with manager:
+        pass
+    manager.chiudi()
+    assert not manager.sap.is_connected()
+
+
+def test_verifica_e_caricamento_con_la_stessa_connessione(gui, manager, connessione_fake, tabelle_fake,
+                                                         orologio, tmp_path):
+    file_upload = tmp_path / "ZPMR_FL_2_UpLoad.csv"
+    file_upload.write_text(constants.intestazione_ZPMR_FL_2 + "\nZ-RWM;W;2;IT;ABCD\n", encoding='utf-8')
+    attesa = SAPWaitStrategy()
+
+    # Verifica: estrazione di una tabella globale
+    with manager as sap:
+        estratto = SAPDataExtractor(sap.get_session(), connessione_fake.clipboard, attesa=attesa).extract_ZPMR_CTRL_ASS("W")
+    assert estratto == tabelle_fake["ZPMR_CTRL_ASS"]
+    orologio.avanza(5)
+
+    # Caricamento degli aggiornamenti
+    with manager as sap:
+        assert SAPDataUpLoader(sap.get_session(), attesa=attesa).UpLoadLivello_2_SAP(str(file_upload)) is True
+    orologio.avanza(5)
+
+    # Nuova verifica
+    with manager as sap:
+        estratto = SAPDataExtractor(sap.get_session(), connessione_fake.clipboard, attesa=attesa).extract_ZPMR_CTRL_ASS("W")
+    assert estratto == tabelle_fake["ZPMR_CTRL_ASS"]
+
+    assert manager.n_connessioni == 1
+    assert gui.chiamate == 1
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from DF_Tools import DataFrameTools
+from Tree_tools import FLTree
+
+FL = [
+    "USE-USJB-0A-01-TR",      # genitore USE-USJB-0A-01 mancante
+    "USE-USJB",
+    "USE",
+    "USE-USJB-00",
+    "USE-USJB-00-01-AB-002",  # genitori USE-USJB-00-01-AB e USE-USJB-00-01 mancanti
+    "USE-USJB-0A-01-TR-001",
+    "USE-USJB-00",            # duplicato
+    "ITA-ITRO-0E",            # antenati ITA-ITRO e ITA mancanti
+    None,
+]
+
+
+@pytest.fixture
+def albero():
+    return FLTree.from_fl(FL)
+
+
+def test_struttura(albero):
+    assert albero.nodi_input[-1] == -1
+    assert all(albero.fl(int(nodo)) == fl for nodo, fl in zip(albero.nodi_input, FL) if nodo >= 0)
+    assert albero.nodi_input[3] == albero.nodi_input[6]
+
+    use_usjb = albero.nodo("USE-USJB")
+    assert albero.fl(int(albero.parent[use_usjb])) == "USE"
+    assert sorted(albero.fl(int(n)) for n in albero.figli(use_usjb)) == ["USE-USJB-00", "USE-USJB-0A"]
+    assert [albero.fl(int(n)) for n in albero.antenati(albero.nodo("USE-USJB-0A-01-TR-001"))] == [
+        "USE", "USE-USJB", "USE-USJB-0A", "USE-USJB-0A-01", "USE-USJB-0A-01-TR", "USE-USJB-0A-01-TR-001"
+    ]
+    assert albero.percorso(albero.nodo("ITA-ITRO-0E")) == ["ITA", "ITRO", "0E"]
+    assert sorted(albero.fl(int(n)) for n in albero.nodi_livello(1)) == ["ITA", "USE"]
+    assert albero.nodo("USE-XXXX") == -1
+
+    # Un nodo per ogni prefisso distinto, presente solo se la FL è nella lista
+    prefissi = {"-".join(fl.split("-")[:i]) for fl in FL if fl for i in range(1, fl.count("-") + 2)}
+    assert len(albero) == len(prefissi)
+    assert {albero.fl(n) for n in range(len(albero)) if albero.presente[n]} == {fl for fl in FL if fl}
+    assert albero.conteggio_sottoalbero()[albero.nodo("USE-USJB-00")] == 2
+
+
+def test_parent_mancanti(albero):
+    assert albero.parent_mancanti() == ["ITA-ITRO", "USE-USJB-0A-01", "USE-USJB-00-01-AB"]
+    assert albero.antenati_mancanti() == [
+        "ITA", "ITA-ITRO", "USE-USJB-0A", "USE-USJB-0A-01", "USE-USJB-00-01", "USE-USJB-00-01-AB"
+    ]
+
+
+def test_parent_mancanti_da_dataframe(albero):
+    # Il DataFrame viene verificato con l'albero delle sue FL, anche se è una copia di quello originale
+    df = pd.DataFrame({'FL': [fl for fl in FL if fl]}).copy()
+    assert DataFrameTools.trova_parent_mancanti(df) == albero.parent_mancanti()
+    assert DataFrameTools.trova_parent_mancanti(df, tutti_gli_antenati=True) == albero.antenati_mancanti()
+    assert DataFrameTools.trova_parent_mancanti(df[df['FL'] != "ITA-ITRO-0E"]) == ["USE-USJB-0A-01", "USE-USJB-00-01-AB"]
+
+    with pytest.raises(ValueError):
+        DataFrameTools.trova_parent_mancanti(pd.DataFrame({'Valore': ["USE"]}))
+
+
+def test_lista_vuota():
+    albero = FLTree.from_fl([None])
+    assert len(albero) == 0
+    assert albero.nodi_input.tolist() == [-1]
+    assert albero.parent_mancanti() == []
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import DF_Tools
+from DF_Tools import DataFrameTools
+
+FL = [
+    "USE-USJB-0A", "USE-USJB-0A-01", "USE-USJB-0A-01-TR", "USE-USJB-0A-01-TR-001",
+    "USE-USJB-00", "USE-USJB-00-01-AB-002", "USE-USJB-0A-01",
+]
+
+
+@pytest.fixture
+def conta_parse(monkeypatch):
+    """Conta le FL elaborate da add_level_lunghezza"""
+    elaborate = []
+    originale = DataFrameTools.add_level_lunghezza
+
+    def add_level_lunghezza(df, col1):
+        elaborate.extend(df[col1].tolist())
+        return originale(df, col1)
+
+    monkeypatch.setattr(DF_Tools.DataFrameTools, "add_level_lunghezza", staticmethod(add_level_lunghezza))
+    return elaborate
+
+
+def test_stessa_lista_riutilizza_il_parse(conta_parse):
+    (df_1, parse_1), error = DataFrameTools.parse_fl_incrementale(FL)
+    assert error is None
+    assert df_1['FL'].tolist() == FL
+    assert sorted(conta_parse) == sorted(set(FL))
+
+    (df_2, parse_2), error = DataFrameTools.parse_fl_incrementale(FL, parse_1)
+    assert error is None
+    # Nessuna FL nuova: il parse precedente viene riutilizzato senza rielaborare
+    assert sorted(conta_parse) == sorted(set(FL))
+    pd.testing.assert_frame_equal(df_2, df_1)
+    pd.testing.assert_frame_equal(parse_2, parse_1)
+
+
+def test_solo_fl_nuove_elaborate(conta_parse):
+    (_, parse_1), _ = DataFrameTools.parse_fl_incrementale(FL[:4])
+    conta_parse.clear()
+
+    (df, parse_2), error = DataFrameTools.parse_fl_incrementale(FL[2:], parse_1)
+    assert error is None
+    assert sorted(conta_parse) == ["USE-USJB-00", "USE-USJB-00-01-AB-002"]
+    # Il risultato è quello di un parse completo e il parse conserva solo le FL della lista
+    (df_completo, _), _ = DataFrameTools.parse_fl_incrementale(FL[2:])
+    pd.testing.assert_frame_equal(df, df_completo)
+    assert set(parse_2.index) == set(FL[2:])
+
+
+def test_lista_vuota():
+    risultato, error = DataFrameTools.parse_fl_incrementale([])
+    assert risultato is None
+    assert isinstance(error, ValueError)
@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+
+import Config.constants as constants
+from SAP_Transactions import SAPDataExtractor, SAPWaitStrategy, SelezioneSE16
+
+
+def test_comprimi_raggruppa_per_prefisso_e_lunghezza():
+    singoli, intervalli = SelezioneSE16.comprimi(["H11", "H12", "H13", "W11", "W12", "W13", "H15"])
+    assert singoli == ["H15"]
+    assert intervalli == [("H11", "H13"), ("W11", "W13")]
+
+
+def test_comprimi_lunghezze_diverse_non_si_uniscono():
+    # "1" e "01" hanno lo stesso numero ma un formato diverso: l'ordine alfabetico non è quello numerico
+    singoli, intervalli = SelezioneSE16.comprimi(["1", "2", "3", "01", "02", "03"])
+    assert singoli == []
+    assert intervalli == [("01", "03"), ("1", "3")]
+    singoli, intervalli = SelezioneSE16.comprimi(["8", "9", "10", "11"])
+    assert singoli == ["10", "11", "8", "9"]
+    assert intervalli == []
+
+
+def test_comprimi_valori_non_numerici():
+    singoli, intervalli = SelezioneSE16.comprimi(["AB", "ZZ", "0A", "A-B"])
+    assert singoli == ["0A", "A-B", "AB", "ZZ"]
+    assert intervalli == []
+
+
+def test_comprimi_duplicati():
+    singoli, intervalli = SelezioneSE16.comprimi(["H1", "H1", "H2", "H3", "H3", "X", "X"])
+    assert singoli == ["X"]
+    assert intervalli == [("H1", "H3")]
+
+
+def test_comprimi_sequenze_corte_restano_singole():
+    assert SelezioneSE16.comprimi(["H01", "H02", "H04"]) == (["H01", "H02", "H04"], [])
+    assert SelezioneSE16.comprimi(["H01", "H02"], min_intervallo=2) == ([], [("H01", "H02")])
+
+
+def _estrattore(connessione, tmp_path):
+    return SAPDataExtractor(connessione.Children(0), connessione.clipboard, attesa=SAPWaitStrategy(),
+                            cartella_export=str(tmp_path))
+
+
+def test_selezione_nel_campo_della_tabella(connessione_fake, tmp_path):
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    df = estrattore.extract_ZPMR_CTRL_ASS("W", {"H05", "H06", "H07", "H09", "ZZ"})
+
+    session = connessione_fake.Children(0)
+    assert session.selezioni == [("ZPMR_CTRL_ASS", "I1", ["H09", "ZZ"], [("H05", "H07")])]
+    # Ogni valore è scritto nella prima riga visibile, facendo scorrere la tabella
+    assert session.celle_selezione == [
+        (f"{SAPDataExtractor.TABELLA_SINGOLI}/ctxtRSCSEL_255-SLOW_I[1,0]", 0, "H09"),
+        (f"{SAPDataExtractor.TABELLA_SINGOLI}/ctxtRSCSEL_255-SLOW_I[1,0]", 1, "ZZ"),
+        (f"{SAPDataExtractor.TABELLA_INTERVALLI}/ctxtRSCSEL_255-ILOW_I[1,0]", 0, "H05"),
+        (f"{SAPDataExtractor.TABELLA_INTERVALLI}/ctxtRSCSEL_255-IHIGH_I[2,0]", 0, "H07"),
+    ]
+    assert isinstance(df, pd.DataFrame)
+    assert sorted(df["Valore Livello"]) == ["H05", "H06", "H07", "H09", "ZZ"]
+
+
+def test_campo_valore_indicato(connessione_fake, tmp_path):
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    estrattore.extract_ZPM4R_GL_T_FL("W", {"AB"}, campo_valore="I7")
+    assert connessione_fake.Children(0).selezioni == [("ZPM4R_GL_T_FL", "I7", ["AB"], [])]
+
+
+@pytest.mark.parametrize("tabella", ["ZPMR_CONTROL_FL1", "ZPMR_CONTROL_FL2"])
+def test_tabelle_fl_estratte_per_intero(connessione_fake, tmp_path, tabella):
+    # Le tabelle senza campo di selezione di VALUE non fanno parte dell'estrazione selettiva
+    assert tabella not in constants.SAP_campi_valore
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    df = getattr(estrattore, f"extract_{tabella}")("W")
+    assert connessione_fake.Children(0).selezioni == []
+    assert len(df) == 22
+
+
+def test_selezione_senza_campo_e_un_errore(connessione_fake, tmp_path):
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    # Senza campo di VALUE il filtro non può essere applicato: nessuna tabella completa al posto della selezione
+    assert estrattore.extract_ZPMR_CTRL_ASS("W", {"H05", "ZZ"}, campo_valore=None) is False
+    assert connessione_fake.Children(0).selezioni == []
+
+
+def test_limite_voci_selezione(connessione_fake, tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "SAP_selezione_max_valori", 2)
+    assert not SelezioneSE16.applicabile({"H01", "H05", "ZZ"})
+    assert SelezioneSE16.applicabile({"H01", "H02", "H03", "ZZ"})
+
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    # Oltre il limite la selezione non viene saltata in silenzio
+    assert estrattore.extract_ZPMR_CTRL_ASS("W", {"H01", "H05", "ZZ"}) is False
+    assert connessione_fake.Children(0).selezioni == []
+    # Con le voci entro il limite la selezione viene applicata (H01..H03 diventano un intervallo)
+    df = estrattore.extract_ZPMR_CTRL_ASS("W", {"H01", "H02", "H03", "ZZ"})
+    assert connessione_fake.Children(0).selezioni == [("ZPMR_CTRL_ASS", "I1", ["ZZ"], [("H01", "H03")])]
+    assert len(df) == 4
+
+
+@pytest.mark.parametrize("tabella", ["ZPMR_CTRL_ASS", "ZPM4R_GL_T_FL"])
+@pytest.mark.parametrize("su_file", [True, False])
+def test_selezione_senza_righe(connessione_fake, tmp_path, tabella, su_file):
+    session = connessione_fake.Children(0)
+    estrattore = SAPDataExtractor(session, connessione_fake.clipboard, attesa=SAPWaitStrategy(),
+                                  cartella_export=str(tmp_path) if su_file else None)
+    df = getattr(estrattore, f"extract_{tabella}")("W", {"X01", "X02"})
+
+    # Risultato vuoto con le colonne della tabella, senza esportare la lista
+    assert isinstance(df, pd.DataFrame)
+    assert df.empty
+    assert list(df.columns) == constants.SAP_colonne_lista[tabella]
+    assert "wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]" not in session._elementi
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_errore_nella_barra_di_stato_non_e_selezione_vuota(connessione_fake, tmp_path):
+    estrattore = _estrattore(connessione_fake, tmp_path)
+    barra = connessione_fake.Children(0).findById("wnd[0]/sbar")
+    barra.Text, barra.MessageType = "Nessuna voce: autorizzazione mancante", "E"
+    assert not estrattore._selezione_vuota()
+    barra.MessageType = "S"
+    assert estrattore._selezione_vuota()
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import TABELLE_SAP
+from SAP_Connection import SAPSessionPool
+from SAP_Transactions import SAPDataExtractor, SAPWaitStrategy
+from utils.sap_fake import FakeSAPConnection
+
+LATENZA_QUERY = 0.4
+
+
+@pytest.fixture
+def connessione(tabelle_fake):
+    # Latenza della query dominante rispetto all'esportazione, come nelle estrazioni reali
+    return FakeSAPConnection(tabelle_fake, latenza_query=LATENZA_QUERY, latenza_export=0.02,
+                             latenza_popup=0.005, latenza_apertura=0.02)
+
+
+class LockConteggiato:
+    """Lock che registra quante volte è stato acquisito e il massimo di thread che lo hanno tenuto insieme"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contatori = threading.Lock()
+        self.dentro = 0
+        self.massimo = 0
+        self.acquisizioni = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        with self._contatori:
+            self.dentro += 1
+            self.acquisizioni += 1
+            self.massimo = max(self.massimo, self.dentro)
+        # Lascio agli altri thread il tempo di provare a entrare
+        time.sleep(0.01)
+        return self
+
+    def __exit__(self, *args):
+        with self._contatori:
+            self.dentro -= 1
+        self._lock.release()
+
+
+def _compito(nome, cartella_export=None):
+    attesa = SAPWaitStrategy()
+    # La clipboard simulata è condivisa da tutte le sessioni della connessione
+    return lambda s: getattr(SAPDataExtractor(s, s.clipboard, attesa=attesa, cartella_export=cartella_export),
+                             f"extract_{nome}")("W")
+
+
+def _sequenziale(connessione, cartella_export=None):
+    session = connessione.Children(0)
+    inizio = time.monotonic()
+    risultati = {nome: _compito(nome, cartella_export)(session) for nome in TABELLE_SAP}
+    return risultati, time.monotonic() - inizio
+
+
+def _parallelo(connessione, cartella_export=None):
+    with SAPSessionPool(connessione, n_sessioni=4, motore_thread=lambda: connessione) as pool:
+        assert len(pool.sessioni) == 4
+        inizio = time.monotonic()
+        risultati = pool.esegui({nome: _compito(nome, cartella_export) for nome in TABELLE_SAP})
+        durata = time.monotonic() - inizio
+    # Le sessioni aperte dal pool vengono chiuse
+    assert connessione.Children.Count == 1
+    return risultati, durata
+
+
+def test_clipboard_pool_come_sequenziale(connessione, tabelle_fake, monkeypatch):
+    lock = LockConteggiato()
+    monkeypatch.setattr(SAPDataExtractor, "clipboard_lock", lock)
+
+    sequenziali, durata_sequenziale = _sequenziale(connessione)
+    paralleli, durata_parallela = _parallelo(connessione)
+
+    assert paralleli == sequenziali == tabelle_fake
+    # Le esportazioni nella clipboard condivisa avvengono una alla volta
+    assert lock.acquisizioni == 8
+    assert lock.massimo == 1
+    # Le query vengono eseguite in parallelo
+    assert durata_sequenziale >= 4 * LATENZA_QUERY
+    assert durata_parallela < 0.6 * durata_sequenziale
+
+
+def test_file_pool_come_sequenziale(connessione, tmp_path):
+    sequenziali, _ = _sequenziale(connessione, str(tmp_path))
+    paralleli, _ = _parallelo(connessione, str(tmp_path))
+
+    assert set(paralleli) == set(TABELLE_SAP)
+    for nome in TABELLE_SAP:
+        assert isinstance(paralleli[nome], pd.DataFrame)
+        pd.testing.assert_frame_equal(paralleli[nome], sequenziali[nome])
+
+
+def test_sessione_guasta_non_perde_tabelle(connessione, tabelle_fake):
+    with SAPSessionPool(connessione, n_sessioni=4, motore_thread=lambda: connessione) as pool:
+        guasta = pool.sessioni[2]
+        # La sessione resta tra i figli della connessione ma non risponde più
+        connessione.findById(guasta)._chiusa = True
+        risultati = pool.esegui({nome: _compito(nome) for nome in TABELLE_SAP})
+        assert guasta not in pool.sessioni
+        assert len(pool.sessioni) == 3
+
+    assert risultati == tabelle_fake
+
+
+def test_nessuna_sessione_utilizzabile(connessione):
+    with SAPSessionPool(connessione, n_sessioni=2, motore_thread=lambda: connessione) as pool:
+        for id_sessione in pool.sessioni:
+            connessione.findById(id_sessione)._chiusa = True
+        risultati = pool.esegui({nome: _compito(nome) for nome in TABELLE_SAP})
+
+    assert risultati == dict.fromkeys(TABELLE_SAP, False)
+
+
+def test_compito_fallito_su_sessione_valida(connessione, tabelle_fake):
+    # Un compito che non va a buon fine non esclude la sessione
+    compiti = {nome: _compito(nome) for nome in TABELLE_SAP}
+    compiti["ZPMR_CTRL_ASS"] = lambda s: False
+    with SAPSessionPool(connessione, n_sessioni=2, motore_thread=lambda: connessione) as pool:
+        risultati = pool.esegui(compiti)
+        assert len(pool.sessioni) == 2
+
+    assert risultati["ZPMR_CTRL_ASS"] is False
+    assert {nome: risultati[nome] for nome in TABELLE_SAP if nome != "ZPMR_CTRL_ASS"} == \
+        {nome: tabelle_fake[nome] for nome in TABELLE_SAP if nome != "ZPMR_CTRL_ASS"}
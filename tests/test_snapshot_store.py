@@ -0,0 +1,98 @@
+import os
+import pickle
+
+import pandas as pd
+import pytest
+
+import File_tools
+from File_tools import SAPSnapshotStore
+
+
+@pytest.fixture
+def letture(monkeypatch):
+    """Conta i DataFrame caricati dagli snapshot"""
+    conteggio = []
+    originale = pickle.load
+
+    def load(f, *args, **kwargs):
+        conteggio.append(f.name)
+        return originale(f, *args, **kwargs)
+
+    monkeypatch.setattr(File_tools.pickle, "load", load)
+    return conteggio
+
+
+def tabella(valori):
+    return pd.DataFrame({'Valore Livello': valori, 'Descrizione': [f"Descr {v}" for v in valori]})
+
+
+def test_controlli_senza_caricare_i_dati(tmp_path, letture):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=60)
+    store.salva("ZPMR_CTRL_ASS", "E", tabella(["H01", "H02"]), valori={"H01", "H02"})
+
+    assert 0 <= store.eta("ZPMR_CTRL_ASS", "E") < 60
+    assert store.valori_mancanti("ZPMR_CTRL_ASS", "E", ["H01", "H03"]) == {"H03"}
+    # Richieste non coperte dallo snapshot parziale
+    assert store.carica("ZPMR_CTRL_ASS", "E", ["H01", "H03"]) is None
+    assert store.carica("ZPMR_CTRL_ASS", "E") is None
+    assert store.eta("ZPMR_CTRL_ASS", "B") is None
+    assert letture == []
+
+    df = store.carica("ZPMR_CTRL_ASS", "E", ["H02"])
+    pd.testing.assert_frame_equal(df, tabella(["H01", "H02"]))
+    assert len(letture) == 1
+
+
+def test_snapshot_scaduto(tmp_path, letture):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=0)
+    store.salva("ZPM4R_GL_T_FL", "E", tabella(["H01"]))
+    assert store.eta("ZPM4R_GL_T_FL", "E") is not None
+    assert store.carica("ZPM4R_GL_T_FL", "E") is None
+    assert store.valori_mancanti("ZPM4R_GL_T_FL", "E", ["H01"]) == {"H01"}
+    assert letture == []
+
+
+def test_aggiorna_unisce_lo_snapshot_parziale(tmp_path):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=60)
+    store.aggiorna("ZPMR_CTRL_ASS", "E", tabella(["H01", "H02"]), valori=["H01", "H02"])
+    eta_prima = store.eta("ZPMR_CTRL_ASS", "E")
+
+    df = store.aggiorna("ZPMR_CTRL_ASS", "E", tabella(["H02", "H03"]), valori=["H03"])
+    pd.testing.assert_frame_equal(df, tabella(["H01", "H02", "H03"]))
+    assert store.valori_mancanti("ZPMR_CTRL_ASS", "E", ["H01", "H02", "H03", "H04"]) == {"H04"}
+    pd.testing.assert_frame_equal(store.carica("ZPMR_CTRL_ASS", "E", ["H03"]), df)
+    # Lo snapshot unito mantiene l'istante della prima estrazione
+    assert store.eta("ZPMR_CTRL_ASS", "E") >= eta_prima
+
+
+def test_dati_non_corrispondenti_ai_metadati(tmp_path):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=60)
+    store.salva("ZPMR_CONTROL_FL1", "E", tabella(["H01"]))
+    # Dati di un'altra estrazione (ad esempio scrittura dei metadati interrotta)
+    percorso = os.path.join(str(tmp_path), "ZPMR_CONTROL_FL1_E.pkl")
+    with open(percorso, 'wb') as f:
+        pickle.dump({'versione': SAPSnapshotStore.VERSIONE, 'estratto': 0.0, 'dati': tabella(["H09"])}, f)
+    assert store.carica("ZPMR_CONTROL_FL1", "E") is None
+
+
+def test_invalida_elimina_dati_e_metadati(tmp_path):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=60)
+    store.salva("ZPMR_CONTROL_FL1", "E", tabella(["H01"]))
+    store.salva("ZPMR_CONTROL_FL1", "B", tabella(["H01"]))
+    store.salva("ZPMR_CONTROL_FL2", "E", tabella(["H01"]))
+
+    store.invalida("ZPMR_CONTROL_FL1", "E")
+    assert store.eta("ZPMR_CONTROL_FL1", "E") is None
+    assert store.carica("ZPMR_CONTROL_FL1", "B") is not None
+
+    store.invalida("ZPMR_CONTROL_FL1")
+    assert sorted(os.listdir(tmp_path)) == ["ZPMR_CONTROL_FL2_E.json", "ZPMR_CONTROL_FL2_E.pkl"]
+
+
+def test_selezione_senza_righe_copre_i_valori(tmp_path):
+    store = SAPSnapshotStore(str(tmp_path), ttl_minuti=60)
+    vuoto = pd.DataFrame(columns=['Valore Livello', 'Descrizione'], dtype=object)
+    store.aggiorna("ZPMR_CTRL_ASS", "E", vuoto, valori=["X01"])
+    assert store.valori_mancanti("ZPMR_CTRL_ASS", "E", ["X01"]) == set()
+    df = store.carica("ZPMR_CTRL_ASS", "E", ["X01"])
+    assert df.empty and list(df.columns) == ['Valore Livello', 'Descrizione']
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Config.constants as constants
+from conftest import CARTELLA_REPO, REGEX_DICT_BESS
+from DF_Tools import DataFrameTools
+from RE_tools import RegularExpressionsTools
+from Stream_tools import StreamValidator
+
+
+@pytest.fixture(scope="module")
+def fl_campione():
+    """FL del file di esempio BESS, con alcune FL errate e duplicati nello stesso blocco e tra blocchi"""
+    fl = pd.read_csv(os.path.join(CARTELLA_REPO, "FL_Bess_Ables.csv"), sep=';', encoding='utf-8-sig')['FL'].tolist()
+    fl = fl + ["USE-USJB-0A-XX", "use-usjb", "USE-USJB-00-VC", fl[0], fl[-1]]
+    fl.insert(10, fl[5])
+    return fl
+
+
+def test_risultati_come_verifica_in_memoria(tmp_path, df_regex, fl_campione):
+    file_input = tmp_path / "fl.txt"
+    # Righe vuote e spazi vengono ignorati
+    file_input.write_text("\n".join(f"  {fl}" if i % 7 == 0 else fl for i, fl in enumerate(fl_campione)) + "\n\n",
+                          encoding='utf-8')
+    file_output = tmp_path / "risultati.csv"
+
+    validator = StreamValidator(constants.mask_FL_generica, df_regex, REGEX_DICT_BESS, chunk_size=300)
+    riepilogo = validator.valida_file(str(file_input), str(file_output))
+    risultati = pd.read_csv(file_output, sep=';', dtype={'FL': str}, keep_default_na=False)
+
+    # Verifica in memoria sull'intera lista
+    df_fl = pd.DataFrame({'Riga': range(1, len(fl_campione) + 1), 'FL': fl_campione})
+    df_livelli, error = DataFrameTools.add_level_lunghezza(df_fl, 'FL')
+    assert error is None
+    atteso = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(df_livelli, df_regex, REGEX_DICT_BESS)
+    atteso = df_fl.merge(atteso[['Riga', 'Check_Result']], on='Riga', how='left')
+
+    assert riepilogo['Righe'] == len(fl_campione)
+    assert riepilogo['Blocchi'] == -(-len(fl_campione) // 300)
+    assert risultati['FL'].tolist() == fl_campione
+    assert risultati['Riga'].tolist() == df_fl['Riga'].tolist()
+    assert risultati['Check_Result'].astype(str).tolist() == atteso['Check_Result'].astype(str).tolist()
+    assert risultati['Duplicato'].tolist() == df_fl['FL'].duplicated().tolist()
+    assert risultati['Maschera_Generica'].tolist() == df_fl['FL'].str.match(constants.mask_FL_generica).tolist()
+    assert riepilogo['Duplicati'] == int(df_fl['FL'].duplicated().sum())
+    assert riepilogo['Errori_Linee_Guida'] == int((atteso['Check_Result'] != True).sum())
+    # Una impronta per FL distinta
+    assert validator.n_impronte == df_fl['FL'].nunique()
+
+
+def test_impronte_ordinate_tra_molti_blocchi(df_regex):
+    validator = StreamValidator(constants.mask_FL_generica, df_regex, REGEX_DICT_BESS)
+    generatore = np.random.default_rng(0)
+    viste = set()
+    for _ in range(40):
+        impronte = generatore.integers(0, 5000, size=200).astype(np.uint64)
+        gia_lette = validator._gia_lette(impronte)
+        assert gia_lette.tolist() == [int(i) in viste for i in impronte]
+        nuove = np.unique(impronte[~gia_lette])
+        validator._aggiungi_impronte(nuove)
+        viste.update(int(i) for i in nuove)
+        # Gli array restano ordinati, senza duplicati, e in numero logaritmico
+        assert all((np.diff(ordinate.astype(np.int64)) > 0).all() for ordinate in validator._impronte)
+        assert len(validator._impronte) <= 8
+    assert validator.n_impronte == len(viste)
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pytest
+
+import RE_tools
+from conftest import CARTELLA_REPO, REGEX_DICT_BESS
+from DF_Tools import DataFrameTools
+from RE_tools import RegularExpressionsTools
+
+
+@pytest.fixture
+def df_fl():
+    fl = pd.read_csv(os.path.join(CARTELLA_REPO, "FL_Bess_Ables.csv"), sep=';', encoding='utf-8-sig')['FL'].tolist()
+    fl = fl + ["USE-USJB-0A-XX", "use-usjb", "USE-USJB-00-VC"]
+    df, error = DataFrameTools.add_level_lunghezza(pd.DataFrame({'FL': fl}), 'FL')
+    assert error is None
+    return df
+
+
+@pytest.fixture(autouse=True)
+def pool_pulito():
+    RE_tools._PoolVerifica.chiudi()
+    yield
+    RE_tools._PoolVerifica.chiudi()
+
+
+def test_parallela_uguale_a_sequenziale(df_fl, df_regex):
+    sequenziale = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(df_fl.copy(), df_regex, REGEX_DICT_BESS)
+    parallela = RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+        df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=2, chunk_size=200
+    )
+    pd.testing.assert_frame_equal(parallela, sequenziale)
+    assert (sequenziale['Check_Result'] != True).sum() > 0
+
+
+def test_pool_riutilizzato_tra_le_chiamate(df_fl, df_regex):
+    RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+        df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=2, chunk_size=200
+    )
+    executor = RE_tools._PoolVerifica.executor
+    assert executor is not None
+
+    RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+        df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=2, chunk_size=200
+    )
+    assert RE_tools._PoolVerifica.executor is executor
+
+    # Un numero di processi diverso richiede un nuovo pool
+    RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+        df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=3, chunk_size=200
+    )
+    assert RE_tools._PoolVerifica.executor is not executor
+
+
+def test_sotto_un_blocco_resta_sequenziale(df_fl, df_regex):
+    RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+        df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=2, chunk_size=len(df_fl)
+    )
+    assert RE_tools._PoolVerifica.executor is None
+
+
+class ExecutorGuasto:
+    """Pool i cui blocchi falliscono come dopo la terminazione di un processo worker"""
+
+    def submit(self, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("processo terminato"))
+        return future
+
+    def shutdown(self, cancel_futures=False):
+        pass
+
+
+def test_blocco_fallito_interrompe_la_verifica(df_fl, df_regex, monkeypatch):
+    monkeypatch.setattr(RE_tools._PoolVerifica, "ottieni", classmethod(lambda cls, n_workers, regole: ExecutorGuasto()))
+    with pytest.raises(RuntimeError, match="processo terminato"):
+        RegularExpressionsTools.verifica_fl_con_regex_per_categorie(
+            df_fl.copy(), df_regex, REGEX_DICT_BESS, n_workers=2, chunk_size=200
+        )
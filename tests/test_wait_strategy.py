@@ -0,0 +1,104 @@
+import pytest
+
+from SAP_Transactions import SAPDataUpLoader, SAPWaitStrategy
+from utils.sap_fake import FakeClipboard, FakeSAPSession
+
+
+class OrologioFinto:
+    """Orologio e sleep simulati: sleep fa avanzare il tempo e registra le attese"""
+
+    def __init__(self):
+        self.adesso = 0.0
+        self.attese = []
+
+    def __call__(self) -> float:
+        return self.adesso
+
+    def sleep(self, secondi: float) -> None:
+        self.attese.append(secondi)
+        self.adesso += secondi
+
+
+@pytest.fixture
+def orologio():
+    return OrologioFinto()
+
+
+@pytest.fixture
+def attesa(orologio):
+    return SAPWaitStrategy(sleep=orologio.sleep, orologio=orologio)
+
+
+@pytest.fixture
+def session(orologio):
+    # Sessione simulata con lo stesso orologio della strategia: le finestre si aprono e chiudono dopo 0.3 s
+    session = FakeSAPSession("/app/con[0]/ses[0]", None, {}, FakeClipboard(), latenza_popup=0.3, orologio=orologio)
+    session._schermata = "SE16"
+    return session
+
+
+def test_attese_crescenti_fino_al_massimo(attesa, orologio):
+    assert attesa.attendi("passo", lambda: False, timeout=2) is False
+    assert orologio.attese[:7] == pytest.approx([0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.25])
+    assert max(orologio.attese) == 0.25
+    assert set(orologio.attese[6:]) == {0.25}
+
+
+def test_timeout_restituisce_false(attesa, orologio):
+    assert attesa.attendi("passo", lambda: False, timeout=1) is False
+    # Si rinuncia al primo controllo dopo la scadenza, al più un'attesa massima oltre il timeout
+    assert 1 < orologio.adesso <= 1 + 0.25
+    assert attesa.latenze["passo"] == [pytest.approx(orologio.adesso)]
+
+
+def test_condizione_verificata(attesa, orologio):
+    controlli = iter([False, False, False, True])
+    assert attesa.attendi("passo", lambda: next(controlli)) is True
+    assert orologio.attese == pytest.approx([0.005, 0.01, 0.02])
+    assert attesa.latenze["passo"] == [pytest.approx(0.035)]
+
+
+def test_attendi_controllo_apertura_e_chiusura(attesa, orologio, session):
+    assert not attesa.controllo_presente(session, "wnd[1]")
+    session.findById("wnd[0]").sendVKey(4)
+    assert attesa.attendi_controllo(session, "wnd[1]", "apertura", timeout=5) is True
+    assert orologio.adesso >= 0.3
+
+    session.findById("wnd[1]/tbar[0]/btn[0]").press()
+    inizio = orologio.adesso
+    # Il controllo è ancora presente finché la finestra non si chiude
+    assert attesa.attendi_controllo(session, "wnd[1]", "chiusura", presente=False, timeout=5) is True
+    assert orologio.adesso - inizio >= 0.3
+    assert not attesa.controllo_presente(session, "wnd[1]")
+
+
+def test_attendi_controllo_assente_timeout(attesa, session):
+    session.findById("wnd[0]").sendVKey(4)
+    assert attesa.attendi_controllo(session, "wnd[1]", "apertura") is True
+    # La finestra resta aperta: l'attesa della chiusura scade
+    assert attesa.attendi_controllo(session, "wnd[1]", "chiusura", presente=False, timeout=1) is False
+    assert SAPDataUpLoader(session, attesa=attesa).wait_for_control("wnd[1]", "chiusura", presente=False, timeout=1) is False
+
+
+def test_attendi_sap_occupata(attesa, orologio, session):
+    session._occupa(0.5)
+    assert attesa.attendi_sap(session, "query") is True
+    assert orologio.adesso >= 0.5
+
+
+def test_riepilogo(attesa, orologio):
+    attesa.attendi("breve", lambda: True)
+    controlli = iter([False] * 5 + [True])
+    attesa.attendi("lungo", lambda: next(controlli))
+    attesa.attendi("lungo", lambda: True)
+
+    riepilogo = attesa.riepilogo()
+    assert list(riepilogo.columns) == ['Passo', 'Attese', 'Totale [s]', 'Media [s]', 'Massimo [s]']
+    # Ordinato per tempo totale decrescente
+    assert list(riepilogo['Passo']) == ['lungo', 'breve']
+    lungo = riepilogo.iloc[0]
+    assert lungo['Attese'] == 2
+    assert lungo['Totale [s]'] == pytest.approx(0.155)
+    assert lungo['Media [s]'] == pytest.approx(0.0775)
+    assert lungo['Massimo [s]'] == pytest.approx(0.155)
+    assert riepilogo.iloc[1]['Totale [s]'] == 0
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from DF_Tools import DataFrameTools
+
+
+def rendi_lista_se16(intestazione, righe):
+    """
+    Testo di una lista SE16 (formato "non convertito"): righe separate da trattini e campi separati da '|'
+    """
+    larghezze = [max(len(str(r[i])) for r in [intestazione] + righe) for i in range(len(intestazione))]
+    def riga(valori):
+        return "|" + "|".join(f" {str(v):<{l}} " for v, l in zip(valori, larghezze)) + "|"
+    separatore = "-" * len(riga(intestazione))
+    return "\n".join([separatore, riga(intestazione), separatore] + [riga(r) for r in righe] + [separatore]) + "\n"
+
+
+def clean_data_originale(data):
+    """
+    clean_data prima della lettura a colonne (riga per riga), usata come riferimento:
+    la nuova versione restituisce gli stessi valori già ripuliti dagli spazi
+    """
+    lines = data.strip().split('\n')
+    clean_lines = []
+    for line in lines:
+        line = line.strip()
+        if line and not all(c == '-' for c in line.replace(' ', '')):
+            clean_lines.append(line)
+    data_rows = [line.split('|') for line in clean_lines]
+    original_headers = [header.strip() for header in data_rows[0]]
+    unique_headers = DataFrameTools.handle_duplicate_headers(original_headers)
+    df = pd.DataFrame(data_rows[1:], columns=unique_headers)
+    df = df.dropna(axis=1, how='all')
+    df = df.loc[:, ~(df == '').all()]
+    return df.reset_index(drop=True)
@@ -0,0 +1,391 @@
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class FakeClipboard:
+    """
+    Clipboard in memoria condivisa dalle sessioni simulate (sostituisce WindowsClipboard)
+    """
+    errore = OSError
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._testo: Optional[str] = None
+
+    def svuota(self) -> None:
+        with self._lock:
+            self._testo = None
+
+    def scrivi(self, testo: str) -> None:
+        with self._lock:
+            self._testo = testo
+
+    def leggi(self) -> Optional[str]:
+        with self._lock:
+            return self._testo
+
+
+class _FakeScrollbar:
+    """
+    Barra di scorrimento verticale di una tabella (position = prima riga visibile)
+    """
+
+    def __init__(self):
+        self.position = 0
+
+
+class FakeElement:
+    """
+    Elemento della GUI restituito da FakeSAPSession.findById: registra i valori impostati
+    e inoltra le azioni (press, select, sendVKey) e la scrittura del testo alla sessione
+    """
+
+    def __init__(self, session, id_elemento: str):
+        self._session = session
+        self.id = id_elemento
+        self._testo = ""
+        self.caretPosition = 0
+        self.selected = False
+        self.verticalScrollbar = _FakeScrollbar()
+        # Proprietà della barra di stato (wnd[0]/sbar)
+        self.Text = ""
+        self.MessageType = ""
+
+    @property
+    def text(self) -> str:
+        return self._testo
+
+    @text.setter
+    def text(self, valore: str) -> None:
+        self._testo = valore
+        self._session._testo_impostato(self.id, valore)
+
+    def press(self):
+        self._session._azione(self.id, 'press')
+
+    def select(self):
+        self.selected = True
+        self._session._azione(self.id, 'select')
+
+    def sendVKey(self, tasto: int):
+        self._session._azione(self.id, 'vkey', tasto)
+
+    def setFocus(self):
+        pass
+
+
+class FakeSAPSession:
+    """
+    Sessione SAP GUI simulata per le estrazioni SE16 di SAPDataExtractor e i caricamenti di SAPDataUpLoader.
+
+    L'esecuzione della selezione o del caricamento (F8) rende la sessione Busy per latenza_query secondi;
+    l'esportazione in clipboard la rende Busy per latenza_export secondi e scrive nella clipboard il
+    testo della tabella solo al termine, come fa SAP GUI; con il formato "non convertito" si apre invece
+    la finestra di salvataggio e il testo viene scritto nel file indicato (in UTF-8). Le finestre di dialogo (wnd[1]) si aprono e
+    si chiudono dopo latenza_popup secondi e i campi della schermata di selezione SE16 esistono solo
+    dopo aver indicato la tabella: findById solleva un errore per i controlli non presenti, o
+    restituisce None se chiamato con raise_error=False. La selezione multipla di un campo (registrata in selezioni)
+    limita le righe esportate ai valori singoli e agli intervalli indicati nella colonna 'Valore Livello';
+    se la selezione non trova righe la barra di stato (wnd[0]/sbar) riporta il messaggio di SE16.
+    """
+    # Cella di una tabella della selezione multipla: tabella, colonna, riga visibile
+    _CELLA_SELEZIONE = re.compile(r'(.*/tblSAPLALDB(?:SINGLE|INTERVAL))/c?txt[^\[]*\[(\d+),(\d+)\]')
+
+    def __init__(self, id_sessione: str, connection, tabelle: Dict[str, str], clipboard: FakeClipboard,
+                 latenza_query: float = 1.0, latenza_export: float = 0.2, latenza_popup: float = 0.05,
+                 orologio: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            id_sessione: Id della sessione (es. "/app/con[0]/ses[0]")
+            connection: Connessione simulata a cui appartiene la sessione
+            tabelle: Dizionario nome tabella -> testo esportato da SE16
+            clipboard: Clipboard condivisa in cui esportare i dati
+            latenza_query: Durata in secondi dell'esecuzione della selezione
+            latenza_export: Durata in secondi dell'esportazione in clipboard
+            latenza_popup: Tempo in secondi di apertura e chiusura delle finestre di dialogo
+            orologio: Funzione che restituisce l'istante corrente in secondi (sostituibile nei test)
+        """
+        self.Id = id_sessione
+        self.connection = connection
+        self.tabelle = tabelle
+        self.clipboard = clipboard
+        self.latenza_query = latenza_query
+        self.latenza_export = latenza_export
+        self.latenza_popup = latenza_popup
+        self.orologio = orologio
+        self._elementi: Dict[str, FakeElement] = {}
+        self._occupata_fino = 0.0
+        self._export_richiesto = False
+        self._formato = None
+        self._salvataggio_richiesto = False
+        # Schermata corrente di wnd[0] e istanti di apertura/chiusura della finestra wnd[1]
+        self._schermata = None
+        self._popup_da = None
+        self._popup_fino = None
+        # Valori della selezione multipla in compilazione (tabella -> riga -> colonna -> valore) e applicata
+        self._righe_selezione: Dict[str, Dict[int, Dict[int, str]]] = {}
+        self._selezione = None
+        self._chiusa = False
+        # Campo della selezione multipla aperta e selezioni applicate (tabella, campo, singoli, intervalli)
+        self._campo_selezione = None
+        self.selezioni = []
+        # Celle compilate nelle tabelle della selezione multipla: (id, riga della tabella, valore)
+        self.celle_selezione = []
+
+    @property
+    def Busy(self) -> bool:
+        return self.orologio() < self._occupata_fino
+
+    def _popup_aperto(self) -> bool:
+        adesso = self.orologio()
+        return (self._popup_da is not None and adesso >= self._popup_da
+                and (self._popup_fino is None or adesso < self._popup_fino))
+
+    def _presente(self, id_elemento: str) -> bool:
+        if id_elemento.startswith("wnd[1]"):
+            return self._popup_aperto()
+        if id_elemento.startswith("wnd[0]/usr/"):
+            if self._schermata == "SE16":
+                return id_elemento == "wnd[0]/usr/ctxtDATABROWSE-TABLENAME"
+            return self._schermata is not None
+        return True
+
+    def findById(self, id_elemento: str, raise_error: bool = True) -> Optional[FakeElement]:
+        if self._chiusa:
+            raise RuntimeError("The session has been closed")
+        if not self._presente(id_elemento):
+            if raise_error:
+                raise RuntimeError(f"The control could not be found by id: {id_elemento}")
+            return None
+        elemento = self._elementi.get(id_elemento)
+        if elemento is None:
+            elemento = self._elementi[id_elemento] = FakeElement(self, id_elemento)
+        return elemento
+
+    def CreateSession(self):
+        self.connection._crea_sessione()
+
+    def _occupa(self, secondi: float) -> None:
+        self._occupata_fino = self.orologio() + secondi
+
+    def _apri_popup(self) -> None:
+        self._popup_da = self.orologio() + self.latenza_popup
+        self._popup_fino = None
+        self._elementi = {k: v for k, v in self._elementi.items() if not k.startswith("wnd[1]")}
+
+    def _chiudi_popup(self) -> None:
+        self._popup_fino = self.orologio() + self.latenza_popup
+
+    def _testo_impostato(self, id_elemento: str, valore: str) -> None:
+        trovato = self._CELLA_SELEZIONE.fullmatch(id_elemento)
+        if trovato is None:
+            return
+        tabella, colonna, riga = trovato.group(1), int(trovato.group(2)), int(trovato.group(3))
+        riga += self.findById(tabella).verticalScrollbar.position
+        self.celle_selezione.append((id_elemento, riga, valore))
+        self._righe_selezione.setdefault(tabella, {}).setdefault(riga, {})[colonna] = valore
+
+    def _applica_selezione(self) -> None:
+        singoli, intervalli = set(), []
+        for tabella, righe in self._righe_selezione.items():
+            for riga in righe.values():
+                if tabella.endswith("SINGLE") and riga.get(1):
+                    singoli.add(riga[1])
+                elif tabella.endswith("INTERVAL") and riga.get(1):
+                    intervalli.append((riga[1], riga.get(2) or riga[1]))
+        self._righe_selezione = {}
+        self._selezione = (singoli, intervalli)
+        self.selezioni.append((self._elementi["wnd[0]/usr/ctxtDATABROWSE-TABLENAME"].text, self._campo_selezione,
+                               sorted(singoli), sorted(intervalli)))
+
+    def _testo_tabella(self) -> str:
+        """
+        Testo esportato della tabella indicata nella SE16, limitato alla selezione multipla
+        """
+        testo = self.tabelle.get(self._elementi["wnd[0]/usr/ctxtDATABROWSE-TABLENAME"].text, "")
+        if self._selezione is None:
+            return testo
+        singoli, intervalli = self._selezione
+        righe: List[str] = testo.split('\n')
+        colonna = None
+        filtrate = []
+        for riga in righe:
+            campi = [campo.strip() for campo in riga.split('|')]
+            if colonna is None and 'Valore Livello' in campi:
+                colonna = campi.index('Valore Livello')
+                filtrate.append(riga)
+            elif colonna is not None and riga.startswith('|') and len(campi) > colonna:
+                valore = campi[colonna]
+                if valore in singoli or any(da <= valore <= a for da, a in intervalli):
+                    filtrate.append(riga)
+            else:
+                filtrate.append(riga)
+        return '\n'.join(filtrate)
+
+    def _azione(self, id_elemento: str, azione: str, tasto: Optional[int] = None) -> None:
+        if azione == 'vkey' and tasto == 0 and id_elemento == "wnd[0]":
+            # Invio: avvio della transazione indicata nel campo comandi o passaggio alla selezione SE16
+            comando = self._elementi.get("wnd[0]/tbar[0]/okcd")
+            if comando is not None and comando.text:
+                self._schermata = comando.text[2:] if comando.text.startswith("/n") else comando.text
+                comando.text = ""
+                self._selezione = None
+                self._elementi = {k: v for k, v in self._elementi.items() if not k.startswith("wnd[0]/usr/")}
+            elif self._schermata == "SE16" and self.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text:
+                self._schermata = "SE16 selezione"
+        elif azione == 'press' and id_elemento.endswith("_%_APP_%-VALU_PUSH"):
+            # Finestra di selezione multipla del campo
+            self._righe_selezione = {}
+            self._campo_selezione = id_elemento[len("wnd[0]/usr/btn%_"):-len("_%_APP_%-VALU_PUSH")]
+            self._apri_popup()
+        elif azione == 'press' and id_elemento == "wnd[1]/tbar[0]/btn[8]":
+            # Applicazione della selezione multipla
+            self._applica_selezione()
+            self._chiudi_popup()
+        elif azione == 'vkey' and tasto == 4:
+            # F4: finestra di selezione del file da caricare
+            self._apri_popup()
+        elif azione == 'press' and id_elemento in ("wnd[1]/tbar[0]/btn[0]", "wnd[1]/tbar[0]/btn[11]") and self._salvataggio_richiesto:
+            # Salvataggio della lista nel file indicato
+            self._salvataggio_richiesto = False
+            percorso = os.path.join(self.findById("wnd[1]/usr/ctxtDY_PATH").text,
+                                    self.findById("wnd[1]/usr/ctxtDY_FILENAME").text)
+            with open(percorso, 'w', encoding='utf-8', newline='') as f:
+                f.write(self._testo_tabella())
+            self._chiudi_popup()
+            self._occupa(self.latenza_export)
+        elif azione == 'press' and id_elemento == "wnd[1]/tbar[0]/btn[0]" and not self._export_richiesto:
+            self._chiudi_popup()
+        elif (azione == 'vkey' and tasto == 8) or (azione == 'press' and id_elemento == "wnd[0]/tbar[1]/btn[8]"):
+            # Esecuzione della selezione SE16: senza righe la barra di stato lo segnala e la lista non viene mostrata
+            self._occupa(self.latenza_query)
+            barra = self.findById("wnd[0]/sbar")
+            senza_righe = (self._schermata == "SE16 selezione"
+                           and sum(riga.startswith('|') for riga in self._testo_tabella().split('\n')) <= 1)
+            barra.Text = "No table entries found for specified key" if senza_righe else ""
+            barra.MessageType = "S" if senza_righe else ""
+        elif azione == 'select' and id_elemento == "wnd[0]/mbar/menu[0]/menu[10]/menu[3]/menu[2]":
+            # Finestra di scelta del formato di esportazione
+            self._export_richiesto = True
+            self._formato = None
+            self._apri_popup()
+        elif azione == 'select' and "radSPOPLI-SELFLAG" in id_elemento:
+            self._formato = id_elemento
+        elif (azione == 'press' and id_elemento == "wnd[1]/tbar[0]/btn[0]" and self._export_richiesto
+              and self._formato is not None and self._formato.endswith("[0,0]")):
+            # Formato "non convertito": si apre la finestra di salvataggio del file
+            self._export_richiesto = False
+            self._salvataggio_richiesto = True
+            self._apri_popup()
+        elif azione == 'press' and id_elemento == "wnd[1]/tbar[0]/btn[0]" and self._export_richiesto:
+            self._export_richiesto = False
+            self._chiudi_popup()
+            self._occupa(self.latenza_export)
+            threading.Timer(self.latenza_export, self.clipboard.scrivi, args=(self._testo_tabella(),)).start()
+
+
+class _FakeChildren:
+    """
+    Collezione Children di una connessione SAP GUI: figli(i) e figli.Count
+    """
+
+    def __init__(self, sessioni):
+        self._sessioni = sessioni
+
+    def __call__(self, indice: int) -> FakeSAPSession:
+        return self._sessioni[indice]
+
+    @property
+    def Count(self) -> int:
+        return len(self._sessioni)
+
+
+class FakeSAPConnection:
+    """
+    Connessione SAP GUI simulata: le nuove sessioni (CreateSession) compaiono dopo latenza_apertura secondi
+    """
+
+    def __init__(self, tabelle: Dict[str, str], clipboard: Optional[FakeClipboard] = None, n_sessioni: int = 1,
+                 latenza_query: float = 1.0, latenza_export: float = 0.2, latenza_popup: float = 0.05,
+                 latenza_apertura: float = 0.5):
+        self.tabelle = tabelle
+        self.clipboard = clipboard or FakeClipboard()
+        self.latenza_query = latenza_query
+        self.latenza_export = latenza_export
+        self.latenza_popup = latenza_popup
+        self.latenza_apertura = latenza_apertura
+        self._lock = threading.Lock()
+        self._sessioni = []
+        self._contatore = 0
+        for _ in range(n_sessioni):
+            self._aggiungi_sessione()
+
+    @property
+    def Children(self) -> _FakeChildren:
+        with self._lock:
+            return _FakeChildren(list(self._sessioni))
+
+    def _aggiungi_sessione(self) -> None:
+        with self._lock:
+            session = FakeSAPSession(f"/app/con[0]/ses[{self._contatore}]", self, self.tabelle, self.clipboard,
+                                     self.latenza_query, self.latenza_export, self.latenza_popup)
+            self._contatore += 1
+            self._sessioni.append(session)
+
+    def _crea_sessione(self) -> None:
+        threading.Timer(self.latenza_apertura, self._aggiungi_sessione).start()
+
+    def CloseSession(self, id_sessione: str) -> None:
+        with self._lock:
+            for session in self._sessioni:
+                if session.Id == id_sessione:
+                    session._chiusa = True
+            self._sessioni = [s for s in self._sessioni if s.Id != id_sessione]
+
+    def findById(self, id_sessione: str) -> FakeSAPSession:
+        with self._lock:
+            for session in self._sessioni:
+                if session.Id == id_sessione:
+                    return session
+        raise ValueError(f"Sessione {id_sessione} non trovata")
+
+
+class _FakeScriptingEngine:
+    """
+    Motore di scripting SAP GUI simulato con le connessioni aperte
+    """
+
+    def __init__(self, connessioni):
+        self._connessioni = connessioni
+
+    @property
+    def Children(self) -> _FakeChildren:
+        return _FakeChildren(self._connessioni)
+
+    def findById(self, id_sessione: str) -> FakeSAPSession:
+        for connection in self._connessioni:
+            try:
+                return connection.findById(id_sessione)
+            except ValueError:
+                pass
+        raise ValueError(f"Sessione {id_sessione} non trovata")
+
+
+class FakeSAPGui:
+    """
+    Oggetto SAPGUI simulato (sostituisce GetObject('SAPGUI')): GetScriptingEngine restituisce il motore
+    con le connessioni indicate; chiamate conta le richieste del motore di scripting.
+    Con connessioni vuote simula SAP GUI senza connessioni aperte.
+    """
+
+    def __init__(self, *connessioni: FakeSAPConnection):
+        self.connessioni = list(connessioni)
+        self.chiamate = 0
+
+    @property
+    def GetScriptingEngine(self) -> _FakeScriptingEngine:
+        self.chiamate += 1
+        return _FakeScriptingEngine(self.connessioni)